@@ -0,0 +1,183 @@
+"""
+Benchmark de clean_lego_data y process_lego_data: versiones vectorizadas frente a las anteriores
+con iterrows / apply por fila.
+
+Uso:
+    python 02_Function/bench_lego_utils.py                 # 10k, 100k y 1M filas
+    python 02_Function/bench_lego_utils.py --filas 10000   # tamaños concretos
+    python 02_Function/bench_lego_utils.py --max-legacy 100000
+
+La versión anterior tarda minutos a partir de 1M filas, por eso solo se mide hasta --max-legacy.
+Cuando se miden las dos, se comprueba además que la salida es idéntica (CSV byte a byte para la
+limpieza, tolerancia de float para las métricas de inversión).
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lego_utils import clean_lego_data, process_lego_data
+
+
+def clean_lego_data_iterrows(df_lego):
+    """Copia de la imputación original (bucle por tema + iterrows) usada como referencia."""
+    df_lego['Subtheme'] = df_lego['Subtheme'].fillna('Unknown')
+    columns_zero = [
+        'Pieces', 'BrickLinkSoldPriceNew', 'BrickLinkSoldPriceNewUS', 'USRetailPrice',
+        'BrickLinkSoldPriceUsed', 'Depth', 'Height', 'Width', 'Weight', 'Minifigs', 'AgeMin', 'AgeMax'
+    ]
+    for col in columns_zero:
+        if col in df_lego.columns:
+            df_lego[col] = df_lego[col].fillna(0)
+    df_lego['ImageFilename'] = df_lego['ImageFilename'].fillna('Unknown')
+    df_lego['LaunchDate'] = pd.to_datetime(df_lego['LaunchDate'], errors='coerce')
+    df_lego['ExitDate'] = pd.to_datetime(df_lego['ExitDate'], errors='coerce')
+    df_lego['Duration'] = (df_lego['ExitDate'] - df_lego['LaunchDate']).dt.days / 365.25
+    theme_median_duration = df_lego.groupby('Theme')['Duration'].median()
+    for theme, median_duration in theme_median_duration.items():
+        mask = (df_lego['Theme'] == theme) & df_lego['ExitDate'].isna() & df_lego['LaunchDate'].notna()
+        df_lego.loc[mask, 'ExitDate'] = df_lego.loc[mask, 'LaunchDate'] + pd.to_timedelta(median_duration * 365.25, unit='D')
+    mask_launch = df_lego['LaunchDate'].isna() & df_lego['YearFrom'].notna()
+    df_lego.loc[mask_launch, 'LaunchDate'] = pd.to_datetime(df_lego.loc[mask_launch, 'YearFrom'].astype(int).astype(str) + '-01-01')
+    df_lego['LaunchYear'] = df_lego['LaunchDate'].dt.year
+    df_lego['LaunchMonth'] = df_lego['LaunchDate'].dt.month
+    df_lego['ExitYear'] = df_lego['ExitDate'].dt.year
+    df_lego['ExitMonth'] = df_lego['ExitDate'].dt.month
+    df_lego.drop(columns=['LaunchDate', 'ExitDate', 'Duration'], inplace=True)
+    df_lego['Duration'] = df_lego['ExitYear'] - df_lego['LaunchYear']
+    theme_avg_duration = df_lego.groupby('Theme')['Duration'].mean()
+    year_avg_duration = df_lego.groupby('LaunchYear')['Duration'].mean()
+    for index, row in df_lego.iterrows():
+        if pd.isna(row['ExitYear']) and not pd.isna(row['LaunchYear']):
+            theme_duration = theme_avg_duration.get(row['Theme'], None)
+            year_duration = year_avg_duration.get(row['LaunchYear'], None)
+            estimated_duration = theme_duration if pd.notna(theme_duration) else year_duration
+            if pd.notna(estimated_duration):
+                df_lego.at[index, 'ExitYear'] = int(row['LaunchYear'] + round(estimated_duration))
+                df_lego.at[index, 'ExitMonth'] = 12
+    df_lego.drop(columns=['Duration'], inplace=True)
+    df_lego['PackagingType'] = df_lego['PackagingType'].replace({
+        '{Not specified}': 'Unknown',
+        'Plastic canister': 'Canister',
+        'Plastic box': 'Box',
+        'Metal canister': 'Canister',
+        'Box with handle': 'Box',
+        'Box with backing card': 'Box',
+        'None (loose parts)': 'None'
+    })
+    df_lego['Availability'] = df_lego['Availability'].replace({
+        '{Not specified}': 'Unknown',
+        'Promotional (Airline)': 'Promotional'
+    })
+    df_lego.loc[df_lego['Theme'] == 'Creator Expert', 'Theme'] = 'Icons'
+    return df_lego
+
+
+def process_lego_data_apply(df_lego):
+    """Copia del cálculo de métricas original (cuatro apply por fila) usada como referencia."""
+    current_year = datetime.now().year
+    df_lego['YearsSinceExit'] = current_year - df_lego['ExitYear']
+    df_lego['YearsSinceExit'] = df_lego['YearsSinceExit'].fillna(0).astype(int)
+    df_lego['PriceChange'] = ((df_lego['BrickLinkSoldPriceNew'] - df_lego['USRetailPrice']) / df_lego['USRetailPrice']) * 100
+    df_lego['PriceChange'] = df_lego['PriceChange'].fillna(0)
+    df_lego['ResaleDemand'] = df_lego.apply(lambda row: row['BrickLinkSoldPriceNew'] / row['BrickLinkSoldPriceUsed']
+                                             if row['BrickLinkSoldPriceUsed'] > 0 else 0, axis=1)
+    df_lego['AppreciationTrend'] = df_lego.apply(lambda row: row['PriceChange'] / row['YearsSinceExit']
+                                                 if row['YearsSinceExit'] > 0 else 0, axis=1)
+    size_labels = ['Small', 'Medium', 'Large']
+    df_lego['SizeCategory'] = pd.cut(df_lego['Pieces'], bins=[0, 249, 1000, float('inf')], labels=size_labels, include_lowest=True)
+    exclusive_themes = ['Star Wars', 'Modular Buildings', 'Ideas', 'Creator Expert', 'Harry Potter',
+                        'Marvel Super Heroes', 'Ghostbusters', 'Icons', 'The Lord of the Rings',
+                        'Pirates of the Caribbean', 'Pirates', 'Trains', 'Architecture']
+    df_lego['Exclusivity'] = df_lego['Theme'].apply(lambda x: 'Exclusive' if x in exclusive_themes else 'Regular')
+    theme_popularity = df_lego.groupby('Theme')['PriceChange'].mean().replace([np.inf, -np.inf], np.nan)
+    df_lego['ThemePopularity'] = df_lego['Theme'].map(theme_popularity).fillna(0)
+    df_lego['InvestmentScore'] = df_lego.apply(lambda row: (row['PriceChange'] * 0.4) +
+                                                         (row['AppreciationTrend'] * 0.3) +
+                                                         (row['ThemePopularity'] * 0.2) +
+                                                         (10 if row['Exclusivity'] == 'Exclusive' else 0), axis=1)
+    return df_lego
+
+
+def generar_datos(n, seed=0):
+    """Genera un DataFrame sintético con el mismo esquema que df_lego_work.csv."""
+    rng = np.random.default_rng(seed)
+    themes = np.array(['Star Wars', 'City', 'Technic', 'Duplo', 'Creator Expert', 'Icons', 'Friends',
+                       'Ninjago', 'Harry Potter', 'Ideas', 'Architecture', 'Trains'])
+    year_from = rng.integers(1970, 2025, n)
+    launch = pd.to_datetime(pd.Series(year_from).astype(str) + '-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    exit_ = launch + pd.to_timedelta(rng.integers(180, 2500, n), unit='D')
+
+    launch_str = launch.dt.strftime('%Y-%m-%d').where(rng.random(n) >= 0.35)
+    exit_str = exit_.dt.strftime('%Y-%m-%d').where(rng.random(n) >= 0.40)
+
+    def con_nulos(valores, prob):
+        valores = valores.astype(float)
+        valores[rng.random(n) < prob] = np.nan
+        return valores
+
+    return pd.DataFrame({
+        'SetID': np.arange(n),
+        'Number': np.arange(n).astype(str),
+        'YearFrom': year_from,
+        'Theme': rng.choice(themes, n),
+        'Subtheme': np.where(rng.random(n) < 0.15, None, 'Sub'),
+        'SetName': 'Set',
+        'ImageFilename': np.where(rng.random(n) < 0.05, None, 'img'),
+        'USRetailPrice': con_nulos(rng.uniform(5, 800, n), 0.3),
+        'Pieces': con_nulos(rng.integers(10, 7000, n), 0.03),
+        'Minifigs': con_nulos(rng.integers(0, 12, n), 0.35),
+        'PackagingType': rng.choice(['Box', '{Not specified}', 'Plastic box', 'Polybag'], n),
+        'Availability': rng.choice(['Retail', '{Not specified}', 'Promotional (Airline)'], n),
+        'BrickLinkSoldPriceNew': con_nulos(rng.uniform(5, 1500, n), 0.15),
+        'BrickLinkSoldPriceUsed': con_nulos(rng.uniform(5, 900, n), 0.25),
+        'LaunchDate': launch_str,
+        'ExitDate': exit_str,
+    })
+
+
+def medir(funcion, df):
+    inicio = time.perf_counter()
+    resultado = funcion(df.copy())
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de clean_lego_data")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-legacy", type=int, default=100_000,
+                        help="Tamaño máximo en el que se ejecutan las versiones anteriores")
+    args = parser.parse_args()
+
+    cabecera = f"{'filas':>10} {'anterior (s)':>14} {'vectorizado (s)':>16} {'speedup':>9}  idéntico"
+
+    print("clean_lego_data")
+    print(cabecera)
+    limpios = {}
+    for n in args.filas:
+        df = generar_datos(n)
+        nuevo, t_nuevo = medir(clean_lego_data, df)
+        limpios[n] = nuevo
+
+        if n <= args.max_legacy:
+            viejo, t_viejo = medir(clean_lego_data_iterrows, df)
+            identico = viejo.to_csv(index=False) == nuevo.to_csv(index=False)
+            print(f"{n:>10} {t_viejo:>14.3f} {t_nuevo:>16.3f} {t_viejo / t_nuevo:>8.1f}x  {identico}")
+        else:
+            print(f"{n:>10} {'-':>14} {t_nuevo:>16.3f} {'-':>9}  -")
+
+    print("\nprocess_lego_data")
+    print(cabecera)
+    for n, df in limpios.items():
+        nuevo, t_nuevo = medir(process_lego_data, df)
+
+        if n <= args.max_legacy:
+            viejo, t_viejo = medir(process_lego_data_apply, df)
+            columnas = ['ResaleDemand', 'AppreciationTrend', 'ThemePopularity', 'InvestmentScore']
+            identico = np.allclose(viejo[columnas], nuevo[columnas], equal_nan=True) and \
+                viejo['Exclusivity'].equals(nuevo['Exclusivity'])
+            print(f"{n:>10} {t_viejo:>14.3f} {t_nuevo:>16.3f} {t_viejo / t_nuevo:>8.1f}x  {identico}")
+        else:
+            print(f"{n:>10} {'-':>14} {t_nuevo:>16.3f} {'-':>9}  -")
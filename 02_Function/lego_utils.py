@@ -29,10 +29,10 @@ def clean_lego_data(df_lego):
     # Calcular la mediana de duración por Theme
     theme_median_duration = df_lego.groupby('Theme')['Duration'].median()
     
-    # Relleno ExitDate usando la mediana de duración por Theme
-    for theme, median_duration in theme_median_duration.items():
-        mask = (df_lego['Theme'] == theme) & df_lego['ExitDate'].isna() & df_lego['LaunchDate'].notna()
-        df_lego.loc[mask, 'ExitDate'] = df_lego.loc[mask, 'LaunchDate'] + pd.to_timedelta(median_duration * 365.25, unit='D')
+    # Relleno ExitDate usando la mediana de duración por Theme (mapeo vectorizado, sin bucle por tema)
+    mask = df_lego['ExitDate'].isna() & df_lego['LaunchDate'].notna() & df_lego['Theme'].isin(theme_median_duration.index)
+    median_duration = df_lego.loc[mask, 'Theme'].map(theme_median_duration)
+    df_lego.loc[mask, 'ExitDate'] = df_lego.loc[mask, 'LaunchDate'] + pd.to_timedelta(median_duration * 365.25, unit='D')
     
     # Relleno LaunchDate usando YearFrom para los valores NaN
     mask_launch = df_lego['LaunchDate'].isna() & df_lego['YearFrom'].notna()
@@ -57,17 +57,14 @@ def clean_lego_data(df_lego):
     year_avg_duration = df_lego.groupby('LaunchYear')['Duration'].mean()
     
     # Relleno los valores nulos de ExitYear y ExitMonth usando valores calculados
-    for index, row in df_lego.iterrows():
-        if pd.isna(row['ExitYear']) and not pd.isna(row['LaunchYear']):
-            theme_duration = theme_avg_duration.get(row['Theme'], None)
-            year_duration = year_avg_duration.get(row['LaunchYear'], None)
+    # Usar la duración del tema si está disponible, si no, la del año de lanzamiento
+    estimated_duration = df_lego['Theme'].map(theme_avg_duration)
+    estimated_duration = estimated_duration.fillna(df_lego['LaunchYear'].map(year_avg_duration))
     
-            # Usar la duración del tema si está disponible, si no, la del año de lanzamiento
-            estimated_duration = theme_duration if pd.notna(theme_duration) else year_duration
-    
-            if pd.notna(estimated_duration):  # Solo asignar si hay un valor válido
-                df_lego.at[index, 'ExitYear'] = int(row['LaunchYear'] + round(estimated_duration))
-                df_lego.at[index, 'ExitMonth'] = 12  # Usar diciembre como mes estimado de retiro
+    # Solo asignar si hay un valor válido (round de NumPy redondea a par, igual que round() de Python)
+    mask = df_lego['ExitYear'].isna() & df_lego['LaunchYear'].notna() & estimated_duration.notna()
+    df_lego.loc[mask, 'ExitYear'] = df_lego.loc[mask, 'LaunchYear'] + np.round(estimated_duration[mask])
+    df_lego.loc[mask, 'ExitMonth'] = 12  # Usar diciembre como mes estimado de retiro
     
     # Elimino de nuevo la columna auxiliar de duración
     df_lego.drop(columns=['Duration'], inplace=True)
@@ -118,32 +115,37 @@ def process_lego_data(df_lego):
     df_lego['PriceChange'] = ((df_lego['BrickLinkSoldPriceNew'] - df_lego['USRetailPrice']) / df_lego['USRetailPrice']) * 100
     df_lego['PriceChange'] = df_lego['PriceChange'].fillna(0)
     
-    # Calcular la demanda de reventa
-    df_lego['ResaleDemand'] = df_lego.apply(lambda row: row['BrickLinkSoldPriceNew'] / row['BrickLinkSoldPriceUsed'] 
-                                             if row['BrickLinkSoldPriceUsed'] > 0 else 0, axis=1)
+    # Calcular la demanda de reventa (vectorizado, sin apply por fila)
+    precio_nuevo = df_lego['BrickLinkSoldPriceNew'].to_numpy(dtype=float)
+    precio_usado = df_lego['BrickLinkSoldPriceUsed'].to_numpy(dtype=float)
+    hay_usado = precio_usado > 0
+    df_lego['ResaleDemand'] = np.divide(precio_nuevo, precio_usado, out=np.zeros(len(df_lego)), where=hay_usado)
     
     # Calcular la tendencia de apreciación
-    df_lego['AppreciationTrend'] = df_lego.apply(lambda row: row['PriceChange'] / row['YearsSinceExit']
-                                                 if row['YearsSinceExit'] > 0 else 0, axis=1)
+    price_change = df_lego['PriceChange'].to_numpy(dtype=float)
+    years_since_exit = df_lego['YearsSinceExit'].to_numpy(dtype=float)
+    df_lego['AppreciationTrend'] = np.divide(price_change, years_since_exit, out=np.zeros(len(df_lego)),
+                                             where=years_since_exit > 0)
     
     # Clasificar los sets por tamaño
     size_labels = ['Small', 'Medium', 'Large']
-    df_lego['SizeCategory'] = pd.cut(df['Pieces'], bins=[0, 249, 1000, float('inf')], labels=size_labels, include_lowest=True)
+    df_lego['SizeCategory'] = pd.cut(df_lego['Pieces'], bins=[0, 249, 1000, float('inf')], labels=size_labels, include_lowest=True)
     
     # Definir sets exclusivos
     exclusive_themes = ['Star Wars', 'Modular Buildings', 'Ideas', 'Creator Expert', 'Harry Potter', 
                         'Marvel Super Heroes', 'Ghostbusters', 'Icons', 'The Lord of the Rings',
                         'Pirates of the Caribbean', 'Pirates', 'Trains', 'Architecture']
-    df_lego['Exclusivity'] = df_lego['Theme'].apply(lambda x: 'Exclusive' if x in exclusive_themes else 'Regular')
+    is_exclusive = df_lego['Theme'].isin(exclusive_themes).to_numpy()
+    df_lego['Exclusivity'] = np.where(is_exclusive, 'Exclusive', 'Regular').astype(object)
     
     # Calcular popularidad del tema
     theme_popularity = df_lego.groupby('Theme')['PriceChange'].mean().replace([np.inf, -np.inf], np.nan)
     df_lego['ThemePopularity'] = df_lego['Theme'].map(theme_popularity).fillna(0)
     
-    # Calcular InvestmentScore
-    df_lego['InvestmentScore'] = df_lego.apply(lambda row: (row['PriceChange'] * 0.4) +
-                                                         (row['AppreciationTrend'] * 0.3) +
-                                                         (row['ThemePopularity'] * 0.2) +
-                                                         (10 if row['Exclusivity'] == 'Exclusive' else 0), axis=1)
+    # Calcular InvestmentScore en una sola pasada aritmética (mismo orden de sumas que la versión por fila)
+    df_lego['InvestmentScore'] = (price_change * 0.4 +
+                                  df_lego['AppreciationTrend'].to_numpy() * 0.3 +
+                                  df_lego['ThemePopularity'].to_numpy(dtype=float) * 0.2 +
+                                  np.where(is_exclusive, 10, 0))
     
     return df_lego
@@ -1,85 +1,34 @@
 import os
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
 import pickle
-import itertools
 import matplotlib.pyplot as plt
 import pymongo #cambio erv
 
-# Obtenemos la ruta del archivo CSV
-BASE_DIR = os.getcwd()
-CSV_PATH = os.path.join(BASE_DIR, "04_Extra/APP/data/scraped_lego_data.csv")
+# Optimizador de carteras, sets retirados e imágenes compartidos con la app principal
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "08_APP_U"))
+from inversiones import enumerar_combinaciones, top_k_combinaciones
+from imagenes import servicio_imagenes, url_imagen
+from retirados import CSV_PATH, MODELO_2Y_PATH, MODELO_5Y_PATH, cargar_retirados, rentabilidad_por_tema
 
-# Verificamos si el archivo existe
+# Verificamos que existen el histórico de precios y los modelos
 if not os.path.exists(CSV_PATH):
     st.error("❌ ERROR: El archivo CSV NO EXISTE en la ruta especificada.")
     st.stop()
+if not os.path.exists(MODELO_2Y_PATH) or not os.path.exists(MODELO_5Y_PATH):
+    st.error("❌ No se encontraron los modelos .pkl en la carpeta 'models/'.")
+    st.stop()
 
-# Cargamos el archivo CSV
+# Sets con predicciones: se calculan una vez por versión del CSV y de los modelos (artefacto en disco y memoria)
 try:
-    df = pd.read_csv(CSV_PATH)
+    df_identification, _ = cargar_retirados()
 except Exception as e:
-    st.error(f"❌ ERROR al leer el archivo CSV: {e}")
+    st.error(f"❌ ERROR al preparar los sets retirados: {e}")
     st.stop()
 
-# Procesamos el dataset
-df["PriceDate"] = pd.to_datetime(df["PriceDate"], errors='coerce')
-df = df.dropna(subset=["PriceDate"])
-df_sorted = df.sort_values(by=['Number', 'PriceDate'])
-df_sorted['PriceIndex'] = df_sorted.groupby('Number').cumcount()
-df_transformed = df_sorted.pivot(index=['Number', 'SetName', 'Theme', 'Year', 'Pieces',
-                                        'RetailPriceUSD', 'CurrentValueNew', 'ForecastValueNew2Y',
-                                        'ForecastValueNew5Y'],
-                                 columns='PriceIndex', values='PriceValue').reset_index()
-df_transformed.columns = [f'Price_{col+1}' if isinstance(col, int) else col for col in df_transformed.columns]
-price_columns = [f'Price_{i}' for i in range(1, 13)]
-df_transformed = df_transformed[['Number', 'SetName', 'Theme', 'Year', 'Pieces', 'RetailPriceUSD', 'CurrentValueNew', 'ForecastValueNew2Y', 'ForecastValueNew5Y'] + price_columns]
-df_transformed[price_columns] = df_transformed[price_columns].fillna(0)
-df_transformed.loc[:, 'Pieces'] = df_transformed['Pieces'].fillna(0)
-df_transformed.loc[:, 'RetailPriceUSD'] = df_transformed['RetailPriceUSD'].fillna(0)
-df_transformed.loc[df_transformed['CurrentValueNew'] == 0, 'CurrentValueNew'] = df_transformed['RetailPriceUSD']
-df_transformed = df_transformed.dropna()
-
-# Cargamos modelos de predicción
-pkl_path_2y = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_2y.pkl")
-pkl_path_5y = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_5y.pkl")
-
-if not os.path.exists(pkl_path_2y) or not os.path.exists(pkl_path_5y):
-    st.error("❌ No se encontraron los modelos .pkl en la carpeta 'models/'.")
-    st.stop()
-
-@st.cache_resource
-def load_model(filename):
-    with open(filename, 'rb') as file:
-        return pickle.load(file)
-
-model_2y = load_model(pkl_path_2y)
-model_5y = load_model(pkl_path_5y)
-
-# Generamos predicciones
-df_identification = df_transformed[['Number', 'SetName', 'Theme', 'CurrentValueNew']].copy()
-df_model = df_transformed.drop(columns=['Number', 'SetName', 'Theme'], errors='ignore').copy()
-df_model = pd.get_dummies(df_model, drop_first=True)
-expected_columns = model_2y.feature_names_in_
-for col in expected_columns:
-    if col not in df_model.columns:
-        df_model[col] = 0
-df_model = df_model[expected_columns]
-df_identification.loc[:, 'PredictedValue2Y'] = model_2y.predict(df_model)
-df_identification.loc[:, 'PredictedValue5Y'] = model_5y.predict(df_model)
-
-# Calculamos rentabilidad porcentual por tema
-df_identification["Rentabilidad2Y"] = ((df_identification["PredictedValue2Y"] - df_identification["CurrentValueNew"]) / df_identification["CurrentValueNew"]) * 100
-df_identification["Rentabilidad5Y"] = ((df_identification["PredictedValue5Y"] - df_identification["CurrentValueNew"]) / df_identification["CurrentValueNew"]) * 100
-
-df_rentabilidad_temas = df_identification.groupby("Theme").agg(
-    TotalSets=('Theme', 'count'),
-    Rentabilidad2Y=('Rentabilidad2Y', 'mean'),
-    Rentabilidad5Y=('Rentabilidad5Y', 'mean')
-).reset_index()
-
-df_rentabilidad_temas = df_rentabilidad_temas.sort_values(by="Rentabilidad5Y", ascending=False)
+df_rentabilidad_temas = rentabilidad_por_tema(df_identification)
 
 st.title("🎯 Recomendador de inversión en sets de LEGO retirados")
 st.write("Este recomendador te ayuda a encontrar las mejores combinaciones de sets de LEGO retirados para invertir, basándose en su rentabilidad futura.")
@@ -109,26 +58,17 @@ presupuesto = st.slider("Presupuesto máximo ($)", min_value=100, max_value=2000
 df_filtrado = df_identification[df_identification["Theme"].isin(temas_seleccionados)]
 df_filtrado = df_filtrado[df_filtrado["CurrentValueNew"] <= presupuesto]
 
-# Optimización: Seleccionamos los 10 mejores sets primero
-df_top_sets = df_filtrado.sort_values(by="PredictedValue5Y", ascending=False).head(10)
+# Bolsa de candidatos: los 40 sets con más valor estimado a 5 años
+df_top_sets = df_filtrado.sort_values(by="PredictedValue5Y", ascending=False).head(40)
 
-# Buscamos combinaciones óptimas de inversión
+# Buscamos combinaciones óptimas de inversión (1-4 sets) sin guardar ni ordenar todas las combinaciones
 def encontrar_mejores_inversiones(df, presupuesto, num_opciones=3):
-    sets_lista = df[['SetName', 'CurrentValueNew', 'PredictedValue2Y', 'PredictedValue5Y']].values.tolist()
-    mejores_combinaciones = []
-
-    for r in range(1, 5):  # Limitamos combinaciones a 1-4 sets para optimizar
-        for combinacion in itertools.combinations(sets_lista, r):
-            total_precio = sum(item[1] for item in combinacion)
-            retorno_2y = sum(item[2] for item in combinacion)
-            retorno_5y = sum(item[3] for item in combinacion)
-
-            if total_precio <= presupuesto:
-                mejores_combinaciones.append((combinacion, retorno_2y, retorno_5y, total_precio))
+    sets_lista = df[['SetName', 'CurrentValueNew', 'PredictedValue2Y', 'PredictedValue5Y', 'Number']].values.tolist()
+    combinaciones = enumerar_combinaciones(df['CurrentValueNew'].to_numpy(), df['PredictedValue2Y'].to_numpy(),
+                                           df['PredictedValue5Y'].to_numpy(), presupuesto, max_sets=4)
 
-    # Ordenamos por rentabilidad en 5 años (descendente)
-    mejores_combinaciones.sort(key=lambda x: x[2], reverse=True)
-    return mejores_combinaciones[:num_opciones]
+    return [([sets_lista[i] for i in indices], retorno_2y, retorno_5y, total_precio)
+            for indices, total_precio, retorno_2y, retorno_5y in top_k_combinaciones(combinaciones, num_opciones)]
 
 
 # Mostramos inversiones óptimas con imágenes y texto centrado
@@ -139,6 +79,9 @@ if st.button("🔍 Buscar inversiones óptimas"):
         st.warning("⚠️ No se encontraron combinaciones dentro de tu presupuesto.")
     else:
         st.subheader("💡 Mejores opciones de inversión")
+        servicio = servicio_imagenes()
+        servicio.precargar([url_imagen(c[4], "brickset") for combo, _, _, _ in opciones for c in combo],
+                           presupuesto=2.0)
         for i, (combo, ret_2y, ret_5y, precio) in enumerate(opciones, 1):
             st.write(f"**Opción {i}:**")
             st.write(f"💵 **Total de la inversión:** ${precio:.2f}")
@@ -148,12 +91,14 @@ if st.button("🔍 Buscar inversiones óptimas"):
 
             # Mostramos sets con imágenes y datos centrados
             cols = st.columns(len(combo))  # Crear columnas dinámicas para mostrar imágenes
-            for col, (set_name, price, _, _) in zip(cols, combo):
-                set_number = df_top_sets[df_top_sets["SetName"] == set_name]["Number"].values[0]  # Obtener el número del set
-                image_url = f"https://images.brickset.com/sets/images/{set_number}.jpg"
+            for col, (set_name, price, _, _, set_number) in zip(cols, combo):
+                imagen = servicio.para_mostrar(url_imagen(set_number, "brickset"))
 
                 with col:
-                    st.image(image_url, use_container_width=True)  # Mostrar la imagen
+                    if imagen:
+                        st.image(imagen, use_container_width=True)  # Mostrar la imagen
+                    else:
+                        st.caption("🖼️ Imagen no disponible")
                     st.markdown(
                         f"""
                         <div style="text-align: center;">
@@ -5,18 +5,19 @@ import joblib
 import requests
 import os
 import pymongo
+import sys
 
+# Módulos compartidos de features y modelos de la app principal
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "08_APP_U"))
+from feature_utils import load_features, feature_frame
+from model_registry import obtener_modelo
+from imagenes import servicio_imagenes, url_imagen
 
-# URL del modelo en GitHub
-modelo_url = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/05_Streamlit/models/stacking_model.pkl"
 
+# Modelo desde el almacén local de modelos compartido con la app principal (verificado por SHA-256)
 @st.cache_resource
 def cargar_modelo():
-    modelo_path = "/tmp/stacking_model.pkl"
-    if not os.path.exists(modelo_path):
-        response = requests.get(modelo_url)
-        with open(modelo_path, "wb") as f:
-            f.write(response.content)
+    modelo_path, _ = obtener_modelo("stacking")
     return joblib.load(modelo_path)
 
 modelo = cargar_modelo()
@@ -39,7 +40,7 @@ def load_data():
         st.error("❌ No se encontraron datos en la colección de MongoDB.")
         st.stop()
     df = pd.DataFrame(data)
-    return preprocess_data(df)
+    return load_features(df)
 
 #inicio original luis
 # 📌 URL del dataset en GitHub RAW
@@ -51,36 +52,12 @@ def load_data():
     #return preprocess_data(df)  # Aplicar preprocesamiento antes de usarlo
 #fin original luis
 
-#inicio original luis
-# 📌 Función de preprocesamiento (igual que en telegram_app.py)
-def preprocess_data(df):
-    df = df[df['USRetailPrice'] > 0].copy()
-
-    if 'Exclusivity' in df.columns:
-        exclusivity_mapping = {'Regular': 0, 'Exclusive': 1}
-        df['Exclusivity'] = df['Exclusivity'].map(exclusivity_mapping)
-
-    if 'SizeCategory' in df.columns:
-        size_category_mapping = {'Small': 0, 'Medium': 1, 'Large': 2}
-        df['SizeCategory'] = df['SizeCategory'].map(size_category_mapping)
-
-    # Asegurar la creación de columnas faltantes
-    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
-    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
-    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
-
-    # Llenar valores NaN o Inf con 0
-    df.replace([np.inf, -np.inf], 0, inplace=True)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-
-    return df
-#fin original Luis
+# 📌 El preprocesamiento vive en 08_APP_U/feature_utils.py (compartido con la app y el bot)
 
 
 
 # 📌 Cargar dataset con preprocesamiento
-df_ranking = load_data()
+df_ranking, X_ranking = load_data()
 # #df_ranking = load_data_from_mongodb() #cambio erv
 
 # 📌 Interfaz en Streamlit
@@ -108,23 +85,21 @@ temas_unicos = sorted(df_ranking["Theme"].unique().tolist())
 temas_opciones = ["Todos"] + temas_unicos
 selected_themes = st.multiselect("🛒 Selecciona los Themes de Interés", temas_opciones, default=["Todos"])
 
-# 📌 Filtrar por presupuesto y temas
-df_filtrado = df_ranking[(df_ranking["USRetailPrice"] >= presupuesto_min) &
-                          (df_ranking["USRetailPrice"] <= presupuesto_max)]
+# 📌 Filtrar por presupuesto y temas (la misma máscara se aplica a la matriz de features)
+mask = ((df_ranking["USRetailPrice"] >= presupuesto_min) &
+        (df_ranking["USRetailPrice"] <= presupuesto_max)).to_numpy()
 
 if "Todos" not in selected_themes:
-    df_filtrado = df_filtrado[df_filtrado["Theme"].isin(selected_themes)]
+    mask &= df_ranking["Theme"].isin(selected_themes).to_numpy()
+
+df_filtrado = df_ranking[mask]
 
 # # 📌 Si `df_filtrado` está vacío, mostrar error y detener ejecución
 if df_filtrado.empty:
     st.error("❌ No hay sets disponibles con los filtros seleccionados. Ajusta la franja de precios o los temas para ver opciones.")
     st.stop()
 
-# # 📌 Funciones auxiliares para obtener imágenes y colores
-def get_lego_image(set_number):
-    return f"https://img.bricklink.com/ItemImage/SN/0/{set_number}-1.png"
-
-
+# # 📌 Función auxiliar para obtener colores
 def get_color(score):
     if score > 12:
         return "#00736d"  # Verde
@@ -138,17 +113,13 @@ def get_color(score):
 # # 📌 Generar Predicciones y Mostrar Top 3 Sets
 if st.button("Generar Predicciones"):
     if "PredictedInvestmentScore" not in df_filtrado.columns:
-        features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit',
-                    'ResaleDemand', 'AnnualPriceIncrease', 'Exclusivity',
-                    'SizeCategory', 'PricePerPiece', 'PricePerMinifig', 'YearsOnMarket']
-
 #         # 📌 Asegurar que hay datos antes de predecir
         if df_filtrado.shape[0] == 0:
             st.error("❌ No hay sets disponibles para predecir. Prueba ajustando los filtros.")
             st.stop()
 
         df_filtrado = df_filtrado.copy()
-        df_filtrado.loc[:, "PredictedInvestmentScore"] = modelo.predict(df_filtrado[features])
+        df_filtrado.loc[:, "PredictedInvestmentScore"] = modelo.predict(feature_frame(X_ranking[mask], index=df_filtrado.index))
         df_filtrado = df_filtrado[df_filtrado["PredictedInvestmentScore"] > 0]
 
         if df_filtrado.shape[0] < 3:
@@ -158,6 +129,9 @@ if st.button("Generar Predicciones"):
 
         st.subheader("📊 Top 3 Sets Más Rentables")
         if not df_filtrado.empty:
+            # Imágenes de BrickLink desde la caché local; se descargan en paralelo con un tiempo máximo
+            servicio = servicio_imagenes()
+            servicio.precargar([url_imagen(n, "bricklink") for n in df_filtrado["Number"]], presupuesto=2.0)
             cols = st.columns(len(df_filtrado))
             for col, (_, row) in zip(cols, df_filtrado.iterrows()):
                 with col:
@@ -167,8 +141,11 @@ if st.button("Generar Predicciones"):
                             <strong>{row['SetName']}</strong>
                         </div>
                     """, unsafe_allow_html=True)
-                    image_url = get_lego_image(row["Number"])
-                    st.image(image_url, caption=row["SetName"], use_container_width=True)
+                    imagen = servicio.para_mostrar(url_imagen(row["Number"], "bricklink"))
+                    if imagen:
+                        st.image(imagen, caption=row["SetName"], use_container_width=True)
+                    else:
+                        st.caption("🖼️ Imagen no disponible")
                     st.write(f"**Tema:** {row['Theme']}")
                     st.write(f"💰 **Precio:** ${row['USRetailPrice']:.2f}")
                     url_lego = f"https://www.lego.com/en-us/product/{row['Number']}"
@@ -7,6 +7,11 @@ import pandas as pd
 import numpy as np
 import schedule
 import time
+import sys
+
+# Módulo compartido de features de la app principal
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "08_APP_U"))
+from feature_utils import load_features, feature_frame
 
 # Obtenemos el token del bot
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -41,28 +46,9 @@ modelo = load_model()
 # Cargamos y procesamos el dataset de LEGO
 def load_data():
     df = pd.read_csv(dataset_url)
-    return preprocess_data(df)
-
-def preprocess_data(df):
-    df = df[df['USRetailPrice'] > 0].copy()
-
-    exclusivity_mapping = {'Regular': 0, 'Exclusive': 1}
-    df['Exclusivity'] = df['Exclusivity'].map(exclusivity_mapping)
-
-    size_category_mapping = {'Small': 0, 'Medium': 1, 'Large': 2}
-    df['SizeCategory'] = df['SizeCategory'].map(size_category_mapping)
-
-    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
-    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
-    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
+    return load_features(df)
 
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].replace([np.inf, -np.inf], np.nan)
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-
-    return df
-
-df_lego = load_data()
+df_lego, X_lego = load_data()
 
 # Función para obtener el mejor set sin repetir recomendaciones
 def obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, temas_favoritos):
@@ -72,26 +58,19 @@ def obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, t
     cursor.execute("SELECT set_id FROM recomendaciones WHERE telegram_id = %s", (str(telegram_id),))
     sets_recomendados = {row[0] for row in cursor.fetchall()}
 
-    df_filtrado = df_lego[(df_lego["USRetailPrice"] >= presupuesto_min) & 
-                           (df_lego["USRetailPrice"] <= presupuesto_max)]
+    mask = ((df_lego["USRetailPrice"] >= presupuesto_min) &
+            (df_lego["USRetailPrice"] <= presupuesto_max)).to_numpy()
 
     if "Todos" not in temas_favoritos:
-        df_filtrado = df_filtrado[df_filtrado["Theme"].isin(temas_favoritos)]
+        mask &= df_lego["Theme"].isin(temas_favoritos).to_numpy()
 
-    df_filtrado = df_filtrado[~df_filtrado["Number"].astype(str).isin(sets_recomendados)]
+    mask &= ~df_lego["Number"].astype(str).isin(sets_recomendados).to_numpy()
 
-    if df_filtrado.empty:
+    if not mask.any():
         return None
 
-    features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit', 'ResaleDemand', 
-                'AnnualPriceIncrease', 'Exclusivity', 'SizeCategory', 'PricePerPiece', 
-                'PricePerMinifig', 'YearsOnMarket']
-    
-    for col in features:
-        if col not in df_filtrado.columns:
-            df_filtrado[col] = 0  
-
-    df_filtrado["PredictedInvestmentScore"] = modelo.predict(df_filtrado[features])
+    df_filtrado = df_lego[mask].copy()
+    df_filtrado["PredictedInvestmentScore"] = modelo.predict(feature_frame(X_lego[mask], index=df_filtrado.index))
 
     return df_filtrado.sort_values(by="PredictedInvestmentScore", ascending=False).iloc[0]
 
@@ -6,6 +6,11 @@ import requests
 import os
 import numpy as np
 import pymongo
+import sys
+
+# Módulo compartido de features de la app principal
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "08_APP_U"))
+from feature_utils import load_features, feature_frame
 
 # Obtenemos la URL de la base de datos PostgreSQL desde Render
 DB_URL = os.getenv("DATABASE_URL")
@@ -41,32 +46,9 @@ def load_data():
         st.error("❌ No se encontraron datos en la colección de MongoDB.")
         st.stop()
     df = pd.DataFrame(data)
-    return preprocess_data(df)
-
-def preprocess_data(df):
-    df = df[df['USRetailPrice'] > 0].copy()
-
-    if 'Exclusivity' in df.columns:
-        exclusivity_mapping = {'Regular': 0, 'Exclusive': 1}
-        df['Exclusivity'] = df['Exclusivity'].map(exclusivity_mapping)
-
-    if 'SizeCategory' in df.columns:
-        size_category_mapping = {'Small': 0, 'Medium': 1, 'Large': 2}
-        df['SizeCategory'] = df['SizeCategory'].map(size_category_mapping)
+    return load_features(df)
 
-    # Asegurar la creación de columnas faltantes
-    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
-    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
-    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
-
-    # Llenar valores NaN o Inf con 0
-    df.replace([np.inf, -np.inf], 0, inplace=True)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-
-    return df
-
-df_lego = load_data()
+df_lego, X_lego = load_data()
 
 st.title("📢 Alerta mensual de Inversión en LEGO por Telegram")
 st.write("**Bienvenido a IronbrickML - Alertas de Inversión en LEGO**")
@@ -111,11 +93,7 @@ if st.button("💾 Alta en Alertas"):
     conn.close()
     st.success("✅ ¡Tus preferencias han sido guardadas correctamente!")
 
-features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit',
-            'ResaleDemand', 'AnnualPriceIncrease', 'Exclusivity',
-            'SizeCategory', 'PricePerPiece', 'PricePerMinifig', 'YearsOnMarket']
-
-df_lego["PredictedInvestmentScore"] = modelo.predict(df_lego[features])
+df_lego["PredictedInvestmentScore"] = modelo.predict(feature_frame(X_lego, index=df_lego.index))
 
 # Transformamos los valores de revalorización en categorías
 def clasificar_revalorizacion(score):
@@ -1,65 +1,47 @@
 import streamlit as st
 import torch
 import os
-import urllib.request
-import pandas as pd
 import json
 import asyncio
+import sys
 from model_utils import load_model
 from predict import predict
 
+# Módulos compartidos con la app principal (almacén de modelos, imágenes y fichas de sets)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "08_APP_U"))
+from model_registry import obtener_modelo
+from imagenes import servicio_imagenes, url_imagen
+from fichas import COLUMNAS_CAMARA, fichas_dataset
+
 # Intentamos solucionar el error "no running event loop" en Streamlit
 if not hasattr(asyncio, "WindowsSelectorEventLoopPolicy") and os.name == "nt":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 st.set_page_config(page_title="Identificación de Sets LEGO", layout="wide")
 
-# Definimos las rutas de archivos locales
-MODEL_PATH = "modelo_lego_final.pth"
-MAPPING_PATH = "idx_to_class.json"
-DATA_PATH = "df_lego_camera.csv"
-
-# URLs de los archivos en GitHub (raw) para descargar
-MODEL_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/modelo_lego_final.pth"
-MAPPING_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/idx_to_class.json"
-DATASET_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/df_lego_camera.csv"
-
-# Descargamos los archivos si no existen mostramos un error
-def download_file(url, path):
-    try:
-        if not os.path.exists(path):
-            st.write(f"📥 Descargando {path} desde GitHub...")
-            urllib.request.urlretrieve(url, path)
-            st.write(f"✅ {path} descargado exitosamente.")
-    except Exception as e:
-        st.error(f"❌ Error al descargar {path}: {e}")
-
-download_file(MODEL_URL, MODEL_PATH)
-download_file(MAPPING_URL, MAPPING_PATH)
-download_file(DATASET_URL, DATA_PATH)
-
-# Cargamos el modelo entrenado forzando la carga de CPU
+# Cargamos el modelo entrenado forzando la carga de CPU (desde el almacén local, se descarga y verifica solo si falta)
 try:
-    model = load_model(MODEL_PATH)
+    model_path, _ = obtener_modelo("identificador")
+    model = load_model(model_path)
 except Exception as e:
     st.error(f"❌ Error al cargar el modelo: {e}")
     model = None
 
 # Cargamos el mapeo de clases de sets de LEGO
-if os.path.exists(MAPPING_PATH):
-    with open(MAPPING_PATH, "r") as f:
+try:
+    mapping_path, _ = obtener_modelo("mapeo_identificador")
+    with open(mapping_path, "r") as f:
         idx_to_class = json.load(f)
-else:
-    st.error("❌ Error: No se encontró el archivo de mapeo idx_to_class.json.")
+except Exception as e:
+    st.error(f"❌ Error: No se pudo cargar el mapeo idx_to_class.json: {e}")
     idx_to_class = {}
 
-# Cargamos el dataset actualizado con información de sets de LEGO convirtiendo el número del set a string
-if os.path.exists(DATA_PATH):
-    df_lego = pd.read_csv(DATA_PATH)
-    df_lego["Number"] = df_lego["Number"].astype(str)
-else:
-    st.error("❌ Error: El archivo df_lego_camera.csv no se encontró.")
-    df_lego = None
+# Fichas de los sets por número (índice en memoria compartido; el CSV se descarga de GitHub si no está)
+try:
+    fichas = fichas_dataset("camara", COLUMNAS_CAMARA)
+except Exception as e:
+    st.error(f"❌ Error: No se pudo cargar df_lego_camera.csv: {e}")
+    fichas = None
 
 st.title("🧩 Identificación de Sets LEGO")
 
@@ -94,29 +76,23 @@ if uploaded_file is not None and model is not None:
             # Convertimos la predicción al número de set real
             predicted_set_number = str(idx_to_class.get(str(predicted_class), "Desconocido"))
 
-            # Obtenemos la imagen desde la URL de Brickset
-            image_url = f"https://images.brickset.com/sets/images/{predicted_set_number}-1.jpg"
-
-            # Verificamos si la imagen existe en Brickset
-            try:
-                response = urllib.request.urlopen(image_url)
-                if response.status == 200:
-                    st.image(image_url, caption=f"Imagen de Brickset: {predicted_set_number}", width=300)
-                else:
-                    st.warning(f"⚠️ No se encontró imagen en Brickset para el set {predicted_set_number}.")
-            except:
+            # Imagen de Brickset desde la caché local (se descarga una vez, con tiempo máximo)
+            image_path = servicio_imagenes().obtener(url_imagen(predicted_set_number))
+            if image_path:
+                st.image(image_path, caption=f"Imagen de Brickset: {predicted_set_number}", width=300)
+            else:
                 st.warning(f"⚠️ No se encontró imagen en Brickset para el set {predicted_set_number}.")
 
             # Buscamos información en el dataset si está disponible
-            if df_lego is not None:
-                set_info = df_lego[df_lego["Number"] == predicted_set_number]
-
-                if not set_info.empty:
-                    set_name = set_info.iloc[0].get('SetName', 'Desconocido')
-                    theme = set_info.iloc[0].get('Theme', 'Desconocido')
-                    interested_people = set_info.iloc[0].get('WantCount', 'N/A')
-                    retail_price = set_info.iloc[0].get('USRetailPrice', 'N/A')
-                    used_price = set_info.iloc[0].get('BrickLinkSoldPriceUsed', 'N/A')
+            if fichas is not None:
+                set_info = fichas.ficha(predicted_set_number)
+
+                if set_info is not None:
+                    set_name = set_info.get('SetName', 'Desconocido')
+                    theme = set_info.get('Theme', 'Desconocido')
+                    interested_people = set_info.get('WantCount', 'N/A')
+                    retail_price = set_info.get('USRetailPrice', 'N/A')
+                    used_price = set_info.get('BrickLinkSoldPriceUsed', 'N/A')
 
                     # Mostrar información del set
                     st.subheader(f"🔍 Set identificado: {set_name} ({predicted_set_number})")
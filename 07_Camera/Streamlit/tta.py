@@ -1,5 +1,15 @@
+import math
+import os
+import torch
+import torch.nn.functional as F
 import torchvision.transforms as transforms
 
+# Modo de TTA: "aleatorio" (transformaciones aleatorias de PIL, el comportamiento original) o "determinista"
+# (vistas fijas como operaciones de tensor sobre el lote ya redimensionado). El determinista es más rápido y
+# reproducible, pero solo debe ser el modo por defecto cuando bench_tta.py muestre el mismo acierto con el
+# modelo real
+TTA_MODO = os.getenv("IRONBRICK_TTA_MODO", "aleatorio")
+
 # 🔥 Definir Test Time Augmentation (TTA)
 tta_transforms = [
     transforms.RandomRotation(15),
@@ -17,3 +27,63 @@ def apply_tta(image, num_tta=5):
             img = transform(img)
         augmented_images.append(img)
     return augmented_images
+
+
+# Vistas fijas del modo determinista, en orden: con num_tta = n se usan las n primeras (si se piden más
+# vistas de las que hay, se repiten desde el principio).
+# (volteo horizontal, giro en grados, escala del recorte, desplazamiento x, desplazamiento y)
+VISTAS_DETERMINISTAS = [
+    (True, 0, 1.0, 0.0, 0.0),      # volteo horizontal
+    (False, 10, 1.0, 0.0, 0.0),    # giro de 10º
+    (False, -10, 1.0, 0.0, 0.0),   # giro de -10º
+    (False, 0, 0.9, 0.0, 0.0),     # recorte central del 90%
+    (True, 0, 0.9, 0.0, 0.0),      # volteo + recorte central
+    (False, 0, 0.85, -0.1, -0.1),  # recorte arriba a la izquierda
+    (False, 0, 0.85, 0.1, 0.1),    # recorte abajo a la derecha
+    (True, 10, 1.0, 0.0, 0.0),     # volteo + giro de 10º
+    (True, -10, 1.0, 0.0, 0.0),    # volteo + giro de -10º
+    (False, 0, 0.85, 0.1, -0.1),   # recorte arriba a la derecha
+]
+
+# Rejillas de muestreo ya calculadas: (num_tta, alto, ancho, dispositivo) -> tensor (num_tta, alto, ancho, 2)
+_rejillas = {}
+
+
+def matrices_tta(num_tta):
+    """Matrices afines (num_tta, 2, 3) de las vistas fijas, en coordenadas normalizadas de grid_sample."""
+    matrices = []
+    for i in range(num_tta):
+        volteo, grados, escala, dx, dy = VISTAS_DETERMINISTAS[i % len(VISTAS_DETERMINISTAS)]
+        angulo = math.radians(grados)
+        signo = -1.0 if volteo else 1.0
+        # Cada punto de la salida se toma del punto girado, escalado y desplazado de la entrada
+        matrices.append([[signo * escala * math.cos(angulo), -escala * math.sin(angulo), dx],
+                         [signo * escala * math.sin(angulo), escala * math.cos(angulo), dy]])
+    return torch.tensor(matrices, dtype=torch.float32)
+
+
+def _rejilla(num_tta, alto, ancho, device):
+    clave = (num_tta, alto, ancho, str(device))
+    if clave not in _rejillas:
+        _rejillas[clave] = F.affine_grid(matrices_tta(num_tta), (num_tta, 3, alto, ancho),
+                                         align_corners=False).to(device)
+    return _rejillas[clave]
+
+
+def tta_tensor(batch, num_tta=5):
+    """
+    Vistas deterministas de un lote ya redimensionado y normalizado (B, 3, H, W).
+
+    Devuelve (B * (1 + num_tta), 3, H, W): para cada imagen, la original seguida de sus num_tta vistas.
+    Todas las vistas salen de un único grid_sample con rejillas precalculadas; fuera de la imagen se rellena
+    con ceros, que tras la normalización es el color medio.
+    """
+    if num_tta == 0:
+        return batch
+    b, c, alto, ancho = batch.shape
+    rejilla = _rejilla(num_tta, alto, ancho, batch.device)
+    entrada = batch.unsqueeze(1).expand(b, num_tta, c, alto, ancho).reshape(b * num_tta, c, alto, ancho)
+    vistas = F.grid_sample(entrada, rejilla.repeat(b, 1, 1, 1), mode="bilinear",
+                           padding_mode="zeros", align_corners=False)
+    vistas = vistas.reshape(b, num_tta, c, alto, ancho)
+    return torch.cat([batch.unsqueeze(1), vistas], dim=1).reshape(b * (1 + num_tta), c, alto, ancho)
@@ -0,0 +1,127 @@
+"""
+Motor por lotes de la alerta mensual de Telegram.
+
+En lugar de una consulta y un filtrado por usuario, se cargan todos los usuarios y todo el historial
+de recomendaciones en dos consultas y se resuelve el mejor set no recomendado de cada usuario con
+operaciones vectorizadas sobre el catálogo ya puntuado (ver scoring.py).
+
+Funciona con una conexión de psycopg2 (PostgreSQL) o de sqlite3 como sustituto local.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+
+
+def _placeholder(conn):
+    return "?" if isinstance(conn, sqlite3.Connection) else "%s"
+
+
+def cargar_usuarios(conn):
+    """Devuelve todos los usuarios suscritos en un DataFrame."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT telegram_id, presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios")
+    return pd.DataFrame(cursor.fetchall(),
+                        columns=["telegram_id", "presupuesto_min", "presupuesto_max", "temas_favoritos"])
+
+
+def cargar_historial(conn):
+    """Devuelve todas las recomendaciones ya enviadas (telegram_id, set_id) en una sola consulta."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT telegram_id, set_id FROM recomendaciones")
+    return pd.DataFrame(cursor.fetchall(), columns=["telegram_id", "set_id"])
+
+
+def guardar_recomendaciones(conn, recomendaciones):
+    """
+    Registra en bloque los pares (telegram_id, set_id) enviados para no repetirlos el mes siguiente.
+
+    Los pares ya registrados se ignoran gracias al índice único (telegram_id, set_id) de la migración 3.
+    """
+    if not recomendaciones:
+        return
+    p = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.executemany(f"INSERT INTO recomendaciones (telegram_id, set_id) VALUES ({p}, {p}) ON CONFLICT DO NOTHING",
+                       [(str(telegram_id), str(set_id)) for telegram_id, set_id in recomendaciones])
+    conn.commit()
+
+
+def recomendar_lote(df_scored, usuarios, historial, tamano_bloque=2_000):
+    """
+    Resuelve el mejor set no recomendado para cada usuario.
+
+    df_scored: catálogo ordenado de mayor a menor PredictedInvestmentScore (salida de score_catalogue).
+    usuarios: DataFrame con telegram_id, presupuesto_min, presupuesto_max, temas_favoritos ("A,B" o "Todos").
+    historial: DataFrame con telegram_id, set_id de las recomendaciones ya enviadas.
+
+    Se construye por bloques de usuarios una matriz booleana usuarios x catálogo con las condiciones de
+    presupuesto, tema y "no enviado"; como el catálogo está ordenado por puntuación, el primer True de
+    cada fila es la recomendación. Las condiciones se combinan en dos buffers reutilizados entre bloques
+    (con out=), así que la memoria máxima es 2 x tamano_bloque x catálogo bytes (unos 18 MB con 2.000
+    usuarios y 9.000 sets).
+
+    Devuelve un dict telegram_id -> posición en df_scored del set recomendado, o None si no hay ninguno.
+    """
+    ids = usuarios["telegram_id"].astype(str).to_numpy()
+    resultado = dict.fromkeys(ids)
+    if len(ids) == 0 or df_scored.empty:
+        return resultado
+
+    precios = df_scored["USRetailPrice"].to_numpy(dtype=float)
+    codigos_tema, temas = pd.factorize(df_scored["Theme"])
+    codigos_set, numeros = pd.factorize(df_scored["Number"].astype(str))
+
+    # Matriz de temas favoritos: una fila por combinación distinta de temas
+    codigos_favoritos, combinaciones = pd.factorize(usuarios["temas_favoritos"].fillna("Todos").astype(str))
+    indice_tema = {tema: i for i, tema in enumerate(temas)}
+    temas_ok = np.zeros((len(combinaciones), len(temas)), dtype=bool)
+    for fila, combinacion in enumerate(combinaciones):
+        favoritos = combinacion.split(",")
+        if "Todos" in favoritos:
+            temas_ok[fila] = True
+        else:
+            temas_ok[fila, [indice_tema[t] for t in favoritos if t in indice_tema]] = True
+
+    # Historial como pares (fila de usuario, posición en el catálogo): un set repetido en el catálogo
+    # aparece en todas sus posiciones
+    fila_usuario = pd.Series(np.arange(len(ids)), index=ids)
+    fila_usuario = fila_usuario[~fila_usuario.index.duplicated()]
+    filas_hist = historial["telegram_id"].astype(str).map(fila_usuario).to_numpy(dtype=float)
+    sets_hist = numeros.get_indexer(historial["set_id"].astype(str))
+    validos = ~np.isnan(filas_hist) & (sets_hist >= 0)
+    filas_hist = filas_hist[validos].astype(np.int64)
+    sets_hist = sets_hist[validos]
+    posiciones_set = np.argsort(codigos_set, kind="stable")
+    limites = np.searchsorted(codigos_set[posiciones_set], np.arange(len(numeros) + 1))
+    repeticiones = limites[sets_hist + 1] - limites[sets_hist]
+    desplazamiento = np.arange(repeticiones.sum()) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    pos_hist = posiciones_set[np.repeat(limites[sets_hist], repeticiones) + desplazamiento]
+    filas_hist = np.repeat(filas_hist, repeticiones)
+    orden = np.argsort(filas_hist, kind="stable")
+    filas_hist, pos_hist = filas_hist[orden], pos_hist[orden]
+
+    minimos = usuarios["presupuesto_min"].to_numpy(dtype=float)
+    maximos = usuarios["presupuesto_max"].to_numpy(dtype=float)
+
+    filas_bloque = min(tamano_bloque, len(ids))
+    buffer_ok = np.empty((filas_bloque, len(precios)), dtype=bool)
+    buffer_aux = np.empty_like(buffer_ok)
+
+    for inicio in range(0, len(ids), tamano_bloque):
+        fin = min(inicio + tamano_bloque, len(ids))
+        ok, aux = buffer_ok[:fin - inicio], buffer_aux[:fin - inicio]
+        np.greater_equal(precios, minimos[inicio:fin, None], out=ok)
+        np.less_equal(precios, maximos[inicio:fin, None], out=aux)
+        np.logical_and(ok, aux, out=ok)
+        np.take(temas_ok[codigos_favoritos[inicio:fin]], codigos_tema, axis=1, out=aux)
+        np.logical_and(ok, aux, out=ok)
+
+        desde, hasta = np.searchsorted(filas_hist, [inicio, fin])
+        ok[filas_hist[desde:hasta] - inicio, pos_hist[desde:hasta]] = False
+
+        primero = ok.argmax(axis=1)
+        hay = ok[np.arange(fin - inicio), primero]
+        for telegram_id, posicion in zip(ids[inicio:fin][hay], primero[hay]):
+            resultado[telegram_id] = int(posicion)
+
+    return resultado
@@ -1,20 +1,26 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-import requests
 import os
 import pymongo
-import psycopg2
-import pickle
-import itertools
-import matplotlib.pyplot as plt
-import torch
-import urllib.request
 import json
 import asyncio
-from model_utils import load_model
+import time
 from predict import predict
+from feature_utils import load_features
+from scoring import score_catalogue
+from db import get_db_connection
+from migrations import aplicar_migraciones
+from mongo_sync import CatalogoSync
+from mongo_loader import COLUMNAS_RECOMENDADOR
+from inversiones import encontrar_mejores_inversiones
+from frontera import FronteraCarteras
+from datasets import cargar_dataset
+from model_registry import obtener_modelo
+from servidor_modelos import cargar_modelo
+from embeddings import INDICE_DIR, IndiceEmbeddings, extraer_embeddings
+from imagenes import servicio_imagenes, url_imagen
+from fichas import COLUMNAS_CAMARA, fichas_dataset
+from retirados import (CSV_PATH as RETIRADOS_CSV_PATH, MODELO_2Y_PATH as RETIRADOS_MODELO_2Y_PATH,
+                       MODELO_5Y_PATH as RETIRADOS_MODELO_5Y_PATH, cargar_retirados, rentabilidad_por_tema)
 from streamlit_option_menu import option_menu
 from base64 import b64encode
 
@@ -69,85 +75,48 @@ mongo_client = init_mongo_connection()
 mongo_db = mongo_client[st.secrets["mongo"]["db"]]
 mongo_collection = mongo_db[st.secrets["mongo"]["collection"]]
 
-# Conexión a PostgreSQL
-DB_URL = os.getenv("DATABASE_URL")
-
-def get_db_connection():
-    return psycopg2.connect(DB_URL, sslmode="require")
-
+# Conexión a PostgreSQL (pool compartido, ver db.py)
 def inicializar_tablas():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS usuarios (
-        telegram_id TEXT PRIMARY KEY,
-        presupuesto_min INTEGER,
-        presupuesto_max INTEGER,
-        temas_favoritos TEXT
-    )
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS recomendaciones (
-        id SERIAL PRIMARY KEY,
-        telegram_id TEXT,
-        set_id TEXT
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    # Las tablas y sus índices se crean y actualizan con las migraciones versionadas (ver migrations.py)
+    with get_db_connection() as conn:
+        aplicar_migraciones(conn)
 
 # 🔥 Crear tablas automáticamente al arrancar
 inicializar_tablas()
 
-# Cargar modelo de predicción
-modelo_url = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/05_Streamlit/models/stacking_model.pkl"
-
+# Cargar modelo de predicción: del servidor de modelos si IRONBRICK_SERVIDOR_MODELOS está definido y, si no,
+# desde el almacén local de modelos (se descarga y verifica solo si falta)
 @st.cache_resource
 def load_model():
-    modelo_path = "/tmp/stacking_model.pkl"
-    if not os.path.exists(modelo_path):
-        response = requests.get(modelo_url)
-        with open(modelo_path, "wb") as f:
-            f.write(response.content)
-    return joblib.load(modelo_path)
+    # El hash SHA-256 del fichero identifica la versión del modelo para la caché de puntuaciones
+    return cargar_modelo("stacking")
 
-modelo = load_model()
+modelo, modelo_version = load_model()
 
-# Cargar datos desde MongoDB
-@st.cache_data(ttl=600)
-def load_data():
-    data = list(mongo_collection.find({}, {"_id": 0}))
-    if not data:
+# Copia en memoria del catálogo de MongoDB que solo se actualiza con los documentos cambiados.
+# Solo se piden las columnas del recomendador y se guardan tipadas (float32/int16/categorías)
+@st.cache_resource
+def init_catalogo_sync():
+    return CatalogoSync(mongo_collection, columnas=COLUMNAS_RECOMENDADOR)
+
+# Preprocesado y puntuación del catálogo, una vez por versión del catálogo sincronizado. Solo se guarda la
+# versión actual: al cambiar la versión se descarta la anterior, y load_features sin origen no guarda nada
+# en su propia caché, así que un proceso largo no acumula una copia del catálogo por versión. Se vuelve a
+# puntuar el catálogo entero porque el preprocesado rellena los huecos con la mediana de todo el catálogo:
+# un documento cambiado puede cambiar las variables de otros sets.
+@st.cache_data(max_entries=1)
+def puntuar_catalogo(version, _sync):
+    df = _sync.dataframe()
+    if df.empty:
         st.error("❌ No se encontraron datos en MongoDB.")
         st.stop()
-    df = pd.DataFrame(data)
-    return preprocess_data(df)
-
-def preprocess_data(df):
-    df = df[df['USRetailPrice'] > 0].copy()
-
-    if 'Exclusivity' in df.columns:
-        exclusivity_mapping = {'Regular': 0, 'Exclusive': 1}
-        df['Exclusivity'] = df['Exclusivity'].map(exclusivity_mapping)
+    df_lego, X_lego = load_features(df)
+    return score_catalogue(df_lego, X_lego, modelo, modelo_version)
 
-    if 'SizeCategory' in df.columns:
-        size_category_mapping = {'Small': 0, 'Medium': 1, 'Large': 2}
-        df['SizeCategory'] = df['SizeCategory'].map(size_category_mapping)
-
-    # Asegurar la creación de columnas faltantes
-    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
-    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
-    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
-
-    # Llenar valores NaN o Inf con 0
-    df.replace([np.inf, -np.inf], 0, inplace=True)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-
-    return df
+def load_data():
+    sync = init_catalogo_sync()
+    # id(sync) distingue las versiones de distintas instancias si se limpia la caché de recursos
+    return puntuar_catalogo((id(sync), sync.sincronizar()), sync)
 
 df_lego = load_data()
 
@@ -235,7 +204,7 @@ elif app == "Recomendador de Inversión en sets Actuales":
     temas_opciones = ["Todos"] + temas_unicos
     selected_themes = st.multiselect("🛒 Selecciona los Themes de Interés", temas_opciones, default=["Todos"])
 
-    # 📌 Filtrar por presupuesto y temas
+    # 📌 Filtrar por presupuesto y temas (el catálogo ya viene puntuado y ordenado)
     df_filtrado = df_lego[(df_lego["USRetailPrice"] >= presupuesto_min) & (df_lego["USRetailPrice"] <= presupuesto_max)]
 
     if "Todos" not in selected_themes:
@@ -246,11 +215,7 @@ elif app == "Recomendador de Inversión en sets Actuales":
         st.error("❌ No hay sets disponibles con los filtros seleccionados.")
         st.stop()
 
-    # 📌 Funciones auxiliares para obtener imágenes y colores
-    def get_lego_image(set_number):
-        return f"https://img.bricklink.com/ItemImage/SN/0/{set_number}-1.png"
-
-
+    # 📌 Función auxiliar para obtener colores
     def get_color(score):
         if score > 12:
             return "#00736d"  # Verde
@@ -263,121 +228,58 @@ elif app == "Recomendador de Inversión en sets Actuales":
 
     # # 📌 Generar Predicciones y Mostrar Top 3 Sets
     if st.button("Generar Predicciones"):
-        if "PredictedInvestmentScore" not in df_filtrado.columns:
-            features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit',
-                        'ResaleDemand', 'AnnualPriceIncrease', 'Exclusivity',
-                        'SizeCategory', 'PricePerPiece', 'PricePerMinifig', 'YearsOnMarket']
-
-#         # 📌 Asegurar que hay datos antes de predecir
-            if df_filtrado.shape[0] == 0:
-                st.error("❌ No hay sets disponibles para predecir. Prueba ajustando los filtros.")
-                st.stop()
-
-            df_filtrado = df_filtrado.copy()
-            df_filtrado.loc[:, "PredictedInvestmentScore"] = modelo.predict(df_filtrado[features])
-            df_filtrado = df_filtrado[df_filtrado["PredictedInvestmentScore"] > 0]
-
-            if df_filtrado.shape[0] < 3:
-                st.warning("⚠️ Menos de 3 sets cumplen con los criterios seleccionados. Mostrando los disponibles.")
-
-            df_filtrado = df_filtrado.sort_values(by="PredictedInvestmentScore", ascending=False).head(3)
-
-            st.subheader("📊 Top 3 Sets Más Rentables")
-            if not df_filtrado.empty:
-                cols = st.columns(len(df_filtrado))
-                for col, (_, row) in zip(cols, df_filtrado.iterrows()):
-                    with col:
-                        color = get_color(row["PredictedInvestmentScore"])
-                        st.markdown(f"""
-                            <div style='background-color:{color}; padding:10px; border-radius:5px; text-align:center; margin-bottom:10px;'>
-                                <strong>{row['SetName']}</strong>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        image_url = get_lego_image(row["Number"])
-                        st.image(image_url, caption=row["SetName"], use_container_width=True)
-                        st.write(f"**Tema:** {row['Theme']}")
-                        st.write(f"💰 **Precio:** ${row['USRetailPrice']:.2f}")
-                        url_lego = f"https://www.lego.com/en-us/product/{row['Number']}"
-                        st.markdown(f'<a href="{url_lego}" target="_blank"><button style="background-color:#ff4b4b; border:none; padding:10px; border-radius:5px; cursor:pointer; font-size:14px;">🛒 Comprar en LEGO</button></a>', unsafe_allow_html=True)
-                        st.write("---")
+        df_filtrado = df_filtrado[df_filtrado["PredictedInvestmentScore"] > 0]
+
+        if df_filtrado.shape[0] < 3:
+            st.warning("⚠️ Menos de 3 sets cumplen con los criterios seleccionados. Mostrando los disponibles.")
+
+        df_filtrado = df_filtrado.head(3)
+
+        st.subheader("📊 Top 3 Sets Más Rentables")
+        if not df_filtrado.empty:
+            # Imágenes de BrickLink desde la caché local; se descargan en paralelo con un tiempo máximo
+            servicio = servicio_imagenes()
+            servicio.precargar([url_imagen(n, "bricklink") for n in df_filtrado["Number"]], presupuesto=2.0)
+            cols = st.columns(len(df_filtrado))
+            for col, (_, row) in zip(cols, df_filtrado.iterrows()):
+                with col:
+                    color = get_color(row["PredictedInvestmentScore"])
+                    st.markdown(f"""
+                        <div style='background-color:{color}; padding:10px; border-radius:5px; text-align:center; margin-bottom:10px;'>
+                            <strong>{row['SetName']}</strong>
+                        </div>
+                    """, unsafe_allow_html=True)
+                    imagen = servicio.para_mostrar(url_imagen(row["Number"], "bricklink"))
+                    if imagen:
+                        st.image(imagen, caption=row["SetName"], use_container_width=True)
+                    else:
+                        st.caption("🖼️ Imagen no disponible")
+                    st.write(f"**Tema:** {row['Theme']}")
+                    st.write(f"💰 **Precio:** ${row['USRetailPrice']:.2f}")
+                    url_lego = f"https://www.lego.com/en-us/product/{row['Number']}"
+                    st.markdown(f'<a href="{url_lego}" target="_blank"><button style="background-color:#ff4b4b; border:none; padding:10px; border-radius:5px; cursor:pointer; font-size:14px;">🛒 Comprar en LEGO</button></a>', unsafe_allow_html=True)
+                    st.write("---")
 
 # ✅ Muestra la página seleccionada
 #if st.session_state.page == "Recomendador de Inversión en sets Retirados":
 
 elif app == "Recomendador de Inversión en sets Retirados":
-    # Obtenemos la ruta del archivo CSV
-    BASE_DIR = os.getcwd()
-    CSV_PATH = os.path.join(BASE_DIR, "04_Extra/APP/data/scraped_lego_data.csv")
-
-    # Verificamos si el archivo existe
-    if not os.path.exists(CSV_PATH):
+    # Verificamos que existen el histórico de precios y los modelos
+    if not os.path.exists(RETIRADOS_CSV_PATH):
         st.error("❌ ERROR: El archivo CSV NO EXISTE en la ruta especificada.")
         st.stop()
+    if not os.path.exists(RETIRADOS_MODELO_2Y_PATH) or not os.path.exists(RETIRADOS_MODELO_5Y_PATH):
+        st.error("❌ No se encontraron los modelos .pkl en la carpeta 'models/'.")
+        st.stop()
 
-    # Cargamos el archivo CSV
+    # Sets con predicciones: se calculan una vez por versión del CSV y de los modelos (artefacto en disco y memoria)
     try:
-        df = pd.read_csv(CSV_PATH)
+        df_identification, _ = cargar_retirados()
     except Exception as e:
-        st.error(f"❌ ERROR al leer el archivo CSV: {e}")
+        st.error(f"❌ ERROR al preparar los sets retirados: {e}")
         st.stop()
 
-    # Procesamos el dataset
-    df["PriceDate"] = pd.to_datetime(df["PriceDate"], errors='coerce')
-    df = df.dropna(subset=["PriceDate"])
-    df_sorted = df.sort_values(by=['Number', 'PriceDate'])
-    df_sorted['PriceIndex'] = df_sorted.groupby('Number').cumcount()
-    df_transformed = df_sorted.pivot(index=['Number', 'SetName', 'Theme', 'Year', 'Pieces',
-                                            'RetailPriceUSD', 'CurrentValueNew', 'ForecastValueNew2Y',
-                                            'ForecastValueNew5Y'],
-                                    columns='PriceIndex', values='PriceValue').reset_index()
-    df_transformed.columns = [f'Price_{col+1}' if isinstance(col, int) else col for col in df_transformed.columns]
-    price_columns = [f'Price_{i}' for i in range(1, 13)]
-    df_transformed = df_transformed[['Number', 'SetName', 'Theme', 'Year', 'Pieces', 'RetailPriceUSD', 'CurrentValueNew', 'ForecastValueNew2Y', 'ForecastValueNew5Y'] + price_columns]
-    df_transformed[price_columns] = df_transformed[price_columns].fillna(0)
-    df_transformed.loc[:, 'Pieces'] = df_transformed['Pieces'].fillna(0)
-    df_transformed.loc[:, 'RetailPriceUSD'] = df_transformed['RetailPriceUSD'].fillna(0)
-    df_transformed.loc[df_transformed['CurrentValueNew'] == 0, 'CurrentValueNew'] = df_transformed['RetailPriceUSD']
-    df_transformed = df_transformed.dropna()
-
-    # Cargamos modelos de predicción
-    pkl_path_2y = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_2y.pkl")
-    pkl_path_5y = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_5y.pkl")
-
-    if not os.path.exists(pkl_path_2y) or not os.path.exists(pkl_path_5y):
-        st.error("❌ No se encontraron los modelos .pkl en la carpeta 'models/'.")
-        st.stop()
-
-    @st.cache_resource
-    def load_model(filename):
-        with open(filename, 'rb') as file:
-            return pickle.load(file)
-
-    model_2y = load_model(pkl_path_2y)
-    model_5y = load_model(pkl_path_5y)
-
-    # Generamos predicciones
-    df_identification = df_transformed[['Number', 'SetName', 'Theme', 'CurrentValueNew']].copy()
-    df_model = df_transformed.drop(columns=['Number', 'SetName', 'Theme'], errors='ignore').copy()
-    df_model = pd.get_dummies(df_model, drop_first=True)
-    expected_columns = model_2y.feature_names_in_
-    for col in expected_columns:
-        if col not in df_model.columns:
-            df_model[col] = 0
-    df_model = df_model[expected_columns]
-    df_identification.loc[:, 'PredictedValue2Y'] = model_2y.predict(df_model)
-    df_identification.loc[:, 'PredictedValue5Y'] = model_5y.predict(df_model)
-
-    # Calculamos rentabilidad porcentual por tema
-    df_identification["Rentabilidad2Y"] = ((df_identification["PredictedValue2Y"] - df_identification["CurrentValueNew"]) / df_identification["CurrentValueNew"]) * 100
-    df_identification["Rentabilidad5Y"] = ((df_identification["PredictedValue5Y"] - df_identification["CurrentValueNew"]) / df_identification["CurrentValueNew"]) * 100
-
-    df_rentabilidad_temas = df_identification.groupby("Theme").agg(
-        TotalSets=('Theme', 'count'),
-        Rentabilidad2Y=('Rentabilidad2Y', 'mean'),
-        Rentabilidad5Y=('Rentabilidad5Y', 'mean')
-    ).reset_index()
-
-    df_rentabilidad_temas = df_rentabilidad_temas.sort_values(by="Rentabilidad5Y", ascending=False)
+    df_rentabilidad_temas = rentabilidad_por_tema(df_identification)
 
     # Abrir la imagen en modo binario
     with open("08_APP_U/IRONBRICK_APP_2_PEQ.png", "rb") as img_file:
@@ -414,42 +316,54 @@ elif app == "Recomendador de Inversión en sets Retirados":
         temas_seleccionados = temas_disponibles
 
     # Filtramos por presupuesto
-    presupuesto = st.slider("Presupuesto máximo ($)", min_value=100, max_value=2000, value=200, step=10)
+    PRESUPUESTO_MAX = 2000
+    presupuesto = st.slider("Presupuesto máximo ($)", min_value=100, max_value=PRESUPUESTO_MAX, value=200, step=10)
 
     # Filtramos el dataframe
-    df_filtrado = df_identification[df_identification["Theme"].isin(temas_seleccionados)]
-    df_filtrado = df_filtrado[df_filtrado["CurrentValueNew"] <= presupuesto]
-
-    # Optimización: Seleccionamos los 10 mejores sets primero
-    df_top_sets = df_filtrado.sort_values(by="PredictedValue5Y", ascending=False).head(10)
-
-    # Buscamos combinaciones óptimas de inversión
-    def encontrar_mejores_inversiones(df, presupuesto, num_opciones=3):
-        sets_lista = df[['SetName', 'CurrentValueNew', 'PredictedValue2Y', 'PredictedValue5Y']].values.tolist()
-        mejores_combinaciones = []
-
-        for r in range(1, 5):  # Limitamos combinaciones a 1-4 sets para optimizar
-            for combinacion in itertools.combinations(sets_lista, r):
-                total_precio = sum(item[1] for item in combinacion)
-                retorno_2y = sum(item[2] for item in combinacion)
-                retorno_5y = sum(item[3] for item in combinacion)
-
-                if total_precio <= presupuesto:
-                    mejores_combinaciones.append((combinacion, retorno_2y, retorno_5y, total_precio))
+    df_temas = df_identification[df_identification["Theme"].isin(temas_seleccionados)]
+    df_filtrado = df_temas[df_temas["CurrentValueNew"] <= presupuesto]
+
+    # Frontera de carteras: se calcula una vez por selección de temas y se consulta por presupuesto al instante
+    # (solo se guardan las últimas selecciones, para no acumular una frontera por combinación de temas)
+    @st.cache_data(max_entries=8)
+    def calcular_frontera(df, presupuesto_max):
+        return FronteraCarteras(df, presupuesto_max)
+
+    frontera = calcular_frontera(df_temas, PRESUPUESTO_MAX)
+    puntos_frontera = frontera.puntos(presupuesto)
+
+    st.subheader("📈 Frontera de carteras")
+    st.write("Combinaciones de sets que no mejora ninguna otra: ninguna cuesta menos con igual o más valor estimado "
+             "a 2 y 5 años y sin más sets. Se calculan con los sets de más valor de los temas elegidos.")
+    if puntos_frontera.empty:
+        st.warning("⚠️ No hay combinaciones dentro de tu presupuesto.")
+    else:
+        st.scatter_chart(puntos_frontera, x="Coste", y=["Valor2Y", "Valor5Y"])
+        for i, (combo, ret_2y, ret_5y, precio) in enumerate(frontera.mejores(presupuesto), 1):
+            st.write(f"**{i}.** 💵 ${precio:.2f} → 📈 ${ret_2y:.2f} (2 años) · 🚀 ${ret_5y:.2f} (5 años) · "
+                     + ", ".join(f"{set_name} ({set_number})" for set_name, _, _, _, set_number in combo))
 
-        # Ordenamos por rentabilidad en 5 años (descendente)
-        mejores_combinaciones.sort(key=lambda x: x[2], reverse=True)
-        return mejores_combinaciones[:num_opciones]
+    # Número máximo de sets por combinación: con más de 4 la búsqueda exacta deja de ser interactiva
+    # (de 0,3 a 1 s con 5.000 sets)
+    max_sets = st.slider("Máximo de sets por combinación", min_value=1, max_value=4, value=4)
 
+    # Búsqueda exacta sobre todo el catálogo filtrado (ver inversiones.py), una vez por temas, presupuesto
+    # y número de sets
+    @st.cache_data(max_entries=32)
+    def buscar_inversiones(df, presupuesto, max_sets):
+        return encontrar_mejores_inversiones(df, presupuesto, max_sets=max_sets)
 
     # Mostramos inversiones óptimas con imágenes y texto centrado
     if st.button("🔍 Buscar inversiones óptimas"):
-        opciones = encontrar_mejores_inversiones(df_top_sets, presupuesto)
+        opciones = buscar_inversiones(df_filtrado, presupuesto, max_sets)
 
         if not opciones:
             st.warning("⚠️ No se encontraron combinaciones dentro de tu presupuesto.")
         else:
             st.subheader("💡 Mejores opciones de inversión")
+            servicio = servicio_imagenes()
+            servicio.precargar([url_imagen(c[4], "brickset") for combo, _, _, _ in opciones for c in combo],
+                               presupuesto=2.0)
             for i, (combo, ret_2y, ret_5y, precio) in enumerate(opciones, 1):
                 st.write(f"**Opción {i}:**")
                 st.write(f"💵 **Total de la inversión:** ${precio:.2f}")
@@ -459,12 +373,14 @@ elif app == "Recomendador de Inversión en sets Retirados":
 
                 # Mostramos sets con imágenes y datos centrados
                 cols = st.columns(len(combo))  # Crear columnas dinámicas para mostrar imágenes
-                for col, (set_name, price, _, _) in zip(cols, combo):
-                    set_number = df_top_sets[df_top_sets["SetName"] == set_name]["Number"].values[0]  # Obtener el número del set
-                    image_url = f"https://images.brickset.com/sets/images/{set_number}.jpg"
+                for col, (set_name, price, _, _, set_number) in zip(cols, combo):
+                    imagen = servicio.para_mostrar(url_imagen(set_number, "brickset"))
 
                     with col:
-                        st.image(image_url, use_container_width=True)  # Mostrar la imagen
+                        if imagen:
+                            st.image(imagen, use_container_width=True)  # Mostrar la imagen
+                        else:
+                            st.caption("🖼️ Imagen no disponible")
                         st.markdown(
                             f"""
                             <div style="text-align: center;">
@@ -522,43 +438,29 @@ elif app == "Alertas de Telegram":
 
     if st.button("💾 Alta en Alertas"):
         temas_str = ",".join(temas_favoritos)
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            # La tabla usuarios la crean las migraciones al arrancar (inicializar_tablas)
+            cursor.execute("""
+            INSERT INTO usuarios (telegram_id, presupuesto_min, presupuesto_max, temas_favoritos)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (telegram_id) DO UPDATE
+            SET presupuesto_min = EXCLUDED.presupuesto_min,
+                presupuesto_max = EXCLUDED.presupuesto_max,
+                temas_favoritos = EXCLUDED.temas_favoritos;
+            """, (telegram_id, presupuesto_min, presupuesto_max, temas_str))
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            telegram_id TEXT PRIMARY KEY,
-            presupuesto_min INTEGER,
-            presupuesto_max INTEGER,
-            temas_favoritos TEXT
-        )
-        """)
-
-        cursor.execute("""
-        INSERT INTO usuarios (telegram_id, presupuesto_min, presupuesto_max, temas_favoritos)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (telegram_id) DO UPDATE
-        SET presupuesto_min = EXCLUDED.presupuesto_min,
-            presupuesto_max = EXCLUDED.presupuesto_max,
-            temas_favoritos = EXCLUDED.temas_favoritos;
-        """, (telegram_id, presupuesto_min, presupuesto_max, temas_str))
-
-        conn.commit()
-        conn.close()
+            conn.commit()
 
         # Enviamos  mensaje de confirmación y primera recomendación por Telegram
         from bot_telegram import confirmar_suscripcion, enviar_recomendacion_manual
         confirmar_suscripcion(telegram_id)    
-        enviar_recomendacion_manual(telegram_id)
+        # Con el catálogo ya puntuado de la app: el bot no carga ni puntúa el suyo dentro de esta petición
+        enviar_recomendacion_manual(telegram_id, df_lego=df_lego)
 
         st.success("✅ ¡Tus preferencias han sido guardadas correctamente!")
 
-    features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit',
-            'ResaleDemand', 'AnnualPriceIncrease', 'Exclusivity',
-            'SizeCategory', 'PricePerPiece', 'PricePerMinifig', 'YearsOnMarket']
-
-    df_lego["PredictedInvestmentScore"] = modelo.predict(df_lego[features])
-
     # Transformamos los valores de revalorización en categorías
     def clasificar_revalorizacion(score):
         if score > 13:
@@ -582,13 +484,13 @@ elif app == "Alertas de Telegram":
     }, inplace=True)
 
     st.write("📊 **Sets Recomendados por IronbrickML**:")
-    df_recomendados = df_lego[df_lego["PredictedInvestmentScore"] > 0].sort_values(by="PredictedInvestmentScore", ascending=False)
+    df_recomendados = df_lego[df_lego["PredictedInvestmentScore"] > 0]
     st.data_editor(df_recomendados[["Set", "Nombre", "Precio", "Tema", "Revalorización"]], disabled=True)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT telegram_id, presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios")
-    usuarios = cursor.fetchall()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT telegram_id, presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios")
+        usuarios = cursor.fetchall()
 
 
     # if usuarios:
@@ -597,7 +499,6 @@ elif app == "Alertas de Telegram":
     # else:
     #     st.warning("❌ No hay usuarios registrados.")
 
-    conn.close()
 
 # ✅ Muestra la página seleccionada
 #if st.session_state.page == "Identificador de Sets":
@@ -607,55 +508,55 @@ elif app == "Identificador de Sets":
     if not hasattr(asyncio, "WindowsSelectorEventLoopPolicy") and os.name == "nt":
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-    # Definimos las rutas de archivos locales
-    MODEL_PATH = "modelo_lego_final.pth"
-    MAPPING_PATH = "idx_to_class.json"
-    DATA_PATH = "df_lego_camera.csv"
-
-    # URLs de los archivos en GitHub (raw) para descargar
-    MODEL_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/modelo_lego_final.pth"
-    MAPPING_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/idx_to_class.json"
-    DATASET_URL = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/df_lego_camera.csv"
-
-    # Descargamos los archivos si no existen mostramos un error
-    def download_file(url, path):
-        try:
-            if not os.path.exists(path):
-                st.write(f"📥 Descargando {path} desde GitHub...")
-                urllib.request.urlretrieve(url, path)
-                st.write(f"✅ {path} descargado exitosamente.")
-        except Exception as e:
-            st.error(f"❌ Error al descargar {path}: {e}")
-
-    download_file(MODEL_URL, MODEL_PATH)
-    download_file(MAPPING_URL, MAPPING_PATH)
-    download_file(DATASET_URL, DATA_PATH)
-
-    from model_utils import load_model
+    # Identificador: del servidor de modelos si IRONBRICK_SERVIDOR_MODELOS está definido y, si no, cargado una
+    # vez por proceso desde el almacén local de modelos (se descarga y verifica solo si falta)
+    @st.cache_resource
+    def cargar_identificador():
+        return cargar_modelo("identificador")
 
-    # Cargamos el modelo entrenado correctamente
+    # Cargamos el modelo entrenado correctamente (con su versión sha256, que tiene que coincidir con la del
+    # índice de embeddings)
     try:
-        model = load_model(MODEL_PATH)  # Ahora usa la versión correcta de `load_model`
+        model, modelo_identificador_version = cargar_identificador()
     except Exception as e:
         st.error(f"❌ Error al cargar el modelo: {e}")
-        model = None
+        model, modelo_identificador_version = None, None
+
+    # Índice de embeddings en memoria, una vez por versión del modelo y del índice en disco (fecha de sus
+    # metadatos, que se escriben los últimos al guardarlo)
+    @st.cache_resource(max_entries=1)
+    def cargar_indice_embeddings(modelo_version, version_indice):
+        return IndiceEmbeddings.cargar(modelo=modelo_version)
+
+    def indice_embeddings():
+        metadatos_path = os.path.join(INDICE_DIR, "metadatos.json")
+        version_indice = os.path.getmtime(metadatos_path) if os.path.exists(metadatos_path) else None
+        try:
+            return cargar_indice_embeddings(modelo_identificador_version, version_indice)
+        except ValueError as e:
+            # Índice construido con otro modelo: sus vectores no son comparables con los del modelo actual
+            st.warning(f"{e}: no se muestran los sets parecidos hasta reconstruir el índice con el modelo actual.")
+            return None
 
     # Cargamos el mapeo de clases
-    if os.path.exists(MAPPING_PATH):
-        with open(MAPPING_PATH, "r") as f:
+    try:
+        mapping_path, _ = obtener_modelo("mapeo_identificador")
+        with open(mapping_path, "r") as f:
             idx_to_class = json.load(f)
-    else:
-        st.error("❌ Error: No se encontró el archivo de mapeo idx_to_class.json.")
+    except Exception as e:
+        st.error(f"❌ Error: No se pudo cargar el mapeo idx_to_class.json: {e}")
         idx_to_class = {}
 
 
-    # Cargamos el dataset actualizado con información de sets de LEGO convirtiendo el número del set a string
-    if os.path.exists(DATA_PATH):
-        df_lego = pd.read_csv(DATA_PATH)
-        df_lego["Number"] = df_lego["Number"].astype(str)
-    else:
-        st.error("❌ Error: El archivo df_lego_camera.csv no se encontró.")
+    # Cargamos el dataset con información de sets de LEGO (versión columnar en caché, con Number como texto)
+    # y sus fichas por número de set (índice en memoria compartido, se construye una vez por proceso)
+    try:
+        df_lego = cargar_dataset("camara")
+        fichas = fichas_dataset("camara", COLUMNAS_CAMARA)
+    except Exception as e:
+        st.error(f"❌ Error: No se pudo cargar df_lego_camera.csv: {e}")
         df_lego = None
+        fichas = None
 
 
          # Abrir la imagen en modo binario
@@ -707,29 +608,23 @@ elif app == "Identificador de Sets":
                 # Convertimos la predicción al número de set real
                 predicted_set_number = str(idx_to_class.get(str(predicted_class), "Desconocido"))
 
-                # Obtenemos la imagen desde la URL de Brickset
-                image_url = f"https://images.brickset.com/sets/images/{predicted_set_number}-1.jpg"
-
-                # Verificamos si la imagen existe en Brickset
-                try:
-                    response = urllib.request.urlopen(image_url)
-                    if response.status == 200:
-                        st.image(image_url, caption=f"Set: {predicted_set_number}", width=300)
-                    else:
-                        st.warning(f"⚠️ No se encontró imagen en Brickset para el set {predicted_set_number}.")
-                except:
+                # Imagen de Brickset desde la caché local (se descarga una vez, con tiempo máximo)
+                image_path = servicio_imagenes().obtener(url_imagen(predicted_set_number))
+                if image_path:
+                    st.image(image_path, caption=f"Set: {predicted_set_number}", width=300)
+                else:
                     st.warning(f"⚠️ No se encontró imagen en Brickset para el set {predicted_set_number}.")
 
                 # Buscamos información en el dataset si está disponible
-                if df_lego is not None:
-                    set_info = df_lego[df_lego["Number"] == predicted_set_number]
+                if fichas is not None:
+                    set_info = fichas.ficha(predicted_set_number)
 
-                    if not set_info.empty:
-                        set_name = set_info.iloc[0].get('SetName', 'Desconocido')
-                        theme = set_info.iloc[0].get('Theme', 'Desconocido')
-                        interested_people = set_info.iloc[0].get('WantCount', 'N/A')
-                        retail_price = set_info.iloc[0].get('USRetailPrice', 'N/A')
-                        used_price = set_info.iloc[0].get('BrickLinkSoldPriceUsed', 'N/A')
+                    if set_info is not None:
+                        set_name = set_info.get('SetName', 'Desconocido')
+                        theme = set_info.get('Theme', 'Desconocido')
+                        interested_people = set_info.get('WantCount', 'N/A')
+                        retail_price = set_info.get('USRetailPrice', 'N/A')
+                        used_price = set_info.get('BrickLinkSoldPriceUsed', 'N/A')
 
                         # Mostrar información del set
                         st.subheader(f"🔍 Set identificado: {set_name} ({predicted_set_number})")
@@ -743,8 +638,45 @@ elif app == "Identificador de Sets":
                 else:
                     st.error("❌ No se puede mostrar información del set porque el dataset no está disponible.")
 
+                # Sets más parecidos en el índice de embeddings (también sets que el clasificador no conoce).
+                # Necesita el modelo eager: con IRONBRICK_MODELO_OPTIMIZADO no hay acceso a la capa penúltima
+                indice = indice_embeddings()
+                if indice is not None and len(indice) and hasattr(model, "features"):
+                    from predict import dispositivo, transform
+                    consulta = extraer_embeddings(model, transform(image).unsqueeze(0).to(dispositivo(model)))
+                    with st.expander("🧭 Sets más parecidos en el índice de referencia"):
+                        for numero, similitud in indice.identificar(consulta[0], k=10)[:5]:
+                            st.write(f"**{numero}** — similitud {similitud:.2f}")
+
             except Exception as e:
                 st.error(f"❌ Error al hacer la predicción: {e}")
 
     elif uploaded_file is not None and model is None:
         st.error("❌ No se puede hacer la predicción porque el modelo no se cargó correctamente.")
+
+    # Identificación por lotes: varias fotos a la vez (por ejemplo, una estantería de cajas)
+    st.subheader("📦 Identificación por lotes")
+    st.write("Sube varias imágenes a la vez: se procesan en lotes y obtienes una tabla con el set, la confianza y su información.")
+    uploaded_files = st.file_uploader("Sube varias imágenes de sets de LEGO", type=["jpg", "png", "jpeg"],
+                                      accept_multiple_files=True, key="identificacion_lote")
+    num_tta_lote = st.slider("Vistas adicionales por imagen (TTA)", min_value=0, max_value=10, value=0,
+                             help="Más vistas mejoran la predicción a costa de tiempo.")
+
+    if uploaded_files and model is not None and st.button("🔍 Identificar imágenes"):
+        from identificar_lote import identificar_lote
+
+        with st.spinner(f"Identificando {len(uploaded_files)} imágenes..."):
+            inicio = time.perf_counter()
+            resultado = identificar_lote(uploaded_files, model, idx_to_class, df_lego, num_tta=num_tta_lote)
+            segundos = time.perf_counter() - inicio
+
+        st.success(f"✅ {len(uploaded_files)} imágenes en {segundos:.1f} s ({len(uploaded_files) / segundos:.1f} imágenes/s)")
+        st.dataframe(resultado.style.format({"Confianza": "{:.2f}%"}, na_rep="-"), use_container_width=True)
+        col_csv, col_json = st.columns(2)
+        with col_csv:
+            st.download_button("📥 Descargar CSV", resultado.to_csv(index=False), "identificacion_sets.csv", "text/csv")
+        with col_json:
+            st.download_button("📥 Descargar JSON", resultado.to_json(orient="records", force_ascii=False),
+                               "identificacion_sets.json", "application/json")
+    elif uploaded_files and model is None:
+        st.error("❌ No se puede hacer la predicción porque el modelo no se cargó correctamente.")
@@ -0,0 +1,104 @@
+"""
+Benchmark de la alerta mensual: motor por lotes (alertas.recomendar_lote) frente al bucle por usuario.
+
+Usa SQLite en memoria como sustituto local de PostgreSQL, el catálogo de data/df_lego_final_venta.csv
+(con InvestmentScore como puntuación, para no depender del modelo) y suscriptores simulados.
+
+Uso:
+    python 08_APP_U/bench_alertas.py --usuarios 100000 --muestra-legacy 2000
+"""
+import argparse
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from alertas import cargar_historial, cargar_usuarios, recomendar_lote
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "df_lego_final_venta.csv")
+
+
+def crear_bd(df_scored, n_usuarios, max_historial, seed=0):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE usuarios (telegram_id TEXT PRIMARY KEY, presupuesto_min INTEGER, "
+                   "presupuesto_max INTEGER, temas_favoritos TEXT)")
+    cursor.execute("CREATE TABLE recomendaciones (id INTEGER PRIMARY KEY, telegram_id TEXT, set_id TEXT)")
+
+    temas = df_scored["Theme"].unique()
+    ids = [str(10_000_000 + i) for i in range(n_usuarios)]
+    minimos = rng.integers(1, 20, n_usuarios) * 10
+    maximos = minimos + rng.integers(5, 50, n_usuarios) * 10
+    favoritos = ["Todos" if rng.random() < 0.4 else ",".join(rng.choice(temas, rng.integers(1, 4), replace=False))
+                 for _ in range(n_usuarios)]
+    cursor.executemany("INSERT INTO usuarios VALUES (?, ?, ?, ?)",
+                       zip(ids, minimos.tolist(), maximos.tolist(), favoritos))
+
+    numeros = df_scored["Number"].astype(str).to_numpy()
+    # Historial sesgado hacia los sets mejor puntuados, que son los que se habrían recomendado antes
+    n_hist = rng.integers(0, max_historial + 1, n_usuarios)
+    usuarios_hist = np.repeat(ids, n_hist)
+    sets_hist = numeros[np.minimum(rng.geometric(0.02, n_hist.sum()) - 1, len(numeros) - 1)]
+    cursor.executemany("INSERT INTO recomendaciones (telegram_id, set_id) VALUES (?, ?)",
+                       zip(usuarios_hist.tolist(), sets_hist.tolist()))
+    conn.commit()
+    return conn
+
+
+def recomendar_legacy(conn, df_scored, telegram_id, presupuesto_min, presupuesto_max, temas_favoritos):
+    """Misma lógica que el bucle anterior: una consulta y un filtrado completo del catálogo por usuario."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT set_id FROM recomendaciones WHERE telegram_id = ?", (str(telegram_id),))
+    sets_recomendados = {row[0] for row in cursor.fetchall()}
+
+    df_filtrado = df_scored[(df_scored["USRetailPrice"] >= presupuesto_min) &
+                            (df_scored["USRetailPrice"] <= presupuesto_max)]
+    if "Todos" not in temas_favoritos:
+        df_filtrado = df_filtrado[df_filtrado["Theme"].isin(temas_favoritos)]
+    df_filtrado = df_filtrado[~df_filtrado["Number"].astype(str).isin(sets_recomendados)]
+    if df_filtrado.empty:
+        return None
+    return df_filtrado.sort_values(by="PredictedInvestmentScore", ascending=False, kind="stable").iloc[0]["Number"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del motor por lotes de alertas")
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--max-historial", type=int, default=12, help="Meses de recomendaciones previas por usuario")
+    parser.add_argument("--muestra-legacy", type=int, default=2_000,
+                        help="Usuarios sobre los que se mide el bucle anterior (se extrapola al total)")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    df = df[df["USRetailPrice"] > 0].copy()
+    df["PredictedInvestmentScore"] = df["InvestmentScore"]
+    df_scored = df.sort_values(by="PredictedInvestmentScore", ascending=False, kind="stable")
+
+    conn = crear_bd(df_scored, args.usuarios, args.max_historial)
+    print(f"Catálogo: {len(df_scored)} sets | Usuarios: {args.usuarios} | "
+          f"Historial: {conn.execute('SELECT COUNT(*) FROM recomendaciones').fetchone()[0]} filas")
+
+    inicio = time.perf_counter()
+    usuarios = cargar_usuarios(conn)
+    historial = cargar_historial(conn)
+    t_carga = time.perf_counter() - inicio
+    mejores = recomendar_lote(df_scored, usuarios, historial)
+    t_lote = time.perf_counter() - inicio
+    print(f"Lote:   {t_lote:.2f} s en total ({t_carga:.2f} s de consultas) para {len(mejores)} usuarios")
+
+    muestra = usuarios.head(args.muestra_legacy)
+    inicio = time.perf_counter()
+    legacy = {row.telegram_id: recomendar_legacy(conn, df_scored, row.telegram_id, row.presupuesto_min,
+                                                 row.presupuesto_max, row.temas_favoritos.split(","))
+              for row in muestra.itertuples()}
+    t_legacy = time.perf_counter() - inicio
+    estimado = t_legacy / len(muestra) * len(usuarios)
+    print(f"Bucle:  {t_legacy:.2f} s para {len(muestra)} usuarios -> ~{estimado:.0f} s estimados para {len(usuarios)} "
+          f"(sin contar la llamada a modelo.predict por usuario)")
+    print(f"Speedup estimado: {estimado / t_lote:.0f}x")
+
+    numeros = df_scored["Number"].to_numpy()
+    coinciden = all((mejores[u] is None and n is None) or (mejores[u] is not None and numeros[mejores[u]] == n)
+                    for u, n in legacy.items())
+    print(f"Mismos resultados que el bucle en la muestra: {coinciden}")
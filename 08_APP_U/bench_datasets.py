@@ -0,0 +1,57 @@
+"""
+Benchmark de arranque en frío de los datasets: CSV (pd.read_csv + tipos) frente a la versión columnar
+en Feather abierta con memory map (datasets.cargar_dataset).
+
+Cada medición es la primera carga en un proceso nuevo (cachés del proceso vacías), como al arrancar la
+app o el bot; el import de pandas y pyarrow, que ambos ya pagan, queda fuera. También se comprueba que
+ambos caminos dan el mismo DataFrame.
+
+Uso:
+    python 08_APP_U/bench_datasets.py --repeticiones 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import pandas as pd
+import datasets
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {directorio!r})
+import datasets
+inicio = time.perf_counter()
+df = datasets.{funcion}({nombre!r})
+print(time.perf_counter() - inicio)
+"""
+
+
+def arranque(funcion, nombre):
+    """Segundos de la primera carga en un proceso nuevo (los imports de pandas y pyarrow ya hechos)."""
+    codigo = SCRIPT.format(directorio=DIRECTORIO, funcion=funcion, nombre=nombre)
+    salida = subprocess.run([sys.executable, "-c", codigo], check=True, capture_output=True, text=True)
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío CSV frente a Feather")
+    parser.add_argument("nombres", nargs="*", help="Datasets a medir (por defecto, todos)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    if datasets.feather is None:
+        sys.exit("❌ pyarrow no está instalado: solo está disponible el camino CSV")
+
+    print(f"{'dataset':<10} {'filas':>6} {'CSV (ms)':>9} {'Feather (ms)':>13} {'mejora':>7} {'igual':>6}")
+    for nombre in args.nombres or datasets.DATASETS:
+        datasets.convertir(nombre)
+        igual = datasets.cargar_dataset(nombre).equals(datasets.leer_csv(nombre))
+
+        t_csv = statistics.median(arranque("leer_csv", nombre) for _ in range(args.repeticiones)) * 1000
+        t_feather = statistics.median(arranque("cargar_dataset", nombre) for _ in range(args.repeticiones)) * 1000
+        filas = len(pd.read_csv(datasets.ruta_csv(nombre)))
+        print(f"{nombre:<10} {filas:>6} {t_csv:>9.1f} {t_feather:>13.1f} {t_csv / t_feather:>6.1f}x {str(igual):>6}")
@@ -0,0 +1,106 @@
+"""
+Benchmark de la capa de conexión a PostgreSQL: psycopg2.connect por llamada frente al pool de db.py.
+
+Reproduce las consultas del bot (/status, /start y el historial de recomendaciones) contra un
+PostgreSQL local. Con sslmode=require el coste del handshake TLS en cada connect es aún mayor que
+en local, así que la diferencia medida aquí es una cota inferior de la que se ve contra Render.
+
+Uso:
+    DATABASE_URL=postgresql://postgres@localhost/ironbrick DB_SSLMODE=disable \
+        python 08_APP_U/bench_db.py --consultas 500 --hilos 1 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+import db
+
+
+def preparar_tablas(n_usuarios):
+    with db.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            telegram_id TEXT PRIMARY KEY,
+            presupuesto_min INTEGER,
+            presupuesto_max INTEGER,
+            temas_favoritos TEXT
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recomendaciones (
+            id SERIAL PRIMARY KEY,
+            telegram_id TEXT,
+            set_id TEXT
+        )
+        """)
+        cursor.executemany("""
+        INSERT INTO usuarios (telegram_id, presupuesto_min, presupuesto_max, temas_favoritos)
+        VALUES (%s, %s, %s, %s) ON CONFLICT (telegram_id) DO NOTHING
+        """, [(str(10_000_000 + i), 10, 200, "Todos") for i in range(n_usuarios)])
+        conn.commit()
+
+
+def consulta(conn, i, n_usuarios):
+    telegram_id = str(10_000_000 + i % n_usuarios)
+    cursor = conn.cursor()
+    cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s",
+                   (telegram_id,))
+    cursor.fetchone()
+    cursor.execute("SELECT set_id FROM recomendaciones WHERE telegram_id = %s", (telegram_id,))
+    cursor.fetchall()
+
+
+def con_connect(i, n_usuarios):
+    """Como antes: una conexión nueva por llamada."""
+    inicio = time.perf_counter()
+    conn = psycopg2.connect(db.DB_URL, sslmode=db.DB_SSLMODE)
+    try:
+        consulta(conn, i, n_usuarios)
+    finally:
+        conn.close()
+    return time.perf_counter() - inicio
+
+
+def con_pool(i, n_usuarios):
+    inicio = time.perf_counter()
+    with db.get_db_connection() as conn:
+        consulta(conn, i, n_usuarios)
+    return time.perf_counter() - inicio
+
+
+def medir(funcion, consultas, hilos, n_usuarios):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        latencias = sorted(ejecutor.map(lambda i: funcion(i, n_usuarios), range(consultas)))
+    total = time.perf_counter() - inicio
+    return {
+        "total_s": total,
+        "consultas_s": consultas / total,
+        "p50_ms": latencias[len(latencias) // 2] * 1000,
+        "p95_ms": latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de connect por llamada frente al pool de PostgreSQL")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--usuarios", type=int, default=1_000)
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("❌ Define DATABASE_URL apuntando a un PostgreSQL local (y DB_SSLMODE=disable si no hay TLS)")
+
+    preparar_tablas(args.usuarios)
+
+    print(f"{'modo':>8} {'hilos':>6} {'total (s)':>10} {'consultas/s':>12} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for hilos in args.hilos:
+        for nombre, funcion in (("connect", con_connect), ("pool", con_pool)):
+            r = medir(funcion, args.consultas, hilos, args.usuarios)
+            print(f"{nombre:>8} {hilos:>6} {r['total_s']:>10.2f} {r['consultas_s']:>12.1f} "
+                  f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+
+    print("Métricas del pool:", db.metricas())
+    db.cerrar_pool()
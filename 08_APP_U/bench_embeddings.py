@@ -0,0 +1,81 @@
+"""
+Benchmark del índice de embeddings (embeddings.IndiceEmbeddings) con vectores sintéticos.
+
+Cada set tiene un embedding "real" al azar y el índice guarda --fotos fotos de referencia por set (el
+embedding real más ruido). Las consultas son fotos nuevas de sets al azar. Se mide:
+    - el tiempo de añadir los sets por tandas (incluye los reentrenamientos de las listas),
+    - guardar y cargar el índice,
+    - la latencia por consulta y el acierto top-1 de la búsqueda exacta y del IVF con distintas sondas.
+
+No necesita torch ni el modelo: la dimensión (512) es la de los embeddings de la EfficientNet de model_utils.
+
+Uso:
+    python 08_APP_U/bench_embeddings.py --sets 20000 --fotos 1 --consultas 500
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from embeddings import IndiceEmbeddings, normalizar
+
+
+def latencia(indice, consultas, numeros, sondas):
+    aciertos = 0
+    inicio = time.perf_counter()
+    for consulta, numero in zip(consultas, numeros):
+        aciertos += indice.buscar(consulta, k=1, sondas=sondas)[0][0] == numero
+    return (time.perf_counter() - inicio) / len(consultas) * 1000, aciertos / len(consultas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del índice de embeddings")
+    parser.add_argument("--sets", type=int, default=20000)
+    parser.add_argument("--fotos", type=int, default=1, help="Fotos de referencia por set")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--ruido", type=float, default=0.6, help="Ruido de cada foto frente al embedding del set")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--tandas", type=int, default=10)
+    parser.add_argument("--sondas", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    reales = normalizar(rng.standard_normal((args.sets, args.dim)))
+    ruido = args.ruido / np.sqrt(args.dim)
+    referencias = np.repeat(reales, args.fotos, axis=0)
+    referencias += ruido * rng.standard_normal(referencias.shape).astype(np.float32)
+    numeros = np.repeat(np.arange(args.sets), args.fotos).astype(str)
+
+    directorio = tempfile.mkdtemp(prefix="ironbrick_indice_")
+    try:
+        indice = IndiceEmbeddings(directorio)
+        inicio = time.perf_counter()
+        for tanda in np.array_split(np.arange(len(referencias)), args.tandas):
+            indice.anadir(referencias[tanda], numeros[tanda])
+        t_anadir = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        indice.guardar()
+        t_guardar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        indice = IndiceEmbeddings.cargar(directorio)
+        t_cargar = time.perf_counter() - inicio
+
+        elegidos = rng.integers(0, args.sets, args.consultas)
+        consultas = reales[elegidos] + ruido * rng.standard_normal((args.consultas, args.dim)).astype(np.float32)
+        esperados = elegidos.astype(str)
+
+        print(f"Vectores: {len(indice)} ({args.sets} sets x {args.fotos} fotos, dim {args.dim}) | "
+              f"listas: {0 if indice.centroides is None else len(indice.centroides)}")
+        print(f"Añadir en {args.tandas} tandas: {t_anadir:.2f} s | guardar: {t_guardar * 1000:.0f} ms | "
+              f"cargar: {t_cargar * 1000:.0f} ms")
+        # Calentamiento (construye las listas en formato CSR)
+        indice.buscar(consultas[0])
+        print(f"{'búsqueda':<14} {'ms/consulta':>12} {'acierto top-1':>14}")
+        ms, acierto = latencia(indice, consultas, esperados, sondas=np.inf)
+        print(f"{'exacta':<14} {ms:>12.3f} {acierto:>14.1%}")
+        for sondas in args.sondas:
+            ms, acierto = latencia(indice, consultas, esperados, sondas=sondas)
+            print(f"{f'IVF {sondas} sondas':<14} {ms:>12.3f} {acierto:>14.1%}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
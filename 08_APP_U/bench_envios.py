@@ -0,0 +1,84 @@
+"""
+Benchmark de la cola de envío a Telegram contra un servidor falso local de la Bot API.
+
+El servidor falso responde a POST /bot<token>/sendMessage con una latencia configurable y devuelve
+una fracción de 429 (con retry_after) y de 502 para ejercitar los reintentos. Se compara el envío
+secuencial (1 worker, como el bucle anterior con bot.send_message) con el pool concurrente.
+
+Uso:
+    python 08_APP_U/bench_envios.py --mensajes 300 --latencia 0.15 --workers 1 8 16
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from envios import TelegramSender, registrar_envios
+
+
+def crear_servidor_falso(latencia, prob_429, prob_5xx):
+    class FakeTelegramHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latencia)
+
+            r = random.random()
+            if r < prob_429:
+                codigo, cuerpo = 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                       "parameters": {"retry_after": 0.2}}
+            elif r < prob_429 + prob_5xx:
+                codigo, cuerpo = 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+            else:
+                codigo, cuerpo = 200, {"ok": True, "result": {"message_id": 1}}
+
+            datos = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), FakeTelegramHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la cola de envío a Telegram")
+    parser.add_argument("--mensajes", type=int, default=300)
+    parser.add_argument("--latencia", type=float, default=0.15, help="Latencia simulada por petición (s)")
+    parser.add_argument("--prob-429", type=float, default=0.02)
+    parser.add_argument("--prob-5xx", type=float, default=0.02)
+    parser.add_argument("--global-rate", type=float, default=30, help="Límite global de mensajes/s")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16])
+    args = parser.parse_args()
+
+    servidor = crear_servidor_falso(args.latencia, args.prob_429, args.prob_5xx)
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    mensajes = [(str(100000 + i), f"Mensaje de prueba {i}", "Markdown") for i in range(args.mensajes)]
+
+    print(f"{'workers':>8} {'tiempo (s)':>11} {'msg/s':>8} {'enviados':>9} {'reintentos':>11}")
+    for workers in args.workers:
+        sender = TelegramSender("TOKEN", base_url=base_url, workers=workers, global_rate=args.global_rate,
+                                backoff_base=0.1)
+        inicio = time.perf_counter()
+        resultados = sender.enviar_lote(mensajes)
+        duracion = time.perf_counter() - inicio
+
+        enviados = sum(r["estado"] == "enviado" for r in resultados)
+        reintentos = sum(r["intentos"] - 1 for r in resultados)
+        print(f"{workers:>8} {duracion:>11.2f} {len(mensajes) / duracion:>8.1f} {enviados:>9} {reintentos:>11}")
+
+    # Registro de estados con SQLite como sustituto local de PostgreSQL (en PostgreSQL la tabla la crea la
+    # migración 4)
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE envios (id INTEGER PRIMARY KEY, telegram_id TEXT, set_id TEXT, estado TEXT, "
+                 "intentos INTEGER, error TEXT, enviado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    registrar_envios(conn, resultados)
+    print(conn.execute("SELECT estado, COUNT(*) FROM envios GROUP BY estado").fetchall())
+    servidor.shutdown()
@@ -0,0 +1,69 @@
+"""
+Benchmark de las fichas de sets (fichas.FichasSets) frente al filtrado del DataFrame que hacían las páginas.
+
+Con un dataset de datasets.py (por defecto, el de la cámara) mide:
+    - la construcción de las fichas (una vez por proceso),
+    - la consulta por número: df[df["Number"] == numero].iloc[0] frente a fichas.ficha(numero),
+    - la consulta por posición del bot: df.iloc[posicion] frente a fichas.en_posicion(posicion),
+y comprueba que todas las fichas coinciden con las filas del DataFrame.
+
+Uso:
+    python 08_APP_U/bench_fichas.py --consultas 2000
+    python 08_APP_U/bench_fichas.py --dataset catalogo
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from datasets import cargar_dataset
+from fichas import COLUMNAS_CAMARA, FichasSets
+
+
+def medir(funcion, argumentos):
+    inicio = time.perf_counter()
+    for argumento in argumentos:
+        funcion(argumento)
+    return (time.perf_counter() - inicio) / len(argumentos) * 1e6
+
+
+def iguales(a, b):
+    return (pd.isna(a) and pd.isna(b)) or a == b
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de las fichas de sets")
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--dataset", default="camara")
+    args = parser.parse_args()
+
+    df = cargar_dataset(args.dataset)
+    inicio = time.perf_counter()
+    fichas = FichasSets(df, COLUMNAS_CAMARA)
+    t_construir = (time.perf_counter() - inicio) * 1000
+
+    rng = np.random.default_rng(0)
+    numeros = df["Number"].to_numpy()[rng.integers(0, len(df), args.consultas)]
+    posiciones = rng.integers(0, len(df), args.consultas)
+
+    def filtrar(numero):
+        fila = df[df["Number"] == numero].iloc[0]
+        return fila.get("SetName"), fila.get("Theme"), fila.get("USRetailPrice")
+
+    def ficha(numero):
+        f = fichas.ficha(numero)
+        return f.get("SetName"), f.get("Theme"), f.get("USRetailPrice")
+
+    print(f"Sets: {len(df)} | construcción de las fichas: {t_construir:.1f} ms")
+    print(f"{'consulta':<34} {'µs/consulta':>12}")
+    print(f"{'df[df.Number == n].iloc[0]':<34} {medir(filtrar, numeros):>12.1f}")
+    print(f"{'fichas.ficha(n)':<34} {medir(ficha, numeros):>12.2f}")
+    print(f"{'df.iloc[posicion]':<34} {medir(lambda p: df.iloc[p]['SetName'], posiciones):>12.1f}")
+    print(f"{'fichas.en_posicion(posicion)':<34} {medir(lambda p: fichas.en_posicion(p)['SetName'], posiciones):>12.2f}")
+
+    columnas = ["Number"] + [c for c in COLUMNAS_CAMARA if c in df.columns]
+    coinciden = all(
+        iguales(fichas.ficha(fila["Number"])[col], fila[col])
+        for _, fila in df.drop_duplicates("Number").iterrows()
+        for col in columnas
+    )
+    print(f"Fichas iguales a las filas del DataFrame: {coinciden}")
@@ -0,0 +1,85 @@
+"""
+Comprobación y benchmark de la frontera de Pareto de carteras (frontera.py).
+
+1. Compara filtrar_dominadas con la definición directa (comparar cada punto con todos, O(n²)) en puntos
+   aleatorios con empates.
+2. Mide el tiempo de precálculo de FronteraCarteras según el tamaño de la bolsa de candidatos y el de una
+   consulta por presupuesto, y comprueba que la mejor opción de la frontera coincide con la búsqueda exacta
+   (inversiones.mejores_carteras) sobre la misma bolsa.
+
+Uso:
+    python 08_APP_U/bench_frontera.py --bolsas 20 40 50
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from frontera import FronteraCarteras, filtrar_dominadas
+from inversiones import mejores_carteras
+
+
+def dominadas_directo(costes, v2, v5, n):
+    frontera = []
+    for i in range(len(costes)):
+        dominado = any(costes[j] <= costes[i] and v2[j] >= v2[i] and v5[j] >= v5[i] and n[j] <= n[i] and
+                       (costes[j], v2[j], v5[j], n[j]) != (costes[i], v2[i], v5[i], n[i])
+                       for j in range(len(costes)))
+        if not dominado:
+            frontera.append((costes[i], v2[i], v5[i], n[i]))
+    return sorted(set(frontera))
+
+
+def comprobar(casos, rng):
+    for _ in range(casos):
+        m = int(rng.integers(1, 200))
+        costes = rng.integers(1, 30, m).astype(float)
+        v2 = rng.integers(1, 30, m).astype(float)
+        v5 = rng.integers(1, 30, m).astype(float)
+        n = rng.integers(1, 5, m)
+        obtenido = sorted((costes[i], v2[i], v5[i], n[i]) for i in filtrar_dominadas(costes, v2, v5, n))
+        assert obtenido == dominadas_directo(costes, v2, v5, n)
+    print(f"✅ {casos} casos aleatorios coinciden con la definición directa de dominancia")
+
+
+def catalogo(n, rng):
+    precios = np.round(np.exp(rng.normal(3.7, 1.1, n)).clip(3, 1200), 2)
+    valores_5y = precios * rng.lognormal(0.25, 0.35, n)
+    valores_2y = precios + (valores_5y - precios) * rng.uniform(0.2, 0.6, n)
+    return pd.DataFrame({"SetName": [f"Set {i}" for i in range(n)], "Number": [str(10000 + i) for i in range(n)],
+                         "CurrentValueNew": precios, "PredictedValue2Y": valores_2y, "PredictedValue5Y": valores_5y})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprobación y benchmark de la frontera de carteras")
+    parser.add_argument("--casos", type=int, default=200)
+    parser.add_argument("--sets", type=int, default=400, help="Tamaño del catálogo sintético")
+    parser.add_argument("--bolsas", type=int, nargs="+", default=[20, 40, 50])
+    parser.add_argument("--presupuesto-max", type=float, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    comprobar(args.casos, rng)
+
+    df = catalogo(args.sets, rng)
+    print(f"{'bolsa':>6} {'combinaciones':>14} {'frontera':>9} {'precálculo (s)':>15} {'consulta (µs)':>14} "
+          f"{'óptimo':>7}")
+    for bolsa in args.bolsas:
+        inicio = time.perf_counter()
+        frontera = FronteraCarteras(df, args.presupuesto_max, tam_bolsa=bolsa)
+        t_precalculo = time.perf_counter() - inicio
+
+        presupuestos = rng.uniform(100, args.presupuesto_max, 1_000)
+        inicio = time.perf_counter()
+        for presupuesto in presupuestos:
+            frontera.mejores(presupuesto)
+        t_consulta = (time.perf_counter() - inicio) / len(presupuestos) * 1e6
+
+        # La mejor cartera por valor 5Y nunca está dominada: debe coincidir con la búsqueda exacta en la bolsa
+        candidatos = df[df["CurrentValueNew"] <= args.presupuesto_max].sort_values(
+            by="PredictedValue5Y", ascending=False, kind="stable").head(bolsa)
+        optimo = all(
+            np.isclose(frontera.mejores(p)[0][2],
+                       mejores_carteras(candidatos["CurrentValueNew"], candidatos["PredictedValue5Y"], p, k=1)[0][1])
+            for p in presupuestos[:50] if frontera.mejores(p))
+        print(f"{bolsa:>6} {frontera.combinaciones_evaluadas:>14} {len(frontera):>9} {t_precalculo:>15.2f} "
+              f"{t_consulta:>14.1f} {str(optimo):>7}")
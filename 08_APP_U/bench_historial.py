@@ -0,0 +1,112 @@
+"""
+Benchmark de la consulta del historial de recomendaciones a medida que crece la tabla.
+
+Rellena recomendaciones en un PostgreSQL local con generate_series (en el servidor, sin pasar las
+filas por Python) hasta cada uno de los tamaños indicados y mide la latencia de la consulta que hace
+el bot por usuario, primero sin índices (esquema anterior) y después de aplicar las migraciones.
+
+Trabaja sobre un esquema propio (bench_historial) para no tocar las tablas reales.
+
+Uso:
+    DATABASE_URL=postgresql://postgres@localhost/ironbrick DB_SSLMODE=disable \
+        python 08_APP_U/bench_historial.py --filas 100000 1000000 10000000 --consultas 200
+"""
+import argparse
+import os
+import random
+import time
+import db
+import migrations
+
+ESQUEMA = "bench_historial"
+USUARIOS = 100_000
+CONSULTA = "SELECT set_id FROM recomendaciones WHERE telegram_id = %s"
+
+
+def preparar_esquema(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {ESQUEMA}")
+    cursor.execute(f"SET search_path TO {ESQUEMA}")
+    for sentencia in migrations.MIGRACIONES[0][2]:
+        cursor.execute(sentencia)
+    conn.commit()
+
+
+def rellenar(conn, desde, hasta):
+    """Inserta las filas desde..hasta-1 de la serie, con ~1 % de pares duplicados como en el historial real."""
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO recomendaciones (telegram_id, set_id)
+    SELECT (10000000 + (g %% %s))::text,
+           CASE WHEN g %% 100 = 0 THEN '1' ELSE (g / %s)::text END
+    FROM generate_series(%s, %s) AS g
+    """, (USUARIOS, USUARIOS, desde, hasta - 1))
+    cursor.execute("ANALYZE recomendaciones")
+    conn.commit()
+
+
+def medir(conn, consultas):
+    cursor = conn.cursor()
+    latencias = []
+    for _ in range(consultas):
+        telegram_id = str(10_000_000 + random.randrange(USUARIOS))
+        inicio = time.perf_counter()
+        cursor.execute(CONSULTA, (telegram_id,))
+        cursor.fetchall()
+        latencias.append(time.perf_counter() - inicio)
+    conn.rollback()
+    latencias.sort()
+    return latencias[len(latencias) // 2] * 1000, latencias[int(len(latencias) * 0.95)] * 1000
+
+
+def plan(conn):
+    cursor = conn.cursor()
+    cursor.execute("EXPLAIN " + CONSULTA, ("10000000",))
+    linea = cursor.fetchone()[0]
+    conn.rollback()
+    return linea.split("  (")[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia del historial de recomendaciones según su tamaño")
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--sin-legacy", action="store_true", help="No medir el esquema sin índices")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        raise SystemExit("❌ Define DATABASE_URL apuntando a un PostgreSQL local (y DB_SSLMODE=disable si no hay TLS)")
+
+    with db.get_db_connection() as conn:
+        preparar_esquema(conn)
+        cursor = conn.cursor()
+
+        print(f"{'filas':>11} {'esquema':>9} {'p50 (ms)':>9} {'p95 (ms)':>9}  plan")
+        total = 0
+        for filas in sorted(args.filas):
+            # Se vuelve al esquema sin índices para poder comparar en cada tamaño
+            cursor.execute("DROP INDEX IF EXISTS recomendaciones_telegram_set_uq")
+            if total:
+                cursor.execute("DELETE FROM schema_migrations WHERE version > 1")
+            conn.commit()
+            rellenar(conn, total, filas)
+            total = filas
+
+            if not args.sin_legacy:
+                p50, p95 = medir(conn, args.consultas)
+                print(f"{filas:>11} {'anterior':>9} {p50:>9.2f} {p95:>9.2f}  {plan(conn)}")
+
+            inicio = time.perf_counter()
+            migrations.aplicar_migraciones(conn)
+            cursor.execute("ANALYZE recomendaciones")
+            conn.commit()
+            t_migracion = time.perf_counter() - inicio
+
+            p50, p95 = medir(conn, args.consultas)
+            print(f"{filas:>11} {'migrado':>9} {p50:>9.2f} {p95:>9.2f}  {plan(conn)}  "
+                  f"(migración: {t_migracion:.1f} s)")
+
+        cursor.execute(f"DROP SCHEMA {ESQUEMA} CASCADE")
+        conn.commit()
+    db.cerrar_pool()
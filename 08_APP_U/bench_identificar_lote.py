@@ -0,0 +1,70 @@
+"""
+Benchmark de rendimiento (imágenes/s en CPU) de la identificación por lotes frente a identificar las
+imágenes una a una con predict.predict, como hace la página de una sola imagen.
+
+Las imágenes de 07_Camera/Test_image se repiten hasta --imagenes y se leen como bytes (igual que los
+ficheros subidos a Streamlit). Se comprueba que ambos caminos predicen los mismos sets.
+
+Uso:
+    python 08_APP_U/bench_identificar_lote.py --imagenes 48 --lotes 1 8 16 32 --hilos 4
+"""
+import argparse
+import io
+import json
+import time
+import numpy as np
+import torch
+from PIL import Image
+from bench_predict import IMAGENES, MAPPING_PATH, modelo_sin_entrenar
+from identificar_lote import identificar_lote
+from predict import predict
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la identificación por lotes")
+    parser.add_argument("--imagenes", type=int, default=48)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--num-tta", type=int, default=0)
+    parser.add_argument("--modelo-real", action="store_true", help="Usa el modelo del almacén de modelos")
+    args = parser.parse_args()
+
+    if args.modelo_real:
+        from model_registry import obtener_modelo
+        from model_utils import load_model
+        model = load_model(obtener_modelo("identificador")[0]).cpu()
+        with open(obtener_modelo("mapeo_identificador")[0], "r") as f:
+            idx_to_class = json.load(f)
+    else:
+        model = modelo_sin_entrenar()
+        with open(MAPPING_PATH, "r") as f:
+            idx_to_class = json.load(f)
+
+    originales = []
+    for path in IMAGENES:
+        with open(path, "rb") as f:
+            originales.append(f.read())
+    fuentes = [originales[i % len(originales)] for i in range(args.imagenes)]
+
+    # Calentamiento
+    identificar_lote(fuentes[:2], model, idx_to_class, tam_lote=2, modo="determinista")
+
+    inicio = time.perf_counter()
+    una_a_una = []
+    for fuente in fuentes:
+        clase, _ = predict(Image.open(io.BytesIO(fuente)).convert("RGB"), model, num_tta=args.num_tta,
+                           modo="determinista")
+        una_a_una.append(str(idx_to_class.get(str(int(clase)), "Desconocido")))
+    t_una = time.perf_counter() - inicio
+
+    print(f"Imágenes: {args.imagenes} | num_tta: {args.num_tta} | hilos torch: {torch.get_num_threads()} | "
+          f"hilos decodificación: {args.hilos}")
+    print(f"{'modo':<22} {'s':>7} {'imágenes/s':>11} {'mismos sets':>12}")
+    print(f"{'una a una':<22} {t_una:>7.2f} {args.imagenes / t_una:>11.1f} {'-':>12}")
+    for tam_lote in args.lotes:
+        inicio = time.perf_counter()
+        resultado = identificar_lote(fuentes, model, idx_to_class, num_tta=args.num_tta, tam_lote=tam_lote,
+                                     hilos=args.hilos, modo="determinista")
+        t = time.perf_counter() - inicio
+        iguales = bool(np.array_equal(resultado["Number"].to_numpy(), np.array(una_a_una, dtype=object)))
+        print(f"{f'lotes de {tam_lote}':<22} {t:>7.2f} {args.imagenes / t:>11.1f} {str(iguales):>12}")
@@ -0,0 +1,106 @@
+"""
+Benchmark del servicio de imágenes (imagenes.ServicioImagenes) sin depender de Brickset.
+
+Un servidor HTTP local hace de Brickset: sirve /sets/images/<numero>.jpg con --latencia ms de retraso,
+devuelve 404 para los números que terminan en 7 y tarda --lento ms con los que terminan en 3 (un host que
+no responde a tiempo). Se mide, para --sets sets:
+    - comprobación una a una con urlopen, como hacían las páginas,
+    - precarga en frío en paralelo con presupuesto de tiempo,
+    - la misma precarga con la caché en disco ya llena (incluida la caché negativa),
+    - la expulsión LRU cuando la caché supera su tamaño máximo.
+
+Uso:
+    python 08_APP_U/bench_imagenes.py --sets 12 --latencia 150 --lento 5000
+"""
+import argparse
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from imagenes import ServicioImagenes
+
+IMAGEN = os.urandom(40 * 1024)
+
+
+def servir(latencia, lento):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            numero = os.path.basename(self.path).split(".")[0]
+            time.sleep((lento if numero.endswith("3") else latencia) / 1000)
+            if numero.endswith("7"):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(IMAGEN)))
+            self.end_headers()
+            try:
+                self.wfile.write(IMAGEN)
+            except BrokenPipeError:
+                # El cliente ya se ha ido por timeout
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def urlopen_una_a_una(urls, timeout):
+    encontradas = 0
+    for url in urls:
+        try:
+            encontradas += urllib.request.urlopen(url, timeout=timeout).status == 200
+        except Exception:
+            pass
+    return encontradas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del servicio de imágenes")
+    parser.add_argument("--sets", type=int, default=12)
+    parser.add_argument("--latencia", type=float, default=150, help="Retraso del servidor en ms")
+    parser.add_argument("--lento", type=float, default=5000, help="Retraso de las imágenes lentas en ms")
+    parser.add_argument("--presupuesto", type=float, default=1.0, help="Espera máxima de la precarga en s")
+    args = parser.parse_args()
+
+    servidor = servir(args.latencia, args.lento)
+    base = f"http://127.0.0.1:{servidor.server_port}/sets/images"
+    urls = [f"{base}/{75100 + i}.jpg" for i in range(args.sets)]
+    directorio = tempfile.mkdtemp(prefix="ironbrick_imagenes_")
+    try:
+        servicio = ServicioImagenes(directorio, timeout=2.0)
+        print(f"Sets: {args.sets} | latencia: {args.latencia:.0f} ms | lentos: {args.lento:.0f} ms | "
+              f"presupuesto: {args.presupuesto:.1f} s")
+        print(f"{'fase':<34} {'s':>7} {'con imagen':>11}")
+
+        inicio = time.perf_counter()
+        encontradas = urlopen_una_a_una(urls, timeout=2.0)
+        print(f"{'urlopen una a una (timeout 2 s)':<34} {time.perf_counter() - inicio:>7.2f} {encontradas:>11}")
+
+        inicio = time.perf_counter()
+        rutas = servicio.precargar(urls, presupuesto=args.presupuesto)
+        print(f"{'precarga en frío':<34} {time.perf_counter() - inicio:>7.2f} {sum(map(bool, rutas.values())):>11}")
+
+        # Las lentas terminan con error (timeout) y quedan en la caché negativa
+        time.sleep(2.5)
+        inicio = time.perf_counter()
+        rutas = servicio.precargar(urls, presupuesto=args.presupuesto)
+        t_caliente = time.perf_counter() - inicio
+        print(f"{'precarga con la caché llena':<34} {t_caliente:>7.4f} {sum(map(bool, rutas.values())):>11}")
+        ausentes = sum(servicio.ausente(url) for url in urls)
+        print(f"En la caché negativa: {ausentes} (404 y timeouts)")
+
+        pequeno = ServicioImagenes(os.path.join(directorio, "pequena"), max_bytes=5 * len(IMAGEN), timeout=2.0)
+        pequeno.precargar(urls, presupuesto=5.0)
+        imagenes = [e for e in os.listdir(pequeno.directorio) if e.endswith(".img")]
+        print(f"Caché limitada a 5 imágenes: {len(imagenes)} imágenes en disco tras la expulsión LRU")
+    finally:
+        servidor.shutdown()
+        shutil.rmtree(directorio, ignore_errors=True)
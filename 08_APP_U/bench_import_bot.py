@@ -0,0 +1,80 @@
+"""
+Benchmark del tiempo de importación de bot_telegram con python -X importtime.
+
+Importa el módulo en un proceso nuevo de dos formas:
+    - en frío (intérprete vacío),
+    - como lo importa la página de alertas de Streamlit: con numpy, pandas, requests y psycopg2 ya cargados,
+      de modo que solo cuenta lo que añade el bot,
+y muestra el tiempo acumulado del import, los módulos más lentos y si el import ha tenido efectos
+secundarios (servicios creados o telebot, torch, pyarrow, joblib o el servidor de modelos cargados).
+
+Con --max-ms sale con código 1 si el import en el contexto de la app supera ese tiempo, para detectar
+regresiones (por ejemplo, en CI).
+
+Uso:
+    python 08_APP_U/bench_import_bot.py --top 10 --max-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+PRECARGADOS = ["numpy", "pandas", "requests", "psycopg2"]
+MARCA = "-- import bot_telegram --"
+PESADOS = ["pandas", "numpy", "requests", "telebot", "schedule", "torch", "servidor_modelos", "datasets", "scoring"]
+
+SCRIPT = """
+import sys, time, json
+MARCA = {marca!r}
+sys.path.insert(0, {directorio!r})
+for modulo in {precargados!r}:
+    __import__(modulo)
+sys.stderr.write(MARCA + "\\n")
+inicio = time.perf_counter()
+import bot_telegram
+segundos = time.perf_counter() - inicio
+print(json.dumps({{"ms": segundos * 1000, "servicios": sorted(bot_telegram._servicios),
+                  "pesados": [m for m in {pesados!r} if m in sys.modules and m not in {precargados!r}]}}))
+"""
+
+
+def importtime(precargados):
+    """
+    Resultado del script y módulos importados por bot_telegram (los que -X importtime escribe tras la marca)
+    como (módulo, propio_ms, acumulado_ms).
+    """
+    codigo = SCRIPT.format(directorio=DIRECTORIO, precargados=precargados, pesados=PESADOS, marca=MARCA)
+    salida = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], check=True,
+                            capture_output=True, text=True)
+    modulos = []
+    lineas = salida.stderr.splitlines()
+    for linea in lineas[lineas.index(MARCA) + 1:]:
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append((nombre.strip(), int(propio) / 1000, int(acumulado) / 1000))
+    return json.loads(salida.stdout.strip().splitlines()[-1]), modulos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de importación de bot_telegram")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a mostrar")
+    parser.add_argument("--max-ms", type=float, default=None, help="Máximo permitido en el contexto de la app")
+    args = parser.parse_args()
+
+    resultados = {}
+    for etiqueta, precargados in (("en frío", []), ("con la app cargada", PRECARGADOS)):
+        resultado, modulos = importtime(precargados)
+        acumulado = next(ms for nombre, _, ms in modulos if nombre == "bot_telegram")
+        resultados[etiqueta] = acumulado
+        print(f"== {etiqueta}: import bot_telegram {acumulado:.1f} ms acumulados (reloj: {resultado['ms']:.1f} ms)")
+        print(f"   servicios creados: {resultado['servicios'] or 'ninguno'} | "
+              f"módulos pesados cargados: {resultado['pesados'] or 'ninguno'}")
+        for nombre, propio, _ in sorted(modulos, key=lambda m: -m[1])[:args.top]:
+            print(f"   {propio:>8.1f} ms  {nombre}")
+
+    if args.max_ms is not None and resultados["con la app cargada"] > args.max_ms:
+        print(f"❌ El import supera {args.max_ms:.0f} ms en el contexto de la app")
+        sys.exit(1)
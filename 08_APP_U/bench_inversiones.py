@@ -0,0 +1,131 @@
+"""
+Comprobación y benchmark del optimizador de carteras (inversiones.mejores_carteras).
+
+1. Compara contra fuerza bruta (itertools.combinations sobre todos los sets, como hacía la app con los 10
+   primeros) en muchos casos pequeños aleatorios: los valores de las k mejores carteras deben coincidir.
+2. Mide el tiempo sobre catálogos sintéticos de miles de sets, con precios y revalorizaciones parecidos a
+   los de 04_Extra/APP/data/scraped_lego_data.csv.
+3. Compara, sobre bolsas de los N sets con más valor, la versión anterior (lista de todas las combinaciones
+   y sort) con el enumerador en streaming (enumerar_combinaciones + top_k_combinaciones): tiempo y pico de
+   memoria.
+
+Uso:
+    python 08_APP_U/bench_inversiones.py --casos 300 --sets 1000 5000 --presupuestos 200 1000 2000
+"""
+import argparse
+import itertools
+import time
+import tracemalloc
+import numpy as np
+from inversiones import enumerar_combinaciones, mejores_carteras, top_k_combinaciones
+
+
+def fuerza_bruta(precios, valores, presupuesto, k, max_sets):
+    carteras = []
+    for r in range(1, max_sets + 1):
+        for combinacion in itertools.combinations(range(len(precios)), r):
+            precio = sum(precios[i] for i in combinacion)
+            if precio <= presupuesto:
+                carteras.append((sum(valores[i] for i in combinacion), combinacion))
+    carteras.sort(key=lambda c: c[0], reverse=True)
+    return [valor for valor, _ in carteras[:k]]
+
+
+def lista_y_ordena(precios, valores_2y, valores_5y, presupuesto, num_opciones=3):
+    """La versión anterior de encontrar_mejores_inversiones (04_Extra/APP/main.py), sobre índices."""
+    sets_lista = list(zip(range(len(precios)), precios, valores_2y, valores_5y))
+    mejores_combinaciones = []
+    for r in range(1, 5):
+        for combinacion in itertools.combinations(sets_lista, r):
+            total_precio = sum(item[1] for item in combinacion)
+            retorno_2y = sum(item[2] for item in combinacion)
+            retorno_5y = sum(item[3] for item in combinacion)
+            if total_precio <= presupuesto:
+                mejores_combinaciones.append((combinacion, retorno_2y, retorno_5y, total_precio))
+    mejores_combinaciones.sort(key=lambda x: x[2], reverse=True)
+    return mejores_combinaciones[:num_opciones]
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracion, pico
+
+
+def catalogo(n, rng):
+    # Precios log-normales (mediana ~40 $) y valor a 5 años = precio x revalorización (a veces < 1)
+    precios = np.round(np.exp(rng.normal(3.7, 1.1, n)).clip(3, 1200), 2)
+    valores = precios * rng.lognormal(0.25, 0.35, n)
+    return precios, valores
+
+
+def comprobar(casos, rng):
+    for caso in range(casos):
+        n = int(rng.integers(1, 13))
+        precios, valores = catalogo(n, rng)
+        if caso % 5 == 0:
+            # Empates y valores negativos
+            valores = np.round(valores / 20) * 20 - (caso % 10 == 0) * 50
+        presupuesto = float(rng.choice([20, 50, 100, 200, 500]))
+        k = int(rng.integers(1, 6))
+        max_sets = int(rng.integers(1, 6))
+
+        esperado = fuerza_bruta(precios, valores, presupuesto, k, max_sets)
+        obtenido = mejores_carteras(precios, valores, presupuesto, k=k, max_sets=max_sets)
+        for indices, valor, precio in obtenido:
+            assert len(set(indices)) == len(indices) <= max_sets
+            assert abs(precio - precios[list(indices)].sum()) < 1e-6 and precio <= presupuesto + 1e-9
+            assert abs(valor - valores[list(indices)].sum()) < 1e-6
+        assert np.allclose([v for _, v, _ in obtenido], esperado), (caso, esperado, obtenido)
+
+        streaming = top_k_combinaciones(enumerar_combinaciones(precios, valores, valores, presupuesto, max_sets), k)
+        assert np.allclose([c[3] for c in streaming], esperado), (caso, esperado, streaming)
+    print(f"✅ {casos} casos aleatorios coinciden con la fuerza bruta (búsqueda exacta y enumerador)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprobación y benchmark del optimizador de carteras")
+    parser.add_argument("--casos", type=int, default=300)
+    parser.add_argument("--sets", type=int, nargs="+", default=[1_000, 5_000])
+    parser.add_argument("--presupuestos", type=float, nargs="+", default=[200, 1_000, 2_000])
+    parser.add_argument("--max-sets", type=int, nargs="+", default=[4, 6])
+    parser.add_argument("--opciones", type=int, default=3)
+    parser.add_argument("--bolsas", type=int, nargs="+", default=[10, 30, 50],
+                        help="Tamaños de la bolsa de candidatos para comparar con la versión anterior")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    comprobar(args.casos, rng)
+
+    print(f"{'sets':>6} {'presupuesto':>12} {'max_sets':>9} {'tiempo (ms)':>12} {'mejor valor':>12}")
+    for n in args.sets:
+        precios, valores = catalogo(n, rng)
+        for presupuesto in args.presupuestos:
+            for max_sets in args.max_sets:
+                inicio = time.perf_counter()
+                carteras = mejores_carteras(precios, valores, presupuesto, k=args.opciones, max_sets=max_sets)
+                duracion = (time.perf_counter() - inicio) * 1000
+                print(f"{n:>6} {presupuesto:>12.0f} {max_sets:>9} {duracion:>12.1f} {carteras[0][1]:>12.2f}")
+
+    print(f"\n{'bolsa':>6} {'presupuesto':>12} {'anterior (ms)':>14} {'pico (MB)':>10} "
+          f"{'streaming (ms)':>15} {'pico (MB)':>10} {'mismo valor':>12}")
+    precios, valores = catalogo(2_000, rng)
+    valores_2y = precios + (valores - precios) * 0.4
+    for bolsa in args.bolsas:
+        # Como en la app: los sets con más valor a 5 años que caben en el presupuesto
+        for presupuesto in args.presupuestos:
+            candidatos = np.flatnonzero(precios <= presupuesto)
+            candidatos = candidatos[np.argsort(-valores[candidatos], kind="stable")][:bolsa]
+            p, v2, v5 = precios[candidatos], valores_2y[candidatos], valores[candidatos]
+
+            anterior, t_a, pico_a = medir(lambda: lista_y_ordena(p.tolist(), v2.tolist(), v5.tolist(), presupuesto))
+            nuevo, t_b, pico_b = medir(lambda: top_k_combinaciones(
+                enumerar_combinaciones(p, v2, v5, presupuesto, max_sets=4), args.opciones))
+            mismo = np.allclose([c[2] for c in anterior], [c[3] for c in nuevo])
+            print(f"{bolsa:>6} {presupuesto:>12.0f} {t_a * 1000:>14.1f} {pico_a / 2**20:>10.1f} "
+                  f"{t_b * 1000:>15.1f} {pico_b / 2**20:>10.2f} {str(mismo):>12}")
@@ -0,0 +1,77 @@
+"""
+Benchmark del almacén local de modelos (model_registry) sin depender de GitHub.
+
+Sirve un fichero aleatorio de --mb MB desde un servidor HTTP local y mide:
+    - arranque en frío con el almacén vacío (descarga + SHA-256),
+    - arranque en caliente en un proceso nuevo (solo verificación del objeto local),
+    - la misma consulta dentro del proceso ya verificado,
+y comprueba que una versión fijada que no coincide se rechaza sin dejar el objeto en el almacén.
+
+Uso:
+    python 08_APP_U/bench_model_registry.py --mb 50
+"""
+import argparse
+import functools
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import time
+import model_registry
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servir(directorio):
+    handler = functools.partial(_Handler, directory=directorio)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return (time.perf_counter() - inicio) * 1000, resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del almacén local de modelos")
+    parser.add_argument("--mb", type=int, default=50, help="Tamaño del modelo de prueba en MB")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="ironbrick_modelos_")
+    with open(os.path.join(directorio, "modelo.pkl"), "wb") as f:
+        f.write(os.urandom(args.mb * 1024 * 1024))
+    servidor = servir(directorio)
+    url = f"http://127.0.0.1:{servidor.server_port}/modelo.pkl"
+
+    model_registry.STORE_DIR = os.path.join(directorio, "almacen")
+    manifiesto = {"prueba": {"url": url, "fichero": "modelo.pkl", "sha256": None}}
+    try:
+        t_frio, (path, sha256) = medir(lambda: model_registry.obtener_modelo("prueba", manifiesto))
+        # Un proceso nuevo no tiene nada verificado: lee y comprueba el objeto local
+        model_registry._verificados.clear()
+        t_caliente, _ = medir(lambda: model_registry.obtener_modelo("prueba", manifiesto))
+        t_memoria, _ = medir(lambda: model_registry.obtener_modelo("prueba", manifiesto))
+
+        print(f"Modelo de prueba: {args.mb} MB | sha256 {sha256[:12]}")
+        print(f"{'fase':<38} {'ms':>9}")
+        print(f"{'frío (descarga + verificación)':<38} {t_frio:>9.1f}")
+        print(f"{'caliente (almacén local + verificación)':<38} {t_caliente:>9.1f}")
+        print(f"{'ya verificado en el proceso':<38} {t_memoria:>9.3f}")
+
+        manifiesto["otra"] = {"url": url, "fichero": "modelo.pkl", "sha256": "0" * 64}
+        try:
+            model_registry.obtener_modelo("otra", manifiesto)
+            print("❌ La versión fijada incorrecta no se ha rechazado")
+        except model_registry.ChecksumInvalido:
+            objetos = os.listdir(os.path.join(model_registry.STORE_DIR, "objetos"))
+            print(f"Versión fijada incorrecta rechazada: True | objetos en el almacén: {len(objetos)}")
+    finally:
+        servidor.shutdown()
+        shutil.rmtree(directorio, ignore_errors=True)
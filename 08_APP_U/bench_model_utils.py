@@ -0,0 +1,88 @@
+"""
+Benchmark en CPU de los modos de inferencia del identificador (model_utils.load_model): eager float32,
+"torchscript" (channels_last + trace + freeze) e "int8" (además, capas lineales cuantizadas).
+
+Para cada modo, en un proceso nuevo, mide la construcción o la carga desde la caché junto al .pth, la
+memoria residente tras cargar, la latencia con lotes de 1 y de 6 imágenes (una identificación con
+num_tta = 5) y la deriva frente al modelo eager.
+
+Usa el modelo real del almacén de modelos si se pasa --modelo-real y, si no, los pesos de una EfficientNet-B0
+sin entrenar guardados en un .pth temporal.
+
+Uso:
+    python 08_APP_U/bench_model_utils.py --repeticiones 20
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPT = """
+import json, resource, sys, time
+sys.path.insert(0, {directorio!r})
+import torch
+from model_utils import load_model, medir_deriva
+
+inicio = time.perf_counter()
+model = load_model({pth!r}, optimizacion={optimizacion!r})
+t_carga = time.perf_counter() - inicio
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+latencias = {{}}
+with torch.inference_mode():
+    for tam in (1, 6):
+        batch = torch.randn(tam, 3, 224, 224)
+        for _ in range(3):
+            model(batch)
+        inicio = time.perf_counter()
+        for _ in range({repeticiones}):
+            model(batch)
+        latencias[tam] = (time.perf_counter() - inicio) / {repeticiones} * 1000
+
+deriva = medir_deriva(load_model({pth!r}, optimizacion=""), model) if {optimizacion!r} else {{}}
+print(json.dumps({{"carga": t_carga, "rss_mb": rss_mb, "lat1": latencias[1], "lat6": latencias[6], **deriva}}))
+"""
+
+
+def medir(pth, optimizacion, repeticiones):
+    codigo = SCRIPT.format(directorio=DIRECTORIO, pth=pth, optimizacion=optimizacion, repeticiones=repeticiones)
+    salida = subprocess.run([sys.executable, "-c", codigo], check=True, capture_output=True, text=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los modos de inferencia optimizada en CPU")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--modelo-real", action="store_true", help="Usa el modelo del almacén de modelos")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="ironbrick_optimizado_")
+    try:
+        # Copia del .pth en un directorio temporal para que las versiones optimizadas se construyan desde cero
+        pth = os.path.join(directorio, "modelo.pth")
+        if args.modelo_real:
+            from model_registry import obtener_modelo
+            shutil.copyfile(obtener_modelo("identificador")[0], pth)
+        else:
+            import torch
+            from bench_predict import modelo_sin_entrenar
+            torch.save(modelo_sin_entrenar().state_dict(), pth)
+
+        print(f"{'modo':<12} {'fase':<11} {'carga (s)':>9} {'RSS (MB)':>9} {'lote 1 (ms)':>12} {'lote 6 (ms)':>12} "
+              f"{'máx. dif.':>10} {'desac. top1':>12} {'.pt (MB)':>9}")
+        for optimizacion in ("", "torchscript", "int8"):
+            # La primera vez se construye y guarda; la segunda se carga de la caché junto al .pth
+            for fase in (("construye", "caché") if optimizacion else ("eager",)):
+                r = medir(pth, optimizacion, args.repeticiones)
+                pt = f"{pth}.{optimizacion}.pt"
+                tamano = os.path.getsize(pt) / 1e6 if optimizacion and os.path.exists(pt) else os.path.getsize(pth) / 1e6
+                print(f"{optimizacion or 'eager':<12} {fase:<11} {r['carga']:>9.2f} {r['rss_mb']:>9.0f} "
+                      f"{r['lat1']:>12.1f} {r['lat6']:>12.1f} {r.get('max_diferencia_prob', 0):>10.2e} "
+                      f"{r.get('desacuerdo_top1', 0):>12.1%} {tamano:>9.1f}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
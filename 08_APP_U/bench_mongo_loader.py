@@ -0,0 +1,88 @@
+"""
+Benchmark de la carga tipada del catálogo (mongo_loader.cargar_catalogo) frente a
+pd.DataFrame(list(collection.find({}, {"_id": 0}))), el camino anterior de load_data().
+
+Mide el tiempo y el pico de memoria de Python (tracemalloc, en otra pasada) de cada camino hasta la matriz de features,
+el tamaño del DataFrame resultante, y comprueba que las filas y las features coinciden.
+
+Usa un mongod local si se indica --uri y, si no, mongomock (que filtra y proyecta en Python, así que
+la ganancia de tiempo contra un servidor real es mayor).
+
+Uso:
+    python 08_APP_U/bench_mongo_loader.py --documentos 50000
+    python 08_APP_U/bench_mongo_loader.py --uri mongodb://localhost:27017 --documentos 500000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from feature_utils import build_feature_matrix, preprocess_data
+from mongo_loader import cargar_catalogo
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "df_lego_final_venta.csv")
+
+
+def crear_coleccion(uri, n_documentos):
+    if uri:
+        import pymongo
+        collection = pymongo.MongoClient(uri)["ironbrick_bench"]["catalogo"]
+    else:
+        import mongomock
+        collection = mongomock.MongoClient()["ironbrick_bench"]["catalogo"]
+    collection.drop()
+
+    df = pd.read_csv(DATA_PATH)
+    df = pd.concat([df] * -(-n_documentos // len(df)), ignore_index=True).head(n_documentos)
+    df["Number"] = df["Number"].astype(str) + "-" + df.index.astype(str)
+    for inicio in range(0, len(df), 10_000):
+        collection.insert_many(df.iloc[inicio:inicio + 10_000].to_dict("records"))
+    return collection
+
+
+def carga_legacy(collection):
+    return pd.DataFrame(list(collection.find({}, {"_id": 0})))
+
+
+def cargar_features(funcion, collection):
+    df = preprocess_data(funcion(collection))
+    return df, build_feature_matrix(df)
+
+
+def medir(funcion, collection):
+    # tracemalloc ralentiza mucho las asignaciones pequeñas: el tiempo y el pico se miden en pasadas distintas
+    inicio = time.perf_counter()
+    df, X = cargar_features(funcion, collection)
+    duracion = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    cargar_features(funcion, collection)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, X, duracion, pico
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la carga tipada del catálogo desde MongoDB")
+    parser.add_argument("--uri", default=None, help="URI de un mongod local (por defecto, mongomock)")
+    parser.add_argument("--documentos", type=int, default=50_000)
+    parser.add_argument("--lote", type=int, default=5_000)
+    args = parser.parse_args()
+
+    collection = crear_coleccion(args.uri, args.documentos)
+
+    df_a, X_a, t_a, pico_a = medir(carga_legacy, collection)
+    df_b, X_b, t_b, pico_b = medir(lambda c: cargar_catalogo(c, tamano_lote=args.lote), collection)
+
+    mb = 1024 * 1024
+    print(f"Documentos: {args.documentos}")
+    print(f"{'camino':>10} {'tiempo (s)':>11} {'pico (MB)':>10} {'DataFrame (MB)':>15} {'columnas':>9}")
+    for nombre, df, t, pico in (("anterior", df_a, t_a, pico_a), ("tipado", df_b, t_b, pico_b)):
+        print(f"{nombre:>10} {t:>11.2f} {pico / mb:>10.1f} {df.memory_usage(deep=True).sum() / mb:>15.1f} "
+              f"{df.shape[1]:>9}")
+    print(f"Reducción: {t_a / t_b:.1f}x en tiempo, {pico_a / pico_b:.1f}x en pico de memoria")
+
+    print(f"Mismas filas: {df_a['Number'].astype(str).tolist() == df_b['Number'].tolist()}")
+    diferencia = np.abs(X_a.astype(np.float64) - X_b.astype(np.float64)).max() if len(X_a) else 0.0
+    print(f"Máxima diferencia en la matriz de features: {diferencia:.2e}")
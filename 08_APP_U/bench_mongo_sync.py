@@ -0,0 +1,98 @@
+"""
+Benchmark de la sincronización incremental del catálogo (mongo_sync.CatalogoSync) frente a recargar
+la colección completa con find({}) como hacía load_data().
+
+Usa un mongod local si se indica --uri y, si no, mongomock. El catálogo de data/df_lego_final_venta.csv
+se replica hasta --documentos, se modifican/insertan/borran --cambios documentos y se comprueba que el
+DataFrame sincronizado coincide con una recarga completa.
+
+Uso:
+    python 08_APP_U/bench_mongo_sync.py --documentos 50000 --cambios 10 100 1000
+    python 08_APP_U/bench_mongo_sync.py --uri mongodb://localhost:27017 --documentos 200000
+"""
+import argparse
+import datetime
+import os
+import time
+import pandas as pd
+from mongo_sync import CAMPO_MARCA, CatalogoSync, marcar_documentos
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "df_lego_final_venta.csv")
+
+
+def crear_coleccion(uri, n_documentos):
+    if uri:
+        import pymongo
+        collection = pymongo.MongoClient(uri)["ironbrick_bench"]["catalogo"]
+    else:
+        import mongomock
+        collection = mongomock.MongoClient()["ironbrick_bench"]["catalogo"]
+    collection.drop()
+
+    df = pd.read_csv(DATA_PATH)
+    repeticiones = -(-n_documentos // len(df))
+    df = pd.concat([df] * repeticiones, ignore_index=True).head(n_documentos)
+    df["Number"] = df["Number"].astype(str) + "-" + (df.index // len(df.drop_duplicates("Number"))).astype(str)
+    collection.insert_many(df.to_dict("records"))
+    marcar_documentos(collection)
+    return collection
+
+
+def aplicar_cambios(collection, n_cambios, ronda):
+    """Sube el precio de n_cambios sets, da de alta n_cambios // 10 y borra otros tantos."""
+    if n_cambios == 0:
+        return
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    ids = [d["_id"] for d in collection.find({}, {"_id": 1}).limit(n_cambios + n_cambios // 10)]
+    collection.update_many({"_id": {"$in": ids[:n_cambios]}},
+                           {"$inc": {"USRetailPrice": 1.0}, "$set": {CAMPO_MARCA: ahora}})
+    if n_cambios // 10:
+        collection.delete_many({"_id": {"$in": ids[n_cambios:]}})
+        plantilla = collection.find_one({}, {"_id": 0})
+        collection.insert_many([{**plantilla, "Number": f"nuevo-{ronda}-{i}", CAMPO_MARCA: ahora}
+                                for i in range(n_cambios // 10)])
+
+
+def recarga_completa(collection):
+    return pd.DataFrame(list(collection.find({}, {"_id": 0})))
+
+
+def normalizar(df):
+    df = df.drop(columns=[CAMPO_MARCA], errors="ignore")
+    return df.sort_values("Number").reset_index(drop=True)[sorted(df.columns)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la sincronización incremental del catálogo")
+    parser.add_argument("--uri", default=None, help="URI de un mongod local (por defecto, mongomock)")
+    parser.add_argument("--documentos", type=int, default=50_000)
+    parser.add_argument("--cambios", type=int, nargs="+", default=[0, 10, 100, 1_000])
+    args = parser.parse_args()
+
+    collection = crear_coleccion(args.uri, args.documentos)
+
+    inicio = time.perf_counter()
+    recarga_completa(collection)
+    t_completa = time.perf_counter() - inicio
+
+    # mongomock no implementa change streams
+    sync = CatalogoSync(collection, intervalo=0, usar_change_streams=bool(args.uri))
+    sync.sincronizar()
+    print(f"Documentos: {args.documentos} | modo: {sync.modo} | recarga completa: {t_completa:.3f} s")
+
+    print(f"{'cambios':>8} {'sync (s)':>9} {'leídos':>8} {'versión':>8} {'coincide':>9}")
+    for ronda, n_cambios in enumerate(args.cambios):
+        # La marca tiene resolución de milisegundos: se deja pasar un instante entre rondas
+        time.sleep(0.01)
+        aplicar_cambios(collection, n_cambios, ronda)
+        leidos_antes = sync.estadisticas["documentos_leidos"]
+
+        inicio = time.perf_counter()
+        version = sync.sincronizar()
+        t_sync = time.perf_counter() - inicio
+
+        coincide = normalizar(sync.dataframe()).equals(normalizar(recarga_completa(collection)))
+        print(f"{n_cambios:>8} {t_sync:>9.3f} {sync.estadisticas['documentos_leidos'] - leidos_antes:>8} "
+              f"{version:>8} {str(coincide):>9}")
+
+    sync.cerrar()
@@ -0,0 +1,101 @@
+"""
+Benchmark en CPU de la identificación con TTA: una pasada del modelo por vista (como estaba antes) frente a
+predict.predict, que apila todas las vistas en un lote y hace una sola pasada con el promedio en el dispositivo.
+
+Usa el modelo real del almacén de modelos si está disponible (--modelo-real) y, si no, una EfficientNet-B0
+sin entrenar con la misma cabeza: la latencia depende de la arquitectura, no de los pesos. Las imágenes son
+las de 07_Camera/Test_image. Para cada num_tta se comprueba que ambos caminos dan las mismas probabilidades
+sobre las mismas vistas.
+
+Uso:
+    python 08_APP_U/bench_predict.py --num-tta 0 5 10 --repeticiones 5
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+from torchvision import models
+from predict import predecir_lote, preparar_lote, transform
+from tta import apply_tta
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+IMAGENES = sorted(glob.glob(os.path.join(BASE_DIR, "07_Camera/Test_image/*.jpg")))
+MAPPING_PATH = os.path.join(BASE_DIR, "07_Camera/Streamlit/idx_to_class.json")
+
+
+def modelo_sin_entrenar():
+    with open(MAPPING_PATH, "r") as f:
+        num_classes = len(json.load(f))
+    model = models.efficientnet_b0(weights=None)
+    model.classifier = nn.Sequential(nn.Dropout(0.5), nn.Linear(model.classifier[1].in_features, 512),
+                                     nn.ReLU(), nn.Linear(512, num_classes))
+    return model.eval()
+
+
+def predict_anterior(images, model):
+    """Bucle anterior de predict.predict sobre vistas ya generadas: una pasada y un softmax por vista."""
+    images = [transform(img).unsqueeze(0) for img in images]
+    with torch.no_grad():
+        outputs = [model(img) for img in images]
+        probabilities = [torch.nn.functional.softmax(out, dim=1).cpu().numpy() for out in outputs]
+    return np.mean(probabilities, axis=0)
+
+
+def predict_lote(images, model):
+    return predecir_lote(torch.stack([transform(img) for img in images]), model)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la identificación con TTA en CPU")
+    parser.add_argument("--num-tta", type=int, nargs="+", default=[0, 5, 10])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--hilos", type=int, default=None, help="torch.set_num_threads (por defecto, el de torch)")
+    parser.add_argument("--modelo-real", action="store_true", help="Usa el modelo del almacén de modelos")
+    args = parser.parse_args()
+
+    if args.hilos:
+        torch.set_num_threads(args.hilos)
+    if args.modelo_real:
+        from model_registry import obtener_modelo
+        from model_utils import load_model
+        model = load_model(obtener_modelo("identificador")[0]).cpu()
+    else:
+        model = modelo_sin_entrenar()
+
+    imagenes = [Image.open(path).convert("RGB") for path in IMAGENES]
+    print(f"Imágenes: {len(imagenes)} | hilos: {torch.get_num_threads()} | modelo real: {args.modelo_real}")
+    print(f"{'num_tta':>7} {'vistas':>6} {'anterior (ms)':>14} {'lote (ms)':>10} {'mejora':>7} {'máx. dif.':>10}")
+
+    # Calentamiento
+    predict_lote(apply_tta(imagenes[0], num_tta=1), model)
+
+    for num_tta in args.num_tta:
+        torch.manual_seed(0)
+        vistas = [apply_tta(img, num_tta=num_tta) for img in imagenes]
+
+        diferencia = max(float(np.abs(predict_anterior(v, model) - predict_lote(v, model)).max()) for v in vistas)
+
+        tiempos = {}
+        for nombre, funcion in (("anterior", predict_anterior), ("lote", predict_lote)):
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                for v in vistas:
+                    funcion(v, model)
+            tiempos[nombre] = (time.perf_counter() - inicio) / (args.repeticiones * len(vistas)) * 1000
+
+        print(f"{num_tta:>7} {num_tta + 1:>6} {tiempos['anterior']:>14.1f} {tiempos['lote']:>10.1f} "
+              f"{tiempos['anterior'] / tiempos['lote']:>6.2f}x {diferencia:>10.2e}")
+
+    # Latencia completa por identificación (TTA sobre PIL + lote + pasada), como en la app
+    for num_tta in args.num_tta:
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            for img in imagenes:
+                predecir_lote(preparar_lote(img, num_tta=num_tta), model)
+        t = (time.perf_counter() - inicio) / (args.repeticiones * len(imagenes)) * 1000
+        print(f"predict completo num_tta={num_tta}: {t:.1f} ms por identificación")
@@ -0,0 +1,83 @@
+"""
+Benchmark de la preparación del recomendador de sets retirados (retirados.py) frente al código anterior de
+la página, que en cada rerun releía scraped_lego_data.csv, pivotaba el histórico y volvía a predecir.
+
+Comprueba que pivotar_historial da la misma tabla que el sort + cumcount + pivot anterior y mide:
+    - el pivotado anterior frente al vectorizado,
+    - un rerun anterior (leer CSV + pivotar) frente a cargar_retirados en frío, desde disco y desde memoria.
+Las fases con predicción necesitan xgboost instalado para cargar los modelos; si no, se omiten.
+
+Uso:
+    python 08_APP_U/bench_retirados.py --repeticiones 20
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+import retirados
+from retirados import CSV_PATH, INDEX_COLUMNS, PRICE_COLUMNS, pivotar_historial
+
+
+def pivot_anterior(df):
+    """Pivotado tal y como estaba en app_def.py y 04_Extra/APP/main.py."""
+    df = df.copy()
+    df["PriceDate"] = pd.to_datetime(df["PriceDate"], errors='coerce')
+    df = df.dropna(subset=["PriceDate"])
+    df_sorted = df.sort_values(by=['Number', 'PriceDate'])
+    df_sorted['PriceIndex'] = df_sorted.groupby('Number').cumcount()
+    df_transformed = df_sorted.pivot(index=INDEX_COLUMNS, columns='PriceIndex', values='PriceValue').reset_index()
+    df_transformed.columns = [f'Price_{col+1}' if isinstance(col, int) else col for col in df_transformed.columns]
+    df_transformed = df_transformed[INDEX_COLUMNS + PRICE_COLUMNS]
+    df_transformed[PRICE_COLUMNS] = df_transformed[PRICE_COLUMNS].fillna(0)
+    df_transformed.loc[:, 'Pieces'] = df_transformed['Pieces'].fillna(0)
+    df_transformed.loc[:, 'RetailPriceUSD'] = df_transformed['RetailPriceUSD'].fillna(0)
+    df_transformed.loc[df_transformed['CurrentValueNew'] == 0, 'CurrentValueNew'] = df_transformed['RetailPriceUSD']
+    return df_transformed.dropna()
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la preparación de sets retirados")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    t_anterior, anterior = medir(lambda: pivot_anterior(df), args.repeticiones)
+    t_nuevo, nuevo = medir(lambda: pivotar_historial(df), args.repeticiones)
+
+    anterior = anterior.reset_index(drop=True)
+    anterior.columns.name = None
+    coincide = anterior.equals(nuevo)
+    print(f"Filas del histórico: {len(df)} | sets: {len(nuevo)} | misma tabla: {coincide}")
+    print(f"{'fase':<34} {'ms':>9}")
+    print(f"{'pivot anterior':<34} {t_anterior:>9.2f}")
+    print(f"{'pivotar_historial':<34} {t_nuevo:>9.2f}")
+
+    t_rerun, _ = medir(lambda: pivot_anterior(pd.read_csv(args.csv)), args.repeticiones)
+    print(f"{'rerun anterior (sin predecir)':<34} {t_rerun:>9.2f}")
+
+    # Artefacto en un directorio temporal para no depender de lo que haya en la caché real
+    cache_dir = tempfile.mkdtemp(prefix="ironbrick_bench_")
+    retirados.CACHE_DIR = cache_dir
+    try:
+        t_frio, (df_sets, _) = medir(lambda: retirados.cargar_retirados(args.csv), 1)
+        retirados._cache.clear()
+        t_disco, (df_disco, _) = medir(lambda: retirados.cargar_retirados(args.csv), 1)
+        t_memoria, _ = medir(lambda: retirados.cargar_retirados(args.csv), args.repeticiones)
+        print(f"{'cargar_retirados en frío':<34} {t_frio:>9.2f}")
+        print(f"{'cargar_retirados desde disco':<34} {t_disco:>9.2f}")
+        print(f"{'cargar_retirados desde memoria':<34} {t_memoria:>9.4f}")
+        print(f"Artefacto de disco igual al cálculo: {df_disco.equals(df_sets)}")
+    except Exception as e:
+        print(f"⚠️ Fases con predicción omitidas (no se pudieron cargar los modelos): {e}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,100 @@
+"""
+Benchmark del servidor de modelos (servidor_modelos.py) con clientes concurrentes.
+
+Sirve un modelo tabular de prueba cuya llamada a predict() tiene un coste fijo (--coste-ms, como el de
+un ensemble de sklearn) más un coste por fila, y lanza --clientes hilos que piden predicciones de una
+fila por HTTP, como las sesiones de Streamlit y el bot. El servidor corre en otro proceso. Compara el servidor sin microlotes (una llamada
+al modelo por petición) con microlotes de hasta --max-filas filas, y comprueba que las predicciones
+coinciden con las del modelo local.
+
+Uso:
+    python 08_APP_U/bench_servidor_modelos.py --clientes 16 --peticiones 50 --coste-ms 5
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import numpy as np
+import pandas as pd
+from feature_utils import FEATURES
+from servidor_modelos import ClienteModelos, ServidorModelos, cargar_modelo
+
+
+class ModeloPrueba:
+    """Modelo lineal con el coste de llamada de un modelo real."""
+
+    def __init__(self, coste_ms, coste_fila_ms=0.01):
+        self.feature_names_in_ = np.array(FEATURES, dtype=object)
+        self.pesos = np.random.default_rng(0).standard_normal(len(FEATURES))
+        self.coste = coste_ms / 1000
+        self.coste_fila = coste_fila_ms / 1000
+        self._lock = threading.Lock()
+
+    def predict(self, X):
+        # Un solo predict a la vez, como un modelo que ya usa todos los núcleos
+        with self._lock:
+            time.sleep(self.coste + self.coste_fila * len(X))
+            return X[FEATURES].to_numpy(dtype=np.float64) @ self.pesos
+
+
+def servir(modelo, max_filas, espera_ms, puertos):
+    servidor = ServidorModelos({"prueba": (modelo, "prueba")}, max_filas=max_filas, espera_ms=espera_ms).servir(puerto=0)
+    puertos.put(servidor.server_port)
+    threading.Event().wait()
+
+
+def medir(url, filas, clientes, peticiones):
+    latencias = []
+    lock = threading.Lock()
+
+    def cliente(i):
+        modelo, _ = cargar_modelo("prueba", url=url)
+        propias = []
+        for j in range(peticiones):
+            fila = filas.iloc[[(i * peticiones + j) % len(filas)]]
+            inicio = time.perf_counter()
+            modelo.predict(fila)
+            propias.append((time.perf_counter() - inicio) * 1000)
+        with lock:
+            latencias.extend(propias)
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+    return clientes * peticiones / segundos, np.percentile(latencias, [50, 95])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del servidor de modelos")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=50, help="Peticiones por cliente")
+    parser.add_argument("--coste-ms", type=float, default=5.0, help="Coste fijo de cada llamada a predict()")
+    parser.add_argument("--max-filas", type=int, default=64)
+    parser.add_argument("--espera-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    modelo = ModeloPrueba(args.coste_ms)
+    filas = pd.DataFrame(np.random.default_rng(1).standard_normal((1000, len(FEATURES))), columns=FEATURES)
+
+    print(f"Clientes: {args.clientes} x {args.peticiones} peticiones de 1 fila | coste por llamada: {args.coste_ms} ms")
+    print(f"{'servidor':<26} {'peticiones/s':>13} {'p50 (ms)':>9} {'p95 (ms)':>9} {'peticiones/lote':>16}")
+    for etiqueta, max_filas, espera_ms in (("sin microlotes", 1, 0.0),
+                                           (f"microlotes ({args.espera_ms} ms)", args.max_filas, args.espera_ms)):
+        puertos = multiprocessing.Queue()
+        proceso = multiprocessing.Process(target=servir, args=(modelo, max_filas, espera_ms, puertos), daemon=True)
+        proceso.start()
+        url = f"http://127.0.0.1:{puertos.get()}"
+        try:
+            por_segundo, (p50, p95) = medir(url, filas, args.clientes, args.peticiones)
+            lotes = ClienteModelos(url).metricas()["prueba"]
+            remotas = ClienteModelos(url).predecir("prueba", filas)
+        finally:
+            proceso.terminate()
+        print(f"{etiqueta:<26} {por_segundo:>13.0f} {p50:>9.1f} {p95:>9.1f} {lotes['peticiones_por_lote']:>16.1f}")
+
+    # Iguales salvo el redondeo del producto matricial, que depende de la disposición en memoria
+    print(f"Predicciones iguales a las del modelo local: {np.allclose(remotas, modelo.predict(filas), rtol=0, atol=1e-12)}")
@@ -0,0 +1,94 @@
+"""
+Benchmark de los dos modos de TTA del identificador: "aleatorio" (transformaciones aleatorias de PIL) frente a
+"determinista" (vistas fijas como grid_sample sobre el lote ya redimensionado).
+
+Para cada num_tta mide, sobre las imágenes de 07_Camera/Test_image y en CPU:
+    - la latencia por identificación (generación de vistas + pasada del modelo),
+    - la reproducibilidad: en cuántas imágenes la clase predicha es la misma en todas las repeticiones,
+    - el acierto top-1, si se pasa --etiquetas con un CSV "imagen,Number" (las imágenes de prueba no
+      traen etiqueta), o si no la coincidencia con la predicción sin TTA.
+
+El acierto solo tiene sentido con el modelo entrenado (--modelo-real, desde el almacén de modelos). Al final
+se indica, para cada num_tta, si el modo determinista iguala el acierto del aleatorio (con --tolerancia puntos
+de margen): es la condición para cambiar el modo por defecto de tta.TTA_MODO, que sigue siendo "aleatorio".
+
+Uso:
+    python 08_APP_U/bench_tta.py --modelo-real --etiquetas etiquetas.csv --num-tta 0 5 10
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import torch
+from PIL import Image
+from bench_predict import IMAGENES, MAPPING_PATH, modelo_sin_entrenar
+from predict import predecir_lote, preparar_lote
+
+MODOS = ("aleatorio", "determinista")
+
+
+def clases(imagenes, model, num_tta, modo):
+    return [int(np.argmax(predecir_lote(preparar_lote(img, num_tta=num_tta, modo=modo), model)))
+            for img in imagenes]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latencia y acierto de los modos de TTA")
+    parser.add_argument("--num-tta", type=int, nargs="+", default=[0, 5, 10])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--etiquetas", default=None, help="CSV con columnas imagen,Number")
+    parser.add_argument("--modelo-real", action="store_true", help="Usa el modelo del almacén de modelos")
+    parser.add_argument("--tolerancia", type=float, default=1.0, help="Pérdida de acierto admitida, en puntos")
+    args = parser.parse_args()
+
+    if args.modelo_real:
+        from model_registry import obtener_modelo
+        from model_utils import load_model
+        model = load_model(obtener_modelo("identificador")[0]).cpu()
+        with open(obtener_modelo("mapeo_identificador")[0], "r") as f:
+            idx_to_class = json.load(f)
+    else:
+        model = modelo_sin_entrenar()
+        with open(MAPPING_PATH, "r") as f:
+            idx_to_class = json.load(f)
+
+    imagenes = [Image.open(path).convert("RGB") for path in IMAGENES]
+    nombres = [os.path.basename(path) for path in IMAGENES]
+
+    if args.etiquetas:
+        etiquetas = pd.read_csv(args.etiquetas, dtype=str).set_index("imagen")["Number"]
+        referencia = [etiquetas.get(nombre) for nombre in nombres]
+        criterio = "acierto top-1"
+    else:
+        referencia = [idx_to_class[str(c)] for c in clases(imagenes, model, 0, "determinista")]
+        criterio = "coincide sin TTA"
+
+    # Calentamiento
+    predecir_lote(preparar_lote(imagenes[0], num_tta=1, modo="determinista"), model)
+
+    print(f"Imágenes: {len(imagenes)} | hilos: {torch.get_num_threads()} | modelo real: {args.modelo_real}")
+    print(f"{'modo':<13} {'num_tta':>7} {'ms/imagen':>10} {'reproducible':>13} {criterio:>17}")
+    acierto = {}
+    for num_tta in args.num_tta:
+        for modo in MODOS:
+            predicciones = []
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                predicciones.append(clases(imagenes, model, num_tta, modo))
+            t = (time.perf_counter() - inicio) / (args.repeticiones * len(imagenes)) * 1000
+
+            estables = sum(len(set(p)) == 1 for p in zip(*predicciones))
+            aciertos = np.mean([[idx_to_class[str(c)] == ref for c, ref in zip(p, referencia)]
+                                for p in predicciones])
+            acierto[modo, num_tta] = aciertos
+            print(f"{modo:<13} {num_tta:>7} {t:>10.1f} {f'{estables}/{len(imagenes)}':>13} {aciertos:>17.1%}")
+
+    for num_tta in args.num_tta:
+        diferencia = (acierto["determinista", num_tta] - acierto["aleatorio", num_tta]) * 100
+        paridad = diferencia >= -args.tolerancia
+        print(f"num_tta={num_tta}: determinista {diferencia:+.1f} puntos frente a aleatorio "
+              f"({criterio}) -> {'paridad' if paridad else 'sin paridad'}")
+    if not (args.modelo_real and args.etiquetas):
+        print("⚠️ La paridad solo cuenta con --modelo-real y --etiquetas")
@@ -1,115 +1,123 @@
+"""
+Bot de Telegram con alertas de inversión en LEGO.
+
+Importar el módulo no tiene efectos secundarios (por ejemplo, desde la página de alertas de Streamlit): el
+cliente de Telegram, la cola de envío, el modelo y el catálogo puntuado son servicios que se crean la
+primera vez que se usan, y el arranque del bot (migraciones, comandos y alerta mensual) se hace con
+iniciar(). pandas, numpy, requests, telebot y schedule solo se importan en las funciones que los usan.
+Ver bench_import_bot.py para el tiempo de importación.
+
+Uso:
+    python 08_APP_U/bot_telegram.py
+"""
 import os
-import psycopg2
-import telebot
-import joblib
-import requests
-import pandas as pd
-import numpy as np
-import schedule
+import threading
 import time
+from db import get_db_connection
+from migrations import aplicar_migraciones
 
 # Obtenemos el token del bot
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
 
-# URL de la base de datos PostgreSQL en Render
-DB_URL = os.getenv("DATABASE_URL")
-
-# URL del modelo de predicción en GitHub
-modelo_url = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/05_Streamlit/models/stacking_model.pkl"
-
-# URL del dataset de LEGO en GitHub
-dataset_url = "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/01_Data_Cleaning/df_lego_final_venta.csv"
-
-# Función para conectar a la base de datos PostgreSQL en Render
-def get_db_connection():
-    return psycopg2.connect(DB_URL, sslmode="require")
-
-# Cargamos el modelo de predicción
+# Servicios ya creados: nombre -> servicio (RLock: el catálogo pide el modelo mientras se crea)
+_servicios = {}
+_servicios_lock = threading.RLock()
+
+def _servicio(nombre, crear):
+    servicio = _servicios.get(nombre)
+    if servicio is None:
+        with _servicios_lock:
+            servicio = _servicios.get(nombre)
+            if servicio is None:
+                servicio = _servicios[nombre] = crear()
+    return servicio
+
+def get_bot():
+    """Cliente de Telegram (telebot solo se importa al crearlo)."""
+    def crear():
+        import telebot
+        return telebot.TeleBot(TELEGRAM_BOT_TOKEN)
+    return _servicio("bot", crear)
+
+def get_sender():
+    """Cola de envío concurrente para la alerta mensual."""
+    from envios import TelegramSender
+    return _servicio("sender", lambda: TelegramSender(TELEGRAM_BOT_TOKEN,
+                                                      workers=int(os.getenv("TELEGRAM_SEND_WORKERS", "8"))))
+
+# Cargamos el modelo de predicción junto con su versión (hash SHA-256): del servidor de modelos si
+# IRONBRICK_SERVIDOR_MODELOS está definido y, si no, desde el almacén local de modelos
 def load_model():
-    modelo_path = "/tmp/stacking_model.pkl"
-    
-    if not os.path.exists(modelo_path):
-        response = requests.get(modelo_url)
-        with open(modelo_path, "wb") as f:
-            f.write(response.content)
-    
-    return joblib.load(modelo_path)
+    from servidor_modelos import cargar_modelo
+    return cargar_modelo("stacking")
 
-modelo = load_model()
+def get_modelo():
+    return _servicio("modelo", load_model)
 
-# Cargamos y procesamos el dataset de LEGO
+# Cargamos (versión columnar en caché), procesamos y puntuamos el dataset de LEGO (las puntuaciones se reutilizan desde disco)
 def load_data():
-    df = pd.read_csv(dataset_url)
-    return preprocess_data(df)
-
-def preprocess_data(df):
-    df = df[df['USRetailPrice'] > 0].copy()
-
-    exclusivity_mapping = {'Regular': 0, 'Exclusive': 1}
-    df['Exclusivity'] = df['Exclusivity'].map(exclusivity_mapping)
-
-    size_category_mapping = {'Small': 0, 'Medium': 1, 'Large': 2}
-    df['SizeCategory'] = df['SizeCategory'].map(size_category_mapping)
-
-    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
-    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
-    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
-
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    df[numeric_cols] = df[numeric_cols].replace([np.inf, -np.inf], np.nan)
-    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
-
-    return df
-
-df_lego = load_data()
+    from datasets import _origen, cargar_dataset, ruta_csv
+    from feature_utils import load_features
+    from scoring import score_catalogue
+    modelo, modelo_version = get_modelo()
+    df = cargar_dataset("catalogo")
+    df_lego, X_lego = load_features(df, origen=_origen(ruta_csv("catalogo")))
+    return score_catalogue(df_lego, X_lego, modelo, modelo_version)
+
+def catalogo_de(df_lego):
+    """
+    (df_lego, fichas): el catálogo puntuado y ordenado con las fichas de los sets para los mensajes (se leen
+    por posición sin crear una Serie de pandas por mensaje).
+    """
+    from fichas import FichasSets
+    return df_lego, FichasSets(df_lego, ["SetName", "USRetailPrice", "PredictedInvestmentScore", "Theme"])
+
+def get_catalogo():
+    """Catálogo del bot (ver catalogo_de): se carga, preprocesa y puntúa la primera vez que se pide."""
+    return _servicio("catalogo", lambda: catalogo_de(load_data()))
 
 # Función para obtener el mejor set sin repetir recomendaciones
-def obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, temas_favoritos):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT set_id FROM recomendaciones WHERE telegram_id = %s", (str(telegram_id),))
-    sets_recomendados = {row[0] for row in cursor.fetchall()}
-
-    df_filtrado = df_lego[(df_lego["USRetailPrice"] >= presupuesto_min) & 
-                           (df_lego["USRetailPrice"] <= presupuesto_max)]
+def obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, temas_favoritos, catalogo=None):
+    import numpy as np
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT set_id FROM recomendaciones WHERE telegram_id = %s", (str(telegram_id),))
+        sets_recomendados = {row[0] for row in cursor.fetchall()}
+
+    # El catálogo ya está puntuado y ordenado: basta con filtrar y quedarse con el primero
+    df_lego, fichas = catalogo or get_catalogo()
+    mask = ((df_lego["USRetailPrice"] >= presupuesto_min) &
+            (df_lego["USRetailPrice"] <= presupuesto_max)).to_numpy()
 
     if "Todos" not in temas_favoritos:
-        df_filtrado = df_filtrado[df_filtrado["Theme"].isin(temas_favoritos)]
+        mask &= df_lego["Theme"].isin(temas_favoritos).to_numpy()
 
-    df_filtrado = df_filtrado[~df_filtrado["Number"].astype(str).isin(sets_recomendados)]
+    mask &= ~df_lego["Number"].astype(str).isin(sets_recomendados).to_numpy()
 
-    if df_filtrado.empty:
+    if not mask.any():
         return None
 
-    features = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit', 'ResaleDemand', 
-                'AnnualPriceIncrease', 'Exclusivity', 'SizeCategory', 'PricePerPiece', 
-                'PricePerMinifig', 'YearsOnMarket']
-    
-    for col in features:
-        if col not in df_filtrado.columns:
-            df_filtrado[col] = 0  
-
-    df_filtrado["PredictedInvestmentScore"] = modelo.predict(df_filtrado[features])
-
-    return df_filtrado.sort_values(by="PredictedInvestmentScore", ascending=False).iloc[0]
+    return fichas.en_posicion(np.flatnonzero(mask)[0])
 
 # Función para enviar recomendación a todos los usuarios registrados (mensual)
 def enviar_recomendaciones():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT telegram_id, presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios")
-    usuarios = cursor.fetchall()
-    
-    for user in usuarios:
-        user_id, presupuesto_min, presupuesto_max, temas_favoritos = user
-        temas_favoritos = temas_favoritos.split(",")
+    from alertas import cargar_usuarios, cargar_historial, guardar_recomendaciones, recomendar_lote
+    from envios import registrar_envios
+    # Lectura: dos consultas en total; se confirma para no dejar la transacción abierta y la conexión
+    # vuelve al pool antes del envío (a 30 mensajes/s puede durar cerca de una hora)
+    with get_db_connection() as conn:
+        usuarios = cargar_usuarios(conn)
+        historial = cargar_historial(conn)
+        conn.commit()
 
-        mejor_set = obtener_nueva_recomendacion(user_id, presupuesto_min, presupuesto_max, temas_favoritos)
+    # Una única resolución vectorizada para todos los usuarios
+    df_lego, fichas = get_catalogo()
+    mejores = recomendar_lote(df_lego, usuarios, historial)
 
-        if mejor_set is not None:
+    mensajes, set_ids = [], []
+    for user_id, posicion in mejores.items():
+        if posicion is not None:
+            mejor_set = fichas.en_posicion(posicion)
             mensaje = f"📊 *Nueva Oportunidad de Inversión en LEGO*\n\n"
             mensaje += f"🧱 *{mejor_set['SetName']}* ({mejor_set['Number']})\n"
             mensaje += f"💰 *Precio:* ${mejor_set['USRetailPrice']:.2f}\n"
@@ -117,30 +125,41 @@ def enviar_recomendaciones():
             mensaje += f"🛒 *Tema:* {mejor_set['Theme']}\n"
             mensaje += f"🔗 [Ver en BrickLink](https://www.bricklink.com/v2/catalog/catalogitem.page?S={mejor_set['Number']})\n"
 
-            bot.send_message(user_id, mensaje, parse_mode="Markdown")
+            mensajes.append((user_id, mensaje, "Markdown"))
+            set_ids.append(mejor_set["Number"])
         else:
-            bot.send_message(user_id, "😞 No encontramos sets adecuados en tu rango de presupuesto y temas seleccionados.")
+            mensajes.append((user_id, "😞 No encontramos sets adecuados en tu rango de presupuesto y temas seleccionados.", None))
+            set_ids.append(None)
+
+    # Envío concurrente respetando los límites de Telegram, con reintentos (sin conexión a la base de datos)
+    resultados = get_sender().enviar_lote(mensajes)
+
+    # Escritura con una conexión nueva: resultado de cada envío y sets que realmente se entregaron
+    enviadas = [(r["chat_id"], set_id) for r, set_id in zip(resultados, set_ids)
+                if set_id is not None and r["estado"] == "enviado"]
+    with get_db_connection() as conn:
+        registrar_envios(conn, resultados, set_ids)
+        guardar_recomendaciones(conn, enviadas)
 
-    conn.close()
+    fallidos = sum(r["estado"] != "enviado" for r in resultados)
+    print(f"📬 Alerta mensual: {len(resultados) - fallidos} mensajes enviados, {fallidos} fallidos.")
 
 # Función para confirmar la inscripción
 def confirmar_suscripcion(telegram_id):
     """Envia un mensaje de confirmación al usuario con sus datos de suscripción."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (telegram_id,))
-    usuario = cursor.fetchone()
-
-    if usuario:
-        presupuesto_min, presupuesto_max, temas_favoritos = usuario
-        mensaje = (f"📢 *¡Hemos recibido tu suscripción!* 🎉\n\n"
-                   f"💰 *Rango de precios:* ${presupuesto_min} - ${presupuesto_max}\n"
-                   f"🛒 *Temas favoritos:* {temas_favoritos}\n\n"
-                   "🔔 Recibirás recomendaciones de inversión en LEGO según estas preferencias.")
-        bot.send_message(telegram_id, mensaje, parse_mode="Markdown")
+        cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (telegram_id,))
+        usuario = cursor.fetchone()
 
-    conn.close()
+        if usuario:
+            presupuesto_min, presupuesto_max, temas_favoritos = usuario
+            mensaje = (f"📢 *¡Hemos recibido tu suscripción!* 🎉\n\n"
+                       f"💰 *Rango de precios:* ${presupuesto_min} - ${presupuesto_max}\n"
+                       f"🛒 *Temas favoritos:* {temas_favoritos}\n\n"
+                       "🔔 Recibirás recomendaciones de inversión en LEGO según estas preferencias.")
+            get_bot().send_message(telegram_id, mensaje, parse_mode="Markdown")
 
 # Función para clasificar la rentabilidad en categorías
 def clasificar_revalorizacion(score):
@@ -155,21 +174,24 @@ def clasificar_revalorizacion(score):
     else:
         return "Ninguna"
 
-# Función para enviar recomendación manual a un usuario específico
-def enviar_recomendacion_manual(telegram_id):
+# Función para enviar recomendación manual a un usuario específico. Desde la app se pasa su catálogo ya
+# puntuado (df_lego) para no cargar ni puntuar el del bot dentro de la petición de Streamlit
+def enviar_recomendacion_manual(telegram_id, df_lego=None):
     print(f"🔹 Enviando recomendación manual a {telegram_id}...")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (str(telegram_id),))
-    usuario = cursor.fetchone()
+    # La conexión se devuelve al pool antes de pedir otra en obtener_nueva_recomendacion
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (str(telegram_id),))
+        usuario = cursor.fetchone()
 
     if usuario:
         presupuesto_min, presupuesto_max, temas_favoritos = usuario
         temas_favoritos = temas_favoritos.split(",")
 
-        mejor_set = obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, temas_favoritos)
+        catalogo = None if df_lego is None else catalogo_de(df_lego)
+        mejor_set = obtener_nueva_recomendacion(telegram_id, presupuesto_min, presupuesto_max, temas_favoritos,
+                                                catalogo)
 
         if mejor_set is not None:
             mensaje = f"📊 *Nueva Oportunidad de Inversión en LEGO*\n\n"
@@ -179,71 +201,78 @@ def enviar_recomendacion_manual(telegram_id):
             mensaje += f"🛒 *Tema:* {mejor_set['Theme']}\n"
             mensaje += f"🔗 [Ver en Lego](https://www.lego.com/es-es/product/{mejor_set['Number']})\n"
 
-            bot.send_message(telegram_id, mensaje, parse_mode="Markdown")
+            get_bot().send_message(telegram_id, mensaje, parse_mode="Markdown")
         else:
-            bot.send_message(telegram_id, "😞 No encontramos sets adecuados en tu rango de presupuesto y temas seleccionados.")
+            get_bot().send_message(telegram_id, "😞 No encontramos sets adecuados en tu rango de presupuesto y temas seleccionados.")
     
     else:
         print(f"❌ No se encontró al usuario con ID {telegram_id} en la base de datos.")
-    
-    conn.close()
 
 # Manejo del comando /start
-@bot.message_handler(commands=['start'])
 def start(message):
     telegram_id = str(message.chat.id)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Verificar si el usuario ya está registrado
-    cursor.execute("SELECT * FROM usuarios WHERE telegram_id = %s", (telegram_id,))
-    usuario = cursor.fetchone()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
 
-    if usuario:
-        bot.send_message(telegram_id, "✅ ¡Ya estás registrado en el sistema de alertas de inversión en LEGO!")
-    else:
-        # Registrar al usuario con valores por defecto
-        cursor.execute("""
-            INSERT INTO usuarios (telegram_id, presupuesto_min, presupuesto_max, temas_favoritos) 
-            VALUES (%s, %s, %s, %s)
-        """, (telegram_id, 10, 200, 'Todos'))
-        conn.commit()
-        bot.send_message(telegram_id, "🎉 ¡Bienvenido al sistema de alertas de inversión en LEGO! "
-                                      "Te hemos registrado con un rango de precios de $10 a $200 y todos los temas. "
-                                      "Puedes modificar tus preferencias en la web de Streamlit.")
+        # Verificar si el usuario ya está registrado
+        cursor.execute("SELECT * FROM usuarios WHERE telegram_id = %s", (telegram_id,))
+        usuario = cursor.fetchone()
 
-    conn.close()
+        if usuario:
+            get_bot().send_message(telegram_id, "✅ ¡Ya estás registrado en el sistema de alertas de inversión en LEGO!")
+        else:
+            # Registrar al usuario con valores por defecto
+            cursor.execute("""
+                INSERT INTO usuarios (telegram_id, presupuesto_min, presupuesto_max, temas_favoritos) 
+                VALUES (%s, %s, %s, %s)
+            """, (telegram_id, 10, 200, 'Todos'))
+            conn.commit()
+            get_bot().send_message(telegram_id, "🎉 ¡Bienvenido al sistema de alertas de inversión en LEGO! "
+                                          "Te hemos registrado con un rango de precios de $10 a $200 y todos los temas. "
+                                          "Puedes modificar tus preferencias en la web de Streamlit.")
 
 # Manejo del comando /status
-@bot.message_handler(commands=['status'])
 def status(message):
     telegram_id = str(message.chat.id)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (telegram_id,))
-    usuario = cursor.fetchone()
-
-    if usuario:
-        presupuesto_min, presupuesto_max, temas_favoritos = usuario
-        mensaje = (f"📊 *Estado de tu suscripción:*\n\n"
-                   f"💰 *Rango de precios:* ${presupuesto_min} - ${presupuesto_max}\n"
-                   f"🛒 *Temas favoritos:* {temas_favoritos}\n\n"
-                   "Puedes modificar tus preferencias en la web de Streamlit.")
-        bot.send_message(telegram_id, mensaje, parse_mode="Markdown")
-    else:
-        bot.send_message(telegram_id, "⚠️ No estás registrado en el sistema. Escribe /start para registrarte.")
-
-    conn.close()
-
-# Programar el envío cada 30 días
-schedule.every(30).days.do(enviar_recomendaciones)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT presupuesto_min, presupuesto_max, temas_favoritos FROM usuarios WHERE telegram_id = %s", (telegram_id,))
+        usuario = cursor.fetchone()
+
+        if usuario:
+            presupuesto_min, presupuesto_max, temas_favoritos = usuario
+            mensaje = (f"📊 *Estado de tu suscripción:*\n\n"
+                       f"💰 *Rango de precios:* ${presupuesto_min} - ${presupuesto_max}\n"
+                       f"🛒 *Temas favoritos:* {temas_favoritos}\n\n"
+                       "Puedes modificar tus preferencias en la web de Streamlit.")
+            get_bot().send_message(telegram_id, mensaje, parse_mode="Markdown")
+        else:
+            get_bot().send_message(telegram_id, "⚠️ No estás registrado en el sistema. Escribe /start para registrarte.")
+
+# Arranque explícito del bot: migraciones, servicios, comandos y envío programado cada 30 días
+def iniciar():
+    import schedule
+    with get_db_connection() as conn:
+        aplicar_migraciones(conn)
+
+    # El catálogo se carga y puntúa en segundo plano: /start y /status no lo necesitan y el bot empieza a
+    # responder sin esperar
+    threading.Thread(target=get_catalogo, daemon=True).start()
+    bot = get_bot()
+    bot.message_handler(commands=['start'])(start)
+    bot.message_handler(commands=['status'])(status)
+    schedule.every(30).days.do(enviar_recomendaciones)
+    return bot
 
 # Iniciar el bot y el sistema de alertas
 if __name__ == "__main__":
+    import schedule
+    import telebot
+
     print("🔄 Iniciando bot con alertas de inversión...")
+    bot = iniciar()
 
-    import threading
     def run_scheduler():
         while True:
             try:
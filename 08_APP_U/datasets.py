@@ -0,0 +1,169 @@
+"""
+Versión columnar (Feather) de los datasets en CSV que usan la app, el bot y la página de la cámara.
+
+Cada CSV se convierte una vez a un fichero Feather sin comprimir en IRONBRICK_CACHE_DIR, con los tipos ya
+resueltos (Number como texto, Theme/Subtheme y demás textos repetidos como category, fechas como datetime).
+Al arrancar se abre con memory map en lugar de parsear el CSV. El fichero guarda el tamaño y la fecha de
+modificación del CSV de origen: si el CSV cambia, se vuelve a convertir automáticamente.
+
+pyarrow es opcional: sin él, cargar_dataset lee el CSV y aplica los mismos tipos.
+
+Uso (convertir por adelantado, por ejemplo al desplegar):
+    python 08_APP_U/datasets.py
+    python 08_APP_U/datasets.py historial --forzar
+"""
+import argparse
+import os
+import requests
+import pandas as pd
+from feature_utils import CACHE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Nombre -> CSV de origen, URL alternativa si el CSV no está en disco y tipos de las columnas:
+# "str", "category" o "datetime" (el resto se deja con el tipo que infiere pandas)
+DATASETS = {
+    "catalogo": {
+        "csv": os.path.join(BASE_DIR, "08_APP_U/data/df_lego_final_venta.csv"),
+        "url": "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/01_Data_Cleaning/df_lego_final_venta.csv",
+        "tipos": {"Number": "str", "Category": "category", "Theme": "category", "Subtheme": "category",
+                  "PackagingType": "category", "Availability": "category", "SizeCategory": "category",
+                  "Exclusivity": "category"},
+    },
+    "historial": {
+        "csv": os.path.join(BASE_DIR, "04_Extra/APP/data/scraped_lego_data.csv"),
+        "url": None,
+        "tipos": {"Number": "str", "Theme": "category", "PriceType": "category", "PriceDate": "datetime",
+                  "Currency": "category"},
+    },
+    "camara": {
+        "csv": os.path.join(BASE_DIR, "07_Camera/Streamlit/df_lego_camera.csv"),
+        "url": "https://raw.githubusercontent.com/luismrtnzgl/ironbrick/main/07_Camera/Streamlit/df_lego_camera.csv",
+        "tipos": {"Number": "str", "Theme": "category"},
+    },
+}
+
+_CLAVE_ORIGEN = b"ironbrick_origen"
+
+
+def tipar(df, tipos):
+    """Aplica a df (en el sitio) los tipos de las columnas que existan."""
+    for col, tipo in tipos.items():
+        if col not in df.columns:
+            continue
+        if tipo == "str":
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        elif tipo == "category":
+            df[col] = df[col].astype("category")
+        elif tipo == "datetime":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def ruta_csv(nombre):
+    """CSV de origen del dataset; si no está en disco se descarga una vez de su URL a la caché."""
+    dataset = DATASETS[nombre]
+    if os.path.exists(dataset["csv"]) or not dataset["url"]:
+        return dataset["csv"]
+
+    path = os.path.join(CACHE_DIR, os.path.basename(dataset["csv"]))
+    if not os.path.exists(path):
+        response = requests.get(dataset["url"], timeout=60)
+        response.raise_for_status()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, path)
+    return path
+
+
+def ruta_columnar(nombre):
+    return os.path.join(CACHE_DIR, f"{nombre}.feather")
+
+
+def _origen(csv_path):
+    stat = os.stat(csv_path)
+    return f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")
+
+
+def leer_csv(nombre):
+    """Lee el CSV del dataset con sus tipos (el camino lento, y el único si no hay pyarrow)."""
+    return tipar(pd.read_csv(ruta_csv(nombre)), DATASETS[nombre]["tipos"])
+
+
+def convertir(nombre, forzar=False):
+    """
+    Escribe el Feather del dataset si no existe o si su CSV ha cambiado, y devuelve su ruta.
+
+    Sin compresión, para que se pueda abrir con memory map.
+    """
+    if feather is None:
+        raise ImportError("pyarrow no está instalado: no se puede escribir el formato columnar")
+
+    csv_path = ruta_csv(nombre)
+    path = ruta_columnar(nombre)
+    if not forzar and _leer_columnar(path, _origen(csv_path)) is not None:
+        return path
+
+    tabla = pa.Table.from_pandas(leer_csv(nombre), preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), _CLAVE_ORIGEN: _origen(csv_path)})
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(tabla, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _leer_columnar(path, origen):
+    """Tabla de Arrow del Feather con memory map, o None si no existe, está dañado o es de otro CSV."""
+    if not os.path.exists(path):
+        return None
+    try:
+        tabla = feather.read_table(path, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if (tabla.schema.metadata or {}).get(_CLAVE_ORIGEN) != origen:
+        return None
+    return tabla
+
+
+def cargar_dataset(nombre):
+    """
+    DataFrame del dataset con sus tipos, desde el Feather si está al día (convirtiéndolo si no).
+
+    Si no hay pyarrow o no se puede escribir la caché, se lee el CSV.
+    """
+    if feather is None:
+        return leer_csv(nombre)
+
+    csv_path = ruta_csv(nombre)
+    tabla = _leer_columnar(ruta_columnar(nombre), _origen(csv_path))
+    if tabla is None:
+        try:
+            tabla = _leer_columnar(convertir(nombre, forzar=True), _origen(csv_path))
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la versión columnar de {nombre}: {e}")
+            return leer_csv(nombre)
+    return tabla.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte los datasets en CSV a Feather")
+    parser.add_argument("nombres", nargs="*", help=f"Datasets a convertir: {', '.join(DATASETS)} (por defecto, todos)")
+    parser.add_argument("--forzar", action="store_true", help="Convierte aunque el Feather esté al día")
+    args = parser.parse_args()
+    desconocidos = set(args.nombres) - set(DATASETS)
+    if desconocidos:
+        parser.error(f"datasets desconocidos: {', '.join(sorted(desconocidos))}")
+
+    for nombre in args.nombres or DATASETS:
+        path = convertir(nombre, forzar=args.forzar)
+        print(f"✅ {nombre}: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
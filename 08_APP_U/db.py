@@ -0,0 +1,137 @@
+"""
+Capa de conexión a PostgreSQL compartida por la app de Streamlit y el bot de Telegram.
+
+En lugar de abrir una conexión TLS nueva con psycopg2.connect en cada consulta, se mantiene un pool
+de conexiones por proceso. Las conexiones que llevan un rato sin usarse se comprueban con SELECT 1
+antes de entregarse y se reemplazan si el servidor las ha cerrado.
+
+Configuración por variables de entorno:
+    DATABASE_URL                 URL de PostgreSQL
+    DB_SSLMODE                   sslmode de libpq (por defecto "require"; "disable" para un Postgres local)
+    DB_POOL_MIN / DB_POOL_MAX    tamaño mínimo y máximo del pool (1 / 5)
+    DB_POOL_TIMEOUT              segundos máximos de espera por una conexión libre (10)
+    DB_POOL_HEALTHCHECK          segundos de inactividad a partir de los que se hace SELECT 1 (30)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+
+DB_URL = os.getenv("DATABASE_URL")
+DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+HEALTHCHECK_SECS = float(os.getenv("DB_POOL_HEALTHCHECK", "30"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_semaforo = threading.BoundedSemaphore(POOL_MAX)
+_ultimo_uso = {}
+
+# Latencias (en segundos) de obtención de conexión y de uso, para las métricas
+_metricas = {"checkout": [], "uso": [], "reconexiones": 0}
+_MAX_MUESTRAS = 10_000
+
+
+def get_pool():
+    """Crea el pool la primera vez que se necesita (perezoso, para que importar el módulo no conecte)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(POOL_MIN, POOL_MAX, DB_URL, sslmode=DB_SSLMODE)
+    return _pool
+
+
+def _conexion_sana(conn):
+    if conn.closed:
+        return False
+    # Las conexiones recién abiertas o usadas hace poco no se comprueban
+    ultimo_uso = _ultimo_uso.get(id(conn))
+    if ultimo_uso is None or time.monotonic() - ultimo_uso < HEALTHCHECK_SECS:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _registrar(clave, valor):
+    muestras = _metricas[clave]
+    muestras.append(valor)
+    if len(muestras) > _MAX_MUESTRAS:
+        del muestras[:len(muestras) - _MAX_MUESTRAS]
+
+
+@contextmanager
+def get_db_connection():
+    """
+    Entrega una conexión del pool y la devuelve al salir del bloque `with`.
+
+    Si el bloque lanza una excepción se hace rollback; el commit sigue siendo responsabilidad del llamador.
+    """
+    inicio = time.perf_counter()
+    if not _semaforo.acquire(timeout=POOL_TIMEOUT):
+        raise pool.PoolError(f"No hay conexiones libres tras {POOL_TIMEOUT}s (DB_POOL_MAX={POOL_MAX})")
+
+    p = get_pool()
+    conn = None
+    try:
+        conn = p.getconn()
+        if not _conexion_sana(conn):
+            _ultimo_uso.pop(id(conn), None)
+            p.putconn(conn, close=True)
+            _metricas["reconexiones"] += 1
+            conn = p.getconn()
+        _registrar("checkout", time.perf_counter() - inicio)
+
+        inicio_uso = time.perf_counter()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            _registrar("uso", time.perf_counter() - inicio_uso)
+    finally:
+        if conn is not None:
+            if conn.closed:
+                _ultimo_uso.pop(id(conn), None)
+            else:
+                _ultimo_uso[id(conn)] = time.monotonic()
+            p.putconn(conn, close=bool(conn.closed))
+        _semaforo.release()
+
+
+def metricas():
+    """Resumen de latencias del pool en milisegundos (n, p50, p95, max) y número de reconexiones."""
+    resumen = {"reconexiones": _metricas["reconexiones"]}
+    for clave in ("checkout", "uso"):
+        muestras = sorted(_metricas[clave])
+        if not muestras:
+            resumen[clave] = {"n": 0}
+            continue
+        resumen[clave] = {
+            "n": len(muestras),
+            "p50_ms": muestras[len(muestras) // 2] * 1000,
+            "p95_ms": muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] * 1000,
+            "max_ms": muestras[-1] * 1000,
+        }
+    return resumen
+
+
+def cerrar_pool():
+    """Cierra todas las conexiones del pool (por ejemplo al parar el bot)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _ultimo_uso.clear()
@@ -0,0 +1,223 @@
+"""
+Identificación abierta por embeddings: vecinos más cercanos sobre imágenes de referencia.
+
+El clasificador solo reconoce las clases de idx_to_class.json. En este modo se usa la capa penúltima de la
+EfficientNet de model_utils (las 512 activaciones tras la ReLU de la cabeza) como embedding normalizado, y un
+índice persistente de embeddings de fotos de referencia de cada set. Añadir un set nuevo es añadir sus fotos
+al índice, sin reentrenar.
+
+El índice es un IVF (inverted file) en NumPy: los vectores se agrupan con k-means esférico en ~2·sqrt(N)
+listas y una consulta solo compara con las sondas listas de centroides más parecidos, así que con 20k+ sets
+sigue por debajo del milisegundo. Con menos de UMBRAL_IVF vectores la búsqueda es exacta. Los vectores nuevos
+se asignan a su lista al añadirlos y las listas se reentrenan cuando el índice dobla su tamaño.
+
+Ver bench_embeddings.py para la latencia y el recall frente a la búsqueda exacta.
+
+Uso:
+    python 08_APP_U/embeddings.py --anadir fotos_referencia/     # fotos_referencia/<Number>/*.jpg
+    python 08_APP_U/embeddings.py --buscar foto.jpg -k 5
+    python 08_APP_U/embeddings.py --estado
+"""
+import argparse
+import glob
+import json
+import os
+import numpy as np
+from feature_utils import CACHE_DIR
+
+INDICE_DIR = os.getenv("IRONBRICK_INDICE_EMBEDDINGS", os.path.join(CACHE_DIR, "indice_embeddings"))
+UMBRAL_IVF = 4096
+SONDAS = 32
+ITERACIONES_KMEANS = 10
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+def normalizar(vectores):
+    vectores = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(vectores, axis=-1, keepdims=True)
+    return vectores / np.maximum(normas, 1e-12)
+
+
+def kmeans_esferico(vectores, num_listas, iteraciones=ITERACIONES_KMEANS, semilla=0):
+    """Centroides normalizados (num_listas, D) y asignación de cada vector a su centroide más parecido."""
+    rng = np.random.default_rng(semilla)
+    centroides = vectores[rng.choice(len(vectores), num_listas, replace=False)].copy()
+    for _ in range(iteraciones):
+        asignacion = np.argmax(vectores @ centroides.T, axis=1)
+        sumas = np.zeros_like(centroides)
+        np.add.at(sumas, asignacion, vectores)
+        vacias = np.flatnonzero(np.bincount(asignacion, minlength=num_listas) == 0)
+        # Las listas vacías se reinician con vectores al azar
+        sumas[vacias] = vectores[rng.choice(len(vectores), len(vacias), replace=False)]
+        centroides = normalizar(sumas)
+    return centroides, np.argmax(vectores @ centroides.T, axis=1).astype(np.int32)
+
+
+class IndiceEmbeddings:
+    """Índice persistente de embeddings normalizados con el número de set de cada uno."""
+
+    def __init__(self, directorio=INDICE_DIR, modelo=None):
+        """modelo: versión (sha256) del modelo con el que se calculan los embeddings del índice."""
+        self.directorio = directorio
+        self.modelo = modelo
+        self.vectores = np.zeros((0, 0), dtype=np.float32)
+        self.numeros = []
+        self.centroides = None
+        self.asignacion = None
+        self.entrenado_con = 0
+        self._listas = None
+
+    def __len__(self):
+        return len(self.numeros)
+
+    @classmethod
+    def cargar(cls, directorio=INDICE_DIR, modelo=None):
+        """Índice guardado en directorio (vacío si no existe). Si se indica modelo, tiene que coincidir."""
+        indice = cls(directorio, modelo)
+        metadatos_path = os.path.join(directorio, "metadatos.json")
+        if not os.path.exists(metadatos_path):
+            return indice
+        with open(metadatos_path, "r") as f:
+            metadatos = json.load(f)
+        if modelo and metadatos.get("modelo") and metadatos["modelo"] != modelo:
+            raise ValueError(f"❌ El índice de {directorio} se construyó con otro modelo ({metadatos['modelo'][:12]})")
+        indice.modelo = metadatos.get("modelo") or modelo
+        indice.vectores = np.load(os.path.join(directorio, "vectores.npy"))
+        with open(os.path.join(directorio, "numeros.json"), "r") as f:
+            indice.numeros = json.load(f)
+        if metadatos.get("entrenado_con"):
+            indice.centroides = np.load(os.path.join(directorio, "centroides.npy"))
+            indice.asignacion = np.load(os.path.join(directorio, "asignacion.npy"))
+            indice.entrenado_con = metadatos["entrenado_con"]
+        return indice
+
+    def guardar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+
+        def escribir(nombre, escribir_en):
+            path = os.path.join(self.directorio, nombre)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                escribir_en(f)
+            os.replace(tmp_path, path)
+
+        escribir("vectores.npy", lambda f: np.save(f, self.vectores))
+        escribir("numeros.json", lambda f: f.write(json.dumps(self.numeros).encode("utf-8")))
+        if self.centroides is not None:
+            escribir("centroides.npy", lambda f: np.save(f, self.centroides))
+            escribir("asignacion.npy", lambda f: np.save(f, self.asignacion))
+        # Los metadatos se escriben los últimos: un índice a medio guardar no se da por bueno
+        metadatos = {"modelo": self.modelo, "dim": int(self.vectores.shape[1]) if len(self) else None,
+                     "vectores": len(self), "entrenado_con": self.entrenado_con}
+        escribir("metadatos.json", lambda f: f.write(json.dumps(metadatos, indent=2).encode("utf-8")))
+
+    def anadir(self, vectores, numeros):
+        """Añade embeddings (n, D) con su número de set. Reentrena las listas si el índice ha doblado su tamaño."""
+        vectores = normalizar(np.atleast_2d(vectores))
+        if len(vectores) != len(numeros):
+            raise ValueError("Cada embedding necesita su número de set")
+        self.vectores = vectores if not len(self) else np.concatenate([self.vectores, vectores])
+        self.numeros.extend(str(n) for n in numeros)
+
+        if len(self) >= UMBRAL_IVF and len(self) >= 2 * self.entrenado_con:
+            self.entrenar()
+        elif self.centroides is not None:
+            nuevas = np.argmax(vectores @ self.centroides.T, axis=1).astype(np.int32)
+            self.asignacion = np.concatenate([self.asignacion, nuevas])
+            self._listas = None
+
+    def entrenar(self):
+        num_listas = int(np.clip(2 * np.sqrt(len(self)), 16, 4096))
+        self.centroides, self.asignacion = kmeans_esferico(self.vectores, num_listas)
+        self.entrenado_con = len(self)
+        self._listas = None
+
+    def _por_listas(self):
+        if self._listas is None:
+            # Vectores reordenados por lista (formato CSR): cada lista es un bloque contiguo
+            orden = np.argsort(self.asignacion, kind="stable").astype(np.int32)
+            inicios = np.searchsorted(self.asignacion[orden], np.arange(len(self.centroides) + 1))
+            self._listas = (orden, inicios, self.vectores[orden])
+        return self._listas
+
+    def buscar(self, consulta, k=5, sondas=SONDAS):
+        """Los k vecinos más parecidos a un embedding: lista de (número de set, similitud coseno)."""
+        consulta = normalizar(consulta).ravel()
+        if not len(self):
+            return []
+        if self.centroides is None or sondas >= len(self.centroides):
+            posiciones = np.arange(len(self))
+            similitudes = self.vectores @ consulta
+        else:
+            orden, inicios, ordenados = self._por_listas()
+            listas = np.argpartition(-(self.centroides @ consulta), sondas - 1)[:sondas]
+            posiciones = np.concatenate([orden[inicios[l]:inicios[l + 1]] for l in listas])
+            similitudes = np.concatenate([ordenados[inicios[l]:inicios[l + 1]] @ consulta for l in listas])
+        k = min(k, len(similitudes))
+        mejores = np.argpartition(-similitudes, k - 1)[:k]
+        mejores = mejores[np.argsort(-similitudes[mejores], kind="stable")]
+        return [(self.numeros[posiciones[m]], float(similitudes[m])) for m in mejores]
+
+    def identificar(self, consulta, k=10, sondas=SONDAS):
+        """Sets distintos entre los k vecinos, cada uno con su mayor similitud, de más a menos parecido."""
+        sets = {}
+        for numero, similitud in self.buscar(consulta, k=k, sondas=sondas):
+            sets.setdefault(numero, similitud)
+        return list(sets.items())
+
+
+def extraer_embeddings(model, batch):
+    """Embeddings (n, 512) normalizados de un lote (n, 3, 224, 224) con la EfficientNet eager de model_utils."""
+    # torch solo hace falta para calcular embeddings, no para usar el índice
+    import torch
+    with torch.inference_mode():
+        x = torch.flatten(model.avgpool(model.features(batch)), 1)
+        x = model.classifier[2](model.classifier[1](x))
+    return normalizar(x.cpu().numpy())
+
+
+def _referencias(carpeta):
+    """(ruta, número de set) de carpeta/<Number>/*.jpg o de ficheros carpeta/<Number>_*.jpg."""
+    for path in sorted(glob.glob(os.path.join(carpeta, "**", "*"), recursive=True)):
+        if not path.lower().endswith(EXTENSIONES):
+            continue
+        padre = os.path.relpath(os.path.dirname(path), carpeta)
+        yield path, (padre if padre != "." else os.path.basename(path).split("_")[0].rsplit(".", 1)[0])
+
+
+if __name__ == "__main__":
+    import torch
+    from PIL import Image
+    from model_registry import obtener_modelo
+    from model_utils import load_model
+    from predict import transform
+
+    parser = argparse.ArgumentParser(description="Índice de embeddings para identificación abierta de sets")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--anadir", metavar="CARPETA", help="Añade las fotos de referencia de CARPETA")
+    grupo.add_argument("--buscar", metavar="IMAGEN", help="Sets más parecidos a una imagen")
+    grupo.add_argument("--estado", action="store_true")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--lote", type=int, default=32)
+    args = parser.parse_args()
+
+    model_path, modelo_version = obtener_modelo("identificador")
+    indice = IndiceEmbeddings.cargar(modelo=modelo_version)
+
+    if args.estado:
+        print(f"Índice: {indice.directorio} | vectores: {len(indice)} | sets: {len(set(indice.numeros))} | "
+              f"listas: {0 if indice.centroides is None else len(indice.centroides)}")
+    else:
+        model = load_model(model_path, optimizacion="")
+        if args.anadir:
+            referencias = list(_referencias(args.anadir))
+            for inicio in range(0, len(referencias), args.lote):
+                lote = referencias[inicio:inicio + args.lote]
+                batch = torch.stack([transform(Image.open(p).convert("RGB")) for p, _ in lote])
+                indice.anadir(extraer_embeddings(model, batch), [n for _, n in lote])
+            indice.guardar()
+            print(f"✅ {len(referencias)} imágenes añadidas; el índice tiene {len(indice)} vectores")
+        else:
+            consulta = extraer_embeddings(model, transform(Image.open(args.buscar).convert("RGB")).unsqueeze(0))
+            for numero, similitud in indice.identificar(consulta[0], k=args.k):
+                print(f"{numero:<12} {similitud:.3f}")
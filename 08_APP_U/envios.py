@@ -0,0 +1,139 @@
+"""
+Cola de envío concurrente a Telegram para las alertas mensuales.
+
+Los mensajes se envían con un pool de hilos acotado que respeta los límites de Telegram
+(~30 mensajes/s en total y 1 mensaje/s por chat), reintenta los 429 (usando retry_after)
+y los 5xx / errores de red con backoff exponencial, y devuelve el estado de cada envío para
+registrarlo en PostgreSQL (tabla envios, creada por la migración 4).
+
+La URL base es configurable para poder medir el rendimiento contra un servidor falso local
+(ver bench_envios.py).
+"""
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class RateLimiter:
+    """Token bucket compartido entre hilos: como mucho `rate` envíos por segundo."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.rate
+            time.sleep(espera)
+
+
+class TelegramSender:
+    """Envía mensajes a la Bot API de Telegram con concurrencia, límites de ritmo y reintentos."""
+
+    def __init__(self, token, base_url=TELEGRAM_API_URL, workers=8, global_rate=30, per_chat_interval=1.0,
+                 max_reintentos=5, backoff_base=0.5, timeout=10):
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.workers = workers
+        self.limiter = RateLimiter(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self._local = threading.local()
+        self._chat_lock = threading.Lock()
+        self._chat_locks = {}
+        self._ultimo_envio = {}
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _lock_chat(self, chat_id):
+        with self._chat_lock:
+            return self._chat_locks.setdefault(chat_id, threading.Lock())
+
+    def _post(self, chat_id, texto, parse_mode):
+        payload = {"chat_id": chat_id, "text": texto}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        # Los mensajes a un mismo chat se serializan y se espacian per_chat_interval segundos
+        with self._lock_chat(chat_id):
+            espera = self._ultimo_envio.get(chat_id, 0) + self.per_chat_interval - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            self.limiter.acquire()
+            try:
+                return self._session().post(self.url, json=payload, timeout=self.timeout)
+            finally:
+                self._ultimo_envio[chat_id] = time.monotonic()
+
+    def enviar(self, chat_id, texto, parse_mode=None):
+        """Envía un mensaje con reintentos. Devuelve un dict con chat_id, estado, intentos y error."""
+        error = None
+        for intento in range(1, self.max_reintentos + 1):
+            try:
+                response = self._post(chat_id, texto, parse_mode)
+            except requests.RequestException as e:
+                error = str(e)
+                espera = self.backoff_base * 2 ** (intento - 1)
+            else:
+                if response.status_code == 200:
+                    return {"chat_id": chat_id, "estado": "enviado", "intentos": intento, "error": None}
+
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code == 429:
+                    try:
+                        espera = float(response.json().get("parameters", {}).get("retry_after", 1))
+                    except ValueError:
+                        espera = 1.0
+                elif response.status_code >= 500:
+                    espera = self.backoff_base * 2 ** (intento - 1)
+                else:
+                    # 400/403 (chat inexistente, bot bloqueado...): reintentar no sirve de nada
+                    return {"chat_id": chat_id, "estado": "fallido", "intentos": intento, "error": error}
+
+            if intento < self.max_reintentos:
+                time.sleep(espera + random.uniform(0, espera * 0.1))
+
+        return {"chat_id": chat_id, "estado": "fallido", "intentos": self.max_reintentos, "error": error}
+
+    def enviar_lote(self, mensajes):
+        """
+        Envía una lista de mensajes (chat_id, texto, parse_mode) en paralelo.
+
+        Devuelve la lista de resultados en el mismo orden que los mensajes.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futuros = [pool.submit(self.enviar, chat_id, texto, parse_mode) for chat_id, texto, parse_mode in mensajes]
+            return [f.result() for f in futuros]
+
+
+def registrar_envios(conn, resultados, set_ids=None):
+    """Guarda en la tabla envios el resultado de cada mensaje (set_ids alineado con resultados, opcional)."""
+    if not resultados:
+        return
+    p = "?" if isinstance(conn, sqlite3.Connection) else "%s"
+    set_ids = set_ids or [None] * len(resultados)
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO envios (telegram_id, set_id, estado, intentos, error) VALUES ({p}, {p}, {p}, {p}, {p})",
+        [(str(r["chat_id"]), None if s is None else str(s), r["estado"], r["intentos"], r["error"])
+         for r, s in zip(resultados, set_ids)])
+    conn.commit()
@@ -0,0 +1,135 @@
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Variables de entrada del modelo de inversión (mismo orden que en el entrenamiento, 03_EDA/03_02_ML.ipynb)
+FEATURES = ['USRetailPrice', 'Pieces', 'Minifigs', 'YearsSinceExit', 'ResaleDemand',
+            'AnnualPriceIncrease', 'Exclusivity', 'SizeCategory', 'PricePerPiece',
+            'PricePerMinifig', 'YearsOnMarket']
+
+EXCLUSIVITY_MAPPING = {'Regular': 0, 'Exclusive': 1}
+SIZE_CATEGORY_MAPPING = {'Small': 0, 'Medium': 1, 'Large': 2}
+
+# Carpeta compartida por la app de Streamlit y el bot para guardar las matrices ya calculadas
+CACHE_DIR = os.getenv("IRONBRICK_CACHE_DIR", "/tmp/ironbrick_cache")
+
+# Caché en memoria del proceso: clave del origen -> (df preprocesado, matriz float32). Solo se guardan las
+# últimas versiones para que un proceso largo no acumule una matriz por cada versión del dataset
+MAX_CACHE = 2
+_cache = OrderedDict()
+
+
+def preprocess_data(df):
+    """Limpia el catálogo y crea las variables derivadas que usa el modelo de inversión."""
+    df = df[df['USRetailPrice'] > 0].copy()
+
+    # Codificamos las variables categóricas (si ya vienen codificadas no se tocan). Si llegan como
+    # category (mongo_loader), map devuelve otra category: se pasa a número para el relleno con la mediana
+    if 'Exclusivity' in df.columns and not pd.api.types.is_numeric_dtype(df['Exclusivity']):
+        df['Exclusivity'] = pd.to_numeric(df['Exclusivity'].map(EXCLUSIVITY_MAPPING).astype(object))
+
+    if 'SizeCategory' in df.columns and not pd.api.types.is_numeric_dtype(df['SizeCategory']):
+        df['SizeCategory'] = pd.to_numeric(df['SizeCategory'].map(SIZE_CATEGORY_MAPPING).astype(object))
+
+    # Feature Engineering
+    df["PricePerPiece"] = df["USRetailPrice"] / df["Pieces"]
+    df["PricePerMinifig"] = np.where(df["Minifigs"] > 0, df["USRetailPrice"] / df["Minifigs"], 0)
+    df["YearsOnMarket"] = df["ExitYear"] - df["LaunchYear"]
+
+    # Columnas del modelo que no estén en el origen de datos
+    for col in FEATURES:
+        if col not in df.columns:
+            df[col] = 0
+
+    # Igual que en el entrenamiento: infinitos a NaN y relleno con la mediana de cada columna numérica
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    df[numeric_cols] = df[numeric_cols].replace([np.inf, -np.inf], np.nan)
+    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
+
+    return df
+
+
+def build_feature_matrix(df):
+    """Devuelve la matriz de 11 columnas del modelo como array float32 contiguo."""
+    return np.ascontiguousarray(df[FEATURES].to_numpy(dtype=np.float32))
+
+
+def feature_frame(X, index=None):
+    """Envuelve la matriz en un DataFrame con los nombres de columna con los que se entrenó el modelo."""
+    return pd.DataFrame(X, columns=FEATURES, index=index)
+
+
+def dataset_hash(df):
+    """Hash SHA-256 del contenido del DataFrame (columnas, índice y valores)."""
+    h = hashlib.sha256()
+    h.update(",".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _cache_path(key, extension):
+    return os.path.join(CACHE_DIR, f"features_{key[:16]}.{extension}")
+
+
+def _leer_cache(key):
+    """(df, X) guardados en disco para la clave, o None si faltan o no cuadran."""
+    df_path, X_path = _cache_path(key, "pkl"), _cache_path(key, "npy")
+    if not (os.path.exists(df_path) and os.path.exists(X_path)):
+        return None
+    try:
+        df = pd.read_pickle(df_path)
+        X = np.load(X_path, mmap_mode="r")
+    except (OSError, ValueError, EOFError):
+        return None
+    return (df, X) if X.shape == (len(df), len(FEATURES)) else None
+
+
+def _guardar_cache(key, df, X):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # La matriz se escribe la última: si está, el df preprocesado ya está completo
+        for path, escribir in ((_cache_path(key, "pkl"), df.to_pickle),
+                               (_cache_path(key, "npy"), lambda f: np.save(f, X))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                escribir(f)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la matriz de features en caché: {e}")
+
+
+def load_features(df_raw, origen=None):
+    """
+    Preprocesa el catálogo y devuelve (df, X), donde X es la matriz float32 alineada por posición con df.
+
+    origen identifica el dato en bruto (por ejemplo datasets._origen del CSV: ruta, tamaño y fecha de
+    modificación). Con él se busca antes de preprocesar en memoria (últimas MAX_CACHE versiones) y en
+    disco, de forma que el bot y scoring.py no repiten el preprocesado mientras el CSV no cambie. Sin
+    origen no se guarda nada: es para quien ya cachea el resultado por su cuenta (la app, por versión
+    del catálogo sincronizado).
+    """
+    if origen is None:
+        df = preprocess_data(df_raw)
+        X = build_feature_matrix(df)
+        X.flags.writeable = False
+        return df, X
+
+    key = hashlib.sha256(origen if isinstance(origen, bytes) else str(origen).encode("utf-8")).hexdigest()
+    guardado = _cache.get(key)
+    if guardado is None:
+        guardado = _leer_cache(key)
+        if guardado is None:
+            df = preprocess_data(df_raw)
+            X = build_feature_matrix(df)
+            X.flags.writeable = False
+            _guardar_cache(key, df, X)
+            guardado = (df, X)
+        _cache[key] = guardado
+        while len(_cache) > MAX_CACHE:
+            _cache.popitem(last=False)
+    _cache.move_to_end(key)
+
+    df, X = guardado
+    return df.copy(), X
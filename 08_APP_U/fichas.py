@@ -0,0 +1,78 @@
+"""
+Fichas de sets por número: búsqueda en O(1) de la información de un set del catálogo.
+
+En lugar de filtrar el DataFrame con df[df["Number"] == numero] (un recorrido de toda la columna de texto en
+cada consulta), FichasSets construye una vez un diccionario número -> fila y guarda solo las columnas
+necesarias como arrays (las categóricas como códigos). Cada consulta devuelve un dict con esas columnas.
+
+fichas_dataset() comparte las fichas de un dataset de datasets.py entre todas las páginas del proceso y las
+reconstruye si cambia el CSV de origen.
+
+Ver bench_fichas.py para la comparación con el filtrado del DataFrame.
+"""
+import numpy as np
+import pandas as pd
+from datasets import _origen, cargar_dataset, ruta_csv
+
+# Columnas de la ficha de la página de la cámara
+COLUMNAS_CAMARA = ["SetName", "Theme", "WantCount", "USRetailPrice", "BrickLinkSoldPriceUsed"]
+
+# Fichas compartidas del proceso: (dataset, columnas) -> (origen del CSV, FichasSets)
+_cache = {}
+
+
+class FichasSets:
+    """Índice número de set -> ficha (dict) de un DataFrame con la columna Number."""
+
+    def __init__(self, df, columnas=None):
+        columnas = [c for c in (columnas if columnas is not None else df.columns) if c != "Number"]
+        numeros = df["Number"].astype(str).to_numpy()
+        # Si un número se repite se queda la primera fila, igual que df[df["Number"] == numero].iloc[0]
+        self._posiciones = dict(zip(numeros[::-1], range(len(numeros) - 1, -1, -1)))
+        self._numeros = numeros
+        self._columnas = {}
+        for col in columnas:
+            if col not in df.columns:
+                continue
+            serie = df[col]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                self._columnas[col] = (serie.cat.codes.to_numpy(), serie.cat.categories.to_numpy())
+            else:
+                self._columnas[col] = (serie.to_numpy(), None)
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    def __contains__(self, numero):
+        return str(numero) in self._posiciones
+
+    def posicion(self, numero):
+        """Posición (iloc) de la primera fila del set en el DataFrame original, o None si no está."""
+        return self._posiciones.get(str(numero))
+
+    def en_posicion(self, posicion):
+        """Ficha de la fila posicion del DataFrame original."""
+        ficha = {"Number": self._numeros[posicion]}
+        for col, (valores, categorias) in self._columnas.items():
+            if categorias is None:
+                ficha[col] = valores[posicion]
+            else:
+                codigo = valores[posicion]
+                ficha[col] = categorias[codigo] if codigo >= 0 else np.nan
+        return ficha
+
+    def ficha(self, numero, default=None):
+        """Ficha del set (dict con Number y las columnas indexadas), o default si no está."""
+        posicion = self._posiciones.get(str(numero))
+        return default if posicion is None else self.en_posicion(posicion)
+
+
+def fichas_dataset(nombre, columnas=None):
+    """Fichas de un dataset de datasets.py, construidas una vez por proceso y versión del CSV."""
+    clave = (nombre, tuple(columnas) if columnas is not None else None)
+    origen = _origen(ruta_csv(nombre))
+    guardado = _cache.get(clave)
+    if guardado is None or guardado[0] != origen:
+        guardado = (origen, FichasSets(cargar_dataset(nombre), columnas))
+        _cache[clave] = guardado
+    return guardado[1]
@@ -0,0 +1,136 @@
+"""
+Frontera de Pareto de carteras de sets retirados.
+
+Una cartera domina a otra si cuesta lo mismo o menos, tiene igual o más valor estimado a 2 y a 5 años y no
+tiene más sets. La frontera son las carteras que no domina ninguna otra: para cualquier presupuesto, las
+opciones razonables están en ella.
+
+La frontera se calcula una vez por catálogo filtrado (sobre una bolsa de los sets con más valor a 5 años,
+con inversiones.enumerar_combinaciones) y se guarda ordenada por coste. Consultar un presupuesto es una
+búsqueda binaria sobre los costes, así que mover el slider de presupuesto no repite ninguna búsqueda.
+
+Filtro de dominancia: las carteras se recorren por coste creciente y, para cada número de sets, se mantiene
+la "escalera" de puntos (valor 2Y, valor 5Y) no dominados vistos hasta ahora, ordenada por valor 2Y. Una
+cartera está dominada si alguna escalera con igual o menos sets tiene un punto con más valor 2Y y 5Y,
+lo que se comprueba con una búsqueda binaria por escalera.
+"""
+import bisect
+import heapq
+import numpy as np
+import pandas as pd
+from inversiones import enumerar_combinaciones
+
+
+def filtrar_dominadas(costes, valores_2y, valores_5y, num_sets):
+    """Devuelve los índices de los puntos no dominados, ordenados por coste creciente."""
+    costes = np.asarray(costes, dtype=np.float64)
+    valores_2y = np.asarray(valores_2y, dtype=np.float64)
+    valores_5y = np.asarray(valores_5y, dtype=np.float64)
+    num_sets = np.asarray(num_sets, dtype=np.int64)
+
+    # A igual coste van antes los que tienen menos sets y más valor: ninguno puede quedar dominado por uno posterior
+    orden = np.lexsort((-valores_2y, -valores_5y, num_sets, costes))
+    max_sets = int(num_sets.max()) if len(num_sets) else 0
+    # Por número de sets: valores 2Y crecientes y 5Y decrecientes
+    escaleras_2y = [[] for _ in range(max_sets + 1)]
+    escaleras_5y = [[] for _ in range(max_sets + 1)]
+
+    frontera = []
+    for i, v2, v5, n in zip(orden.tolist(), valores_2y[orden].tolist(), valores_5y[orden].tolist(),
+                            num_sets[orden].tolist()):
+        dominado = False
+        for m in range(1, n + 1):
+            esc_2y, esc_5y = escaleras_2y[m], escaleras_5y[m]
+            # El primer punto con valor 2Y >= v2 es el de más valor 5Y entre ellos
+            pos = bisect.bisect_left(esc_2y, v2)
+            if pos < len(esc_2y) and esc_5y[pos] >= v5:
+                dominado = True
+                break
+        if dominado:
+            continue
+
+        frontera.append(i)
+        esc_2y, esc_5y = escaleras_2y[n], escaleras_5y[n]
+        pos = bisect.bisect_left(esc_2y, v2)
+        # Quitamos de la escalera los puntos que el nuevo domina (con valor 2Y <= v2 y 5Y <= v5)
+        fin = pos + 1 if pos < len(esc_2y) and esc_2y[pos] == v2 else pos
+        inicio = pos
+        while inicio > 0 and esc_5y[inicio - 1] <= v5:
+            inicio -= 1
+        esc_2y[inicio:fin] = [v2]
+        esc_5y[inicio:fin] = [v5]
+
+    return frontera
+
+
+class FronteraCarteras:
+    """Frontera de Pareto precalculada de un catálogo, consultable por presupuesto."""
+
+    def __init__(self, df, presupuesto_max, tam_bolsa=40, max_sets=4, k=3):
+        """
+        df: sets con SetName, Number, CurrentValueNew, PredictedValue2Y y PredictedValue5Y.
+        presupuesto_max: mayor presupuesto que se va a consultar (el máximo del slider).
+        tam_bolsa: número de sets con más valor a 5 años sobre los que se combinan las carteras.
+        k: número de opciones que devuelve mejores().
+        """
+        self.k = k
+        bolsa = df[df["CurrentValueNew"] <= presupuesto_max]
+        bolsa = bolsa.sort_values(by="PredictedValue5Y", ascending=False, kind="stable").head(tam_bolsa)
+        self.sets = bolsa[["SetName", "CurrentValueNew", "PredictedValue2Y", "PredictedValue5Y", "Number"]].values.tolist()
+
+        combinaciones = list(enumerar_combinaciones(bolsa["CurrentValueNew"].to_numpy(),
+                                                    bolsa["PredictedValue2Y"].to_numpy(),
+                                                    bolsa["PredictedValue5Y"].to_numpy(),
+                                                    presupuesto_max, max_sets=max_sets))
+        self.combinaciones_evaluadas = len(combinaciones)
+        if combinaciones:
+            indices, costes, valores_2y, valores_5y = zip(*combinaciones)
+        else:
+            indices, costes, valores_2y, valores_5y = (), (), (), ()
+        num_sets = [len(c) for c in indices]
+        frontera = filtrar_dominadas(costes, valores_2y, valores_5y, num_sets)
+        del combinaciones
+
+        self.indices = [indices[i] for i in frontera]
+        self.costes = [costes[i] for i in frontera]
+        self.valores_2y = [valores_2y[i] for i in frontera]
+        self.valores_5y = [valores_5y[i] for i in frontera]
+
+        # Para cada prefijo de la frontera (por coste), las k carteras con más valor a 5 años
+        self._top = []
+        mejores = []
+        for pos, v5 in enumerate(self.valores_5y):
+            if len(mejores) < k:
+                heapq.heappush(mejores, (v5, -pos))
+            elif v5 > mejores[0][0]:
+                heapq.heapreplace(mejores, (v5, -pos))
+            self._top.append([-p for _, p in sorted(mejores, reverse=True)])
+
+    def __len__(self):
+        return len(self.costes)
+
+    def _hasta(self, presupuesto):
+        return bisect.bisect_right(self.costes, presupuesto)
+
+    def _opcion(self, pos):
+        sets = [tuple(self.sets[i]) for i in self.indices[pos]]
+        return sets, self.valores_2y[pos], self.valores_5y[pos], self.costes[pos]
+
+    def mejores(self, presupuesto):
+        """
+        Las k carteras de la frontera con más valor a 5 años que caben en el presupuesto, con el mismo formato
+        que inversiones.encontrar_mejores_inversiones: (sets, retorno_2y, retorno_5y, precio_total).
+        """
+        hasta = self._hasta(presupuesto)
+        return [self._opcion(pos) for pos in self._top[hasta - 1]] if hasta else []
+
+    def puntos(self, presupuesto=None):
+        """DataFrame con las carteras de la frontera (hasta el presupuesto, si se indica), por coste creciente."""
+        hasta = len(self) if presupuesto is None else self._hasta(presupuesto)
+        return pd.DataFrame({
+            "Coste": self.costes[:hasta],
+            "Valor2Y": self.valores_2y[:hasta],
+            "Valor5Y": self.valores_5y[:hasta],
+            "NumSets": [len(c) for c in self.indices[:hasta]],
+            "Sets": [", ".join(str(self.sets[i][4]) for i in c) for c in self.indices[:hasta]],
+        })
@@ -0,0 +1,167 @@
+"""
+Identificación por lotes de sets de LEGO (por ejemplo, fotos de una estantería con decenas de cajas).
+
+Las imágenes se decodifican y redimensionan en un pool de hilos y se pasan por el modelo de
+model_utils.load_model en microlotes de tam_lote imágenes (con sus vistas de TTA), de forma que el modelo
+hace pocas pasadas grandes en lugar de una por imagen. El resultado es una tabla con el número de set, la
+confianza y la información del catálogo de la cámara, que se puede guardar como CSV o JSON.
+
+Uso:
+    python 08_APP_U/identificar_lote.py fotos/*.jpg --salida resultados.csv
+    python 08_APP_U/identificar_lote.py 07_Camera/Test_image --salida resultados.json --num-tta 5 --lote 8
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import torch
+from PIL import Image
+from predict import dispositivo, transform
+from tta import TTA_MODO, apply_tta, tta_tensor
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+COLUMNAS_CATALOGO = ["SetName", "Theme", "USRetailPrice", "BrickLinkSoldPriceUsed", "WantCount"]
+
+
+def _decodificar(fuente):
+    """Imagen RGB a partir de una ruta, unos bytes o un fichero abierto (por ejemplo, un UploadedFile de Streamlit)."""
+    if isinstance(fuente, bytes):
+        fuente = io.BytesIO(fuente)
+    return Image.open(fuente).convert("RGB")
+
+
+def _preparar(fuente, num_tta, modo):
+    """Tensor de las vistas de una imagen: (1, 3, 224, 224) en modo determinista, (1 + num_tta, ...) si no."""
+    image = _decodificar(fuente)
+    if modo == "determinista":
+        return transform(image).unsqueeze(0)
+    return torch.stack([transform(img) for img in apply_tta(image, num_tta=num_tta)])
+
+
+def _intentar(funcion, *args):
+    try:
+        return funcion(*args), None
+    except Exception as e:
+        return None, e
+
+
+def _nombre(fuente, i):
+    if isinstance(fuente, str):
+        return os.path.basename(fuente)
+    return getattr(fuente, "name", f"imagen_{i}")
+
+
+def probabilidades_lote(tensores, model, num_tta, modo):
+    """Probabilidades medias (n_imagenes, num_clases) de un microlote de imágenes ya preparadas."""
+    device = dispositivo(model)
+    batch = torch.cat(tensores).to(device)
+    if modo == "determinista":
+        batch = tta_tensor(batch, num_tta=num_tta)
+    with torch.inference_mode():
+        probabilidades = torch.nn.functional.softmax(model(batch), dim=1)
+    # Cada imagen ocupa 1 + num_tta filas consecutivas del lote
+    return probabilidades.reshape(len(tensores), 1 + num_tta, -1).mean(dim=1).cpu()
+
+
+def identificar_lote(fuentes, model, idx_to_class, df_catalogo=None, num_tta=0, tam_lote=16, hilos=4, modo=None):
+    """
+    Identifica todas las imágenes de fuentes (rutas, bytes o ficheros) y devuelve un DataFrame con una fila
+    por imagen: imagen, Number, Confianza (%) y, si se pasa df_catalogo, sus columnas de información.
+
+    Las imágenes que no se pueden abrir aparecen con la columna Error en lugar de la predicción.
+    """
+    modo = modo or TTA_MODO
+    filas = []
+    pendientes = []
+
+    def vaciar():
+        probabilidades = probabilidades_lote([t for _, _, t in pendientes], model, num_tta, modo)
+        confianzas, clases = probabilidades.max(dim=1)
+        for (i, nombre, _), clase, confianza in zip(pendientes, clases.tolist(), confianzas.tolist()):
+            filas.append({"orden": i, "imagen": nombre, "Number": str(idx_to_class.get(str(clase), "Desconocido")),
+                          "Confianza": confianza * 100, "Error": None})
+        pendientes.clear()
+
+    def recoger(i, fuente, futuro):
+        tensor, error = futuro.result()
+        if error is not None:
+            filas.append({"orden": i, "imagen": _nombre(fuente, i), "Number": None, "Confianza": None,
+                          "Error": str(error)})
+            return
+        pendientes.append((i, _nombre(fuente, i), tensor))
+        if len(pendientes) == tam_lote:
+            vaciar()
+
+    # Los hilos decodifican hasta dos microlotes por delante del modelo, sin cargar todas las imágenes a la vez
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        en_curso = deque()
+        for i, fuente in enumerate(fuentes):
+            en_curso.append((i, fuente, pool.submit(_intentar, _preparar, fuente, num_tta, modo)))
+            if len(en_curso) >= 2 * tam_lote:
+                recoger(*en_curso.popleft())
+        while en_curso:
+            recoger(*en_curso.popleft())
+        if pendientes:
+            vaciar()
+
+    resultado = pd.DataFrame(filas, columns=["orden", "imagen", "Number", "Confianza", "Error"])
+    resultado = resultado.sort_values("orden").drop(columns="orden").reset_index(drop=True)
+    if df_catalogo is not None:
+        columnas = ["Number"] + [c for c in COLUMNAS_CATALOGO if c in df_catalogo.columns]
+        catalogo = df_catalogo[columnas].drop_duplicates("Number").astype({"Number": str})
+        resultado = resultado.merge(catalogo, on="Number", how="left")
+    return resultado
+
+
+def _expandir(rutas):
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            yield from sorted(p for p in glob.glob(os.path.join(ruta, "*")) if p.lower().endswith(EXTENSIONES))
+        else:
+            yield ruta
+
+
+def guardar(resultado, path):
+    """Guarda el resultado como JSON (registros) si la extensión es .json y como CSV en otro caso."""
+    if path.lower().endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(json.loads(resultado.to_json(orient="records")), f, indent=2, ensure_ascii=False)
+    else:
+        resultado.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    from datasets import cargar_dataset
+    from model_registry import obtener_modelo
+    from model_utils import load_model
+
+    parser = argparse.ArgumentParser(description="Identificación por lotes de sets de LEGO")
+    parser.add_argument("imagenes", nargs="+", help="Imágenes o carpetas con imágenes")
+    parser.add_argument("--salida", default=None, help="Fichero .csv o .json (por defecto, se muestra en pantalla)")
+    parser.add_argument("--lote", type=int, default=16, help="Imágenes por pasada del modelo")
+    parser.add_argument("--hilos", type=int, default=4, help="Hilos para decodificar imágenes")
+    parser.add_argument("--num-tta", type=int, default=0)
+    parser.add_argument("--modo", choices=["determinista", "aleatorio"], default=None)
+    args = parser.parse_args()
+
+    model = load_model(obtener_modelo("identificador")[0])
+    with open(obtener_modelo("mapeo_identificador")[0], "r") as f:
+        idx_to_class = json.load(f)
+    rutas = list(_expandir(args.imagenes))
+
+    inicio = time.perf_counter()
+    resultado = identificar_lote(rutas, model, idx_to_class, cargar_dataset("camara"), num_tta=args.num_tta,
+                                 tam_lote=args.lote, hilos=args.hilos, modo=args.modo)
+    segundos = time.perf_counter() - inicio
+
+    if args.salida:
+        guardar(resultado, args.salida)
+        print(f"✅ Resultados guardados en {args.salida}")
+    else:
+        print(resultado.to_string(index=False))
+    print(f"⏱️ {len(rutas)} imágenes en {segundos:.2f} s ({len(rutas) / segundos:.1f} imágenes/s)")
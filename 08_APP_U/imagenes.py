@@ -0,0 +1,262 @@
+"""
+Servicio de imágenes de sets (Brickset, BrickLink) con caché en disco.
+
+Las páginas ya no comprueban ni descargan las imágenes en cada predicción: piden la imagen al servicio, que
+la sirve desde la caché local y solo la descarga la primera vez, con un tiempo máximo por petición.
+
+    - Caché LRU en disco (IRONBRICK_IMAGENES_DIR, por defecto <IRONBRICK_CACHE_DIR>/imagenes) limitada a
+      IRONBRICK_IMAGENES_MAX_MB: al superarse se borran las imágenes usadas hace más tiempo.
+    - Caché negativa: una imagen que no existe (404) no se vuelve a pedir en TTL_AUSENTE segundos, y una
+      descarga fallida (timeout, error de red) no se reintenta en TTL_ERROR segundos. Las marcas caducadas
+      se borran al leerlas y en cada recorte, y cuentan para el límite de tamaño de la caché.
+    - precargar() descarga en paralelo las imágenes de los N primeros resultados y espera como mucho el
+      presupuesto de tiempo indicado; las que no lleguen a tiempo siguen descargándose en segundo plano.
+
+Ver bench_imagenes.py (usa un servidor HTTP local en lugar de Brickset).
+
+Uso:
+    python 08_APP_U/imagenes.py 75192 10294 --fuente brickset_1
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as EsperaAgotada, wait
+import requests
+from feature_utils import CACHE_DIR
+
+IMAGENES_DIR = os.getenv("IRONBRICK_IMAGENES_DIR", os.path.join(CACHE_DIR, "imagenes"))
+MAX_BYTES = int(float(os.getenv("IRONBRICK_IMAGENES_MAX_MB", "200")) * 1024 * 1024)
+TIMEOUT = float(os.getenv("IRONBRICK_IMAGENES_TIMEOUT", "3"))
+TTL_AUSENTE = 7 * 24 * 3600
+TTL_ERROR = 5 * 60
+# Cada marca de la caché negativa ocupa al menos un bloque del sistema de ficheros
+BLOQUE = 4096
+
+# Plantillas de URL de las imágenes de un set por fuente
+FUENTES = {
+    "brickset": "https://images.brickset.com/sets/images/{numero}.jpg",
+    "brickset_1": "https://images.brickset.com/sets/images/{numero}-1.jpg",
+    "bricklink": "https://img.bricklink.com/ItemImage/SN/0/{numero}-1.png",
+}
+
+
+def url_imagen(numero, fuente="brickset_1"):
+    return FUENTES[fuente].format(numero=numero)
+
+
+def _tamano(path, bytes_fichero):
+    """Lo que cuenta un fichero de la caché para el límite de tamaño (None si no es de la caché)."""
+    if path.endswith(".img"):
+        return bytes_fichero
+    if path.endswith(".ausente"):
+        return max(bytes_fichero, BLOQUE)
+    return None
+
+
+def _caducada(path):
+    try:
+        with open(path, "r") as f:
+            return time.time() >= float(f.read())
+    except (OSError, ValueError):
+        return True
+
+
+class ServicioImagenes:
+    """Resuelve URLs de imágenes a ficheros locales en caché. Es seguro usarlo desde varios hilos."""
+
+    def __init__(self, directorio=IMAGENES_DIR, max_bytes=MAX_BYTES, timeout=TIMEOUT, hilos=8):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="imagenes")
+        # RLock: el callback de _descarga se ejecuta en el mismo hilo si la descarga ya ha terminado
+        self._lock = threading.RLock()
+        self._en_curso = {}
+        self._sesion = requests.Session()
+        os.makedirs(directorio, exist_ok=True)
+        self._bytes = sum(_tamano(e.path, e.stat().st_size) or 0 for e in os.scandir(directorio))
+
+    def _path(self, url, extension):
+        return os.path.join(self.directorio, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + extension)
+
+    def en_cache(self, url):
+        """Ruta local de la imagen si ya está en caché (sin acceder a la red). Cuenta como uso para el LRU."""
+        path = self._path(url, ".img")
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def ausente(self, url):
+        """True si la imagen no existe o falló hace poco (caché negativa vigente). Las marcas caducadas se borran."""
+        path = self._path(url, ".ausente")
+        try:
+            with open(path, "r") as f:
+                if time.time() < float(f.read()):
+                    return True
+        except OSError:
+            return False
+        except ValueError:
+            pass
+        self._borrar(path)
+        return False
+
+    def _borrar(self, path):
+        with self._lock:
+            try:
+                tamano = _tamano(path, os.path.getsize(path))
+                os.remove(path)
+            except OSError:
+                return
+            self._bytes -= tamano
+
+    def _reemplazar(self, tmp_path, path):
+        """os.replace de un fichero de la caché, contando solo la diferencia de tamaño si ya existía."""
+        with self._lock:
+            try:
+                anterior = _tamano(path, os.path.getsize(path))
+            except OSError:
+                anterior = 0
+            os.replace(tmp_path, path)
+            self._bytes += _tamano(path, os.path.getsize(path)) - anterior
+
+    def obtener(self, url, timeout=None):
+        """Ruta local de la imagen, descargándola si hace falta, o None si no existe o no llega a tiempo."""
+        path = self.en_cache(url)
+        if path or self.ausente(url):
+            return path
+        try:
+            return self._descarga(url).result(timeout=timeout or self.timeout)
+        except EsperaAgotada:
+            return None
+
+    def precargar(self, urls, presupuesto=None):
+        """
+        Descarga en paralelo las imágenes que falten y espera como mucho presupuesto segundos en total.
+        Devuelve {url: ruta local o None}; las descargas que no terminan a tiempo siguen en segundo plano.
+        """
+        resultado = {}
+        futuros = {}
+        for url in dict.fromkeys(urls):
+            path = self.en_cache(url)
+            if path or self.ausente(url):
+                resultado[url] = path
+            else:
+                futuros[url] = self._descarga(url)
+        if futuros:
+            wait(futuros.values(), timeout=self.timeout if presupuesto is None else presupuesto)
+        for url, futuro in futuros.items():
+            resultado[url] = futuro.result() if futuro.done() else None
+        return resultado
+
+    def para_mostrar(self, url):
+        """Lo que hay que pasar a st.image: la ruta en caché, None si no existe, o la URL si aún no se sabe."""
+        if self.ausente(url):
+            return None
+        return self.en_cache(url) or url
+
+    def _descarga(self, url):
+        # Una sola descarga por URL aunque la pidan varias páginas a la vez
+        with self._lock:
+            futuro = self._en_curso.get(url)
+            if futuro is None:
+                futuro = self._pool.submit(self._descargar, url)
+                self._en_curso[url] = futuro
+                futuro.add_done_callback(lambda _: self._terminar(url))
+            return futuro
+
+    def _terminar(self, url):
+        with self._lock:
+            self._en_curso.pop(url, None)
+
+    def _descargar(self, url):
+        try:
+            response = self._sesion.get(url, timeout=self.timeout)
+        except requests.RequestException:
+            self._marcar_ausente(url, TTL_ERROR)
+            return None
+        if response.status_code == 404 or response.status_code == 410:
+            self._marcar_ausente(url, TTL_AUSENTE)
+            return None
+        if response.status_code != 200 or not response.headers.get("Content-Type", "image").startswith("image"):
+            self._marcar_ausente(url, TTL_ERROR)
+            return None
+
+        path = self._path(url, ".img")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        # Si la imagen ya estaba en caché (por ejemplo, la descargó otro proceso) se reemplaza
+        self._reemplazar(tmp_path, path)
+        self._recortar()
+        return path
+
+    def _marcar_ausente(self, url, ttl):
+        path = self._path(url, ".ausente")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(time.time() + ttl))
+        self._reemplazar(tmp_path, path)
+        self._recortar()
+
+    def _recortar(self):
+        """
+        Borra las marcas de la caché negativa ya caducadas y después las imágenes y marcas usadas hace más
+        tiempo (por mtime) hasta bajar del 90 % del límite.
+        """
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return
+            entradas = []
+            for e in os.scandir(self.directorio):
+                tamano = _tamano(e.path, e.stat().st_size)
+                if tamano is None:
+                    continue
+                if e.name.endswith(".ausente") and _caducada(e.path):
+                    try:
+                        os.remove(e.path)
+                    except OSError:
+                        pass
+                    continue
+                entradas.append((e.stat().st_mtime, tamano, e.path))
+            entradas.sort()
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, path in entradas:
+                if total <= 0.9 * self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= tamano
+                except OSError:
+                    pass
+            self._bytes = total
+
+
+_servicio = None
+
+
+def servicio_imagenes():
+    """Servicio compartido por todas las páginas del proceso."""
+    global _servicio
+    if _servicio is None:
+        _servicio = ServicioImagenes()
+    return _servicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga y cachea imágenes de sets de LEGO")
+    parser.add_argument("numeros", nargs="+", help="Números de set")
+    parser.add_argument("--fuente", choices=sorted(FUENTES), default="brickset_1")
+    parser.add_argument("--presupuesto", type=float, default=10.0, help="Segundos máximos de espera en total")
+    args = parser.parse_args()
+
+    servicio = servicio_imagenes()
+    inicio = time.perf_counter()
+    rutas = servicio.precargar([url_imagen(n, args.fuente) for n in args.numeros], presupuesto=args.presupuesto)
+    for numero in args.numeros:
+        path = rutas[url_imagen(numero, args.fuente)]
+        print(f"{'✅' if path else '⚠️'} {numero}: {path or 'sin imagen'}")
+    print(f"⏱️ {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,141 @@
+"""
+Optimizador de carteras de sets retirados para el recomendador de inversión.
+
+Encuentra las k mejores combinaciones de hasta max_sets sets (sin repetir) cuyo precio total no supera el
+presupuesto, maximizando la suma de PredictedValue5Y, sobre el catálogo filtrado completo.
+
+Es una búsqueda en profundidad con ramificación y poda (branch and bound): los sets se recorren de mayor a
+menor valor y cada rama se descarta en cuanto su cota superior no mejora la k-ésima mejor cartera ya
+encontrada. La cota de una rama es el mínimo entre:
+    - la suma de los valores de los siguientes sets (los huecos libres no pueden aportar más), y
+    - el presupuesto restante por la mejor relación valor/precio que queda (mochila fraccionaria).
+Ambas cotas decrecen a lo largo del recorrido, así que en cuanto una rama no mejora, tampoco lo hacen las
+siguientes y se corta el bucle. El último hueco de cada cartera se resuelve con una búsqueda vectorizada.
+
+Para bolsas pequeñas de candidatos (por ejemplo, los 30-50 sets con más valor) también hay un enumerador
+en streaming, enumerar_combinaciones + top_k_combinaciones, que recorre todas las combinaciones que caben
+en el presupuesto con memoria O(k).
+
+Ver bench_inversiones.py para la comprobación contra fuerza bruta y los tiempos.
+"""
+import heapq
+import numpy as np
+
+
+def mejores_carteras(precios, valores, presupuesto, k=3, max_sets=4):
+    """
+    Devuelve hasta k carteras óptimas como lista de (índices, valor_total, precio_total), de mayor a menor valor.
+
+    precios y valores son arrays alineados (un elemento por set); los índices devueltos se refieren a ellos.
+    """
+    precios = np.asarray(precios, dtype=np.float64)
+    valores = np.asarray(valores, dtype=np.float64)
+    if k <= 0 or max_sets <= 0 or len(precios) == 0:
+        return []
+
+    # Solo los sets que caben por sí solos en el presupuesto, ordenados de mayor a menor valor
+    candidatos = np.flatnonzero(precios <= presupuesto)
+    orden = candidatos[np.argsort(-valores[candidatos], kind="stable")]
+    p = precios[orden]
+    v = valores[orden]
+    n = len(v)
+    if n == 0:
+        return []
+
+    # Suma de valores positivos de cualquier ventana v[j:j+m] en O(1)
+    acumulado = np.concatenate([[0.0], np.cumsum(np.maximum(v, 0))])
+    # Mejor relación valor/precio desde j hasta el final (los sets gratis anulan esta cota)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(p > 0, v / np.where(p > 0, p, 1), np.inf)
+    ratio_max = np.maximum.accumulate(ratio[::-1])[::-1]
+
+    # El recorrido accede elemento a elemento: con listas de Python es varias veces más rápido que con numpy
+    pl, vl, acum, rmax = p.tolist(), v.tolist(), acumulado.tolist(), np.maximum(ratio_max, 0.0).tolist()
+    mejores = []  # min-heap de (valor, contador, índices, precio) con las k mejores carteras
+    contador = [0]
+
+    def anotar(valor, seleccion, precio):
+        contador[0] += 1
+        entrada = (valor, -contador[0], tuple(seleccion), precio)
+        if len(mejores) < k:
+            heapq.heappush(mejores, entrada)
+        elif valor > mejores[0][0]:
+            heapq.heapreplace(mejores, entrada)
+
+    def explorar(inicio, huecos, restante, valor, precio, seleccion):
+        if huecos == 1:
+            # Último hueco: los primeros sets que caben son los de más valor (el orden es descendente)
+            for j in (inicio + np.flatnonzero(p[inicio:] <= restante)[:k]).tolist():
+                if len(mejores) == k and valor + vl[j] <= mejores[0][0]:
+                    break
+                anotar(valor + vl[j], seleccion + [j], precio + pl[j])
+            return
+
+        for j in range(inicio, n):
+            if len(mejores) == k:
+                por_huecos = max(vl[j], acum[min(j + huecos, n)] - acum[j])
+                if valor + min(por_huecos, restante * rmax[j]) <= mejores[0][0]:
+                    break
+            if pl[j] > restante:
+                continue
+            anotar(valor + vl[j], seleccion + [j], precio + pl[j])
+            if j + 1 < n:
+                explorar(j + 1, huecos - 1, restante - pl[j], valor + vl[j], precio + pl[j], seleccion + [j])
+
+    explorar(0, max_sets, float(presupuesto), 0.0, 0.0, [])
+
+    # De mayor a menor valor; a igual valor, en el orden en que se encontraron
+    resultado = sorted(mejores, key=lambda e: (-e[0], -e[1]))
+    return [(tuple(int(orden[j]) for j in indices), float(valor), float(precio))
+            for valor, _, indices, precio in resultado]
+
+
+def enumerar_combinaciones(precios, valores_2y, valores_5y, presupuesto, max_sets=4):
+    """
+    Genera todas las combinaciones de 1 a max_sets sets que caben en el presupuesto.
+
+    Cada elemento es (índices, precio_total, valor_2y, valor_5y). Los sets se recorren de más barato a más
+    caro, así que en cuanto uno no cabe en lo que queda de presupuesto tampoco cabe ninguno de los
+    siguientes y se corta la rama. Las sumas se arrastran de la combinación padre en lugar de recalcularse.
+    """
+    precios = np.asarray(precios, dtype=np.float64)
+    orden = np.argsort(precios, kind="stable")
+    p = precios[orden].tolist()
+    v2 = np.asarray(valores_2y, dtype=np.float64)[orden].tolist()
+    v5 = np.asarray(valores_5y, dtype=np.float64)[orden].tolist()
+    indices = orden.tolist()
+    n = len(p)
+
+    def extender(inicio, seleccion, precio, suma_2y, suma_5y):
+        for j in range(inicio, n):
+            total = precio + p[j]
+            if total > presupuesto:
+                break
+            combinacion = seleccion + (indices[j],)
+            yield combinacion, total, suma_2y + v2[j], suma_5y + v5[j]
+            if len(combinacion) < max_sets:
+                yield from extender(j + 1, combinacion, total, suma_2y + v2[j], suma_5y + v5[j])
+
+    return extender(0, (), 0.0, 0.0, 0.0)
+
+
+def top_k_combinaciones(combinaciones, k=3):
+    """Las k combinaciones de mayor valor a 5 años, consumiendo el generador con un heap de tamaño k."""
+    return heapq.nlargest(k, combinaciones, key=lambda c: c[3])
+
+
+def encontrar_mejores_inversiones(df, presupuesto, num_opciones=3, max_sets=4):
+    """
+    Mejores combinaciones de sets de df (con SetName, Number, CurrentValueNew, PredictedValue2Y y PredictedValue5Y).
+
+    Devuelve una lista de (sets, retorno_2y, retorno_5y, precio_total), donde sets es una lista de tuplas
+    (SetName, CurrentValueNew, PredictedValue2Y, PredictedValue5Y, Number).
+    """
+    carteras = mejores_carteras(df["CurrentValueNew"].to_numpy(), df["PredictedValue5Y"].to_numpy(),
+                                presupuesto, k=num_opciones, max_sets=max_sets)
+    filas = df[["SetName", "CurrentValueNew", "PredictedValue2Y", "PredictedValue5Y", "Number"]].values.tolist()
+    opciones = []
+    for indices, retorno_5y, precio in carteras:
+        sets = [tuple(filas[i]) for i in indices]
+        opciones.append((sets, sum(s[2] for s in sets), retorno_5y, precio))
+    return opciones
@@ -0,0 +1,134 @@
+"""
+Migraciones del esquema de PostgreSQL compartido por la app de Streamlit y el bot de Telegram.
+
+Cada migración tiene un número de versión y una lista de sentencias; las ya aplicadas se registran
+en la tabla schema_migrations, así que aplicar_migraciones() se puede llamar en cada arranque (app y
+bot) sin efectos. Un advisory lock evita que dos procesos migren a la vez, y cada migración se
+aplica en su propia transacción: si falla, no queda a medias.
+
+Uso:
+    python 08_APP_U/migrations.py            # aplica las migraciones pendientes
+    python 08_APP_U/migrations.py --estado   # lista las aplicadas y las pendientes
+"""
+import argparse
+from db import get_db_connection
+
+# Clave arbitraria (pero fija) del advisory lock de las migraciones
+_LOCK_MIGRACIONES = 724_315_001
+
+MIGRACIONES = [
+    (1, "Tablas base de usuarios y recomendaciones", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            telegram_id TEXT PRIMARY KEY,
+            presupuesto_min INTEGER,
+            presupuesto_max INTEGER,
+            temas_favoritos TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS recomendaciones (
+            id SERIAL PRIMARY KEY,
+            telegram_id TEXT,
+            set_id TEXT
+        )
+        """,
+    ]),
+    (2, "Fecha de envío en recomendaciones", [
+        # Con un DEFAULT no volátil PostgreSQL (>= 11) no reescribe la tabla: las filas antiguas toman
+        # la fecha de la migración
+        "ALTER TABLE recomendaciones ADD COLUMN IF NOT EXISTS sent_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    ]),
+    (3, "Historial sin duplicados e indexado por (telegram_id, set_id)", [
+        # Se conserva la primera recomendación de cada par (la de menor id)
+        """
+        DELETE FROM recomendaciones
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY telegram_id, set_id ORDER BY id) AS n
+                FROM recomendaciones
+            ) duplicadas
+            WHERE n > 1
+        )
+        """,
+        # El índice único sirve a la vez de restricción (ON CONFLICT) y de índice de búsqueda por
+        # telegram_id; al incluir set_id la consulta del historial se resuelve con un index-only scan
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS recomendaciones_telegram_set_uq
+        ON recomendaciones (telegram_id, set_id)
+        """,
+    ]),
+    (4, "Tabla envios con el estado de cada mensaje de la alerta mensual", [
+        """
+        CREATE TABLE IF NOT EXISTS envios (
+            id SERIAL PRIMARY KEY,
+            telegram_id TEXT,
+            set_id TEXT,
+            estado TEXT,
+            intentos INTEGER,
+            error TEXT,
+            enviado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+]
+
+
+def _crear_tabla_versiones(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT,
+        aplicada_en TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """)
+
+
+def versiones_aplicadas(conn):
+    cursor = conn.cursor()
+    _crear_tabla_versiones(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    aplicadas = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    return aplicadas
+
+
+def aplicar_migraciones(conn):
+    """Aplica en orden las migraciones pendientes. Devuelve la lista de versiones aplicadas ahora."""
+    aplicadas_ahora = []
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_advisory_lock(%s)", (_LOCK_MIGRACIONES,))
+    try:
+        aplicadas = versiones_aplicadas(conn)
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version in aplicadas:
+                continue
+            try:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+                cursor.execute("INSERT INTO schema_migrations (version, descripcion) VALUES (%s, %s)",
+                               (version, descripcion))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas_ahora.append(version)
+            print(f"🗄️ Migración {version} aplicada: {descripcion}")
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_MIGRACIONES,))
+        conn.commit()
+    return aplicadas_ahora
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de PostgreSQL")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra las migraciones aplicadas y pendientes")
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        if args.estado:
+            aplicadas = versiones_aplicadas(conn)
+            for version, descripcion, _ in MIGRACIONES:
+                print(f"{'✅' if version in aplicadas else '⏳'} {version:>3}  {descripcion}")
+        else:
+            aplicar_migraciones(conn)
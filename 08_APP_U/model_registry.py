@@ -0,0 +1,226 @@
+"""
+Registro de modelos con almacén local direccionado por contenido.
+
+Los modelos (y el mapeo de clases del identificador) se declaran en modelos.json con su URL y, si está
+fijada, la versión esperada como hash SHA-256. Cada fichero descargado se guarda en el almacén local con su
+hash como nombre (objetos/<sha256>) y una referencia por nombre (refs/<nombre>) apunta a la última versión.
+
+    - Con versión fijada, solo se acepta ese contenido: si la descarga no coincide se descarta y da error.
+    - Sin versión fijada, se usa la última referencia del almacén. Si no hay ninguna, la app y el bot no
+      descargan un modelo sin verificar (el .pkl se carga con pickle): hay que precargarlo (--precargar,
+      un paso explícito que avisa) y fijarlo (--fijar), o permitirlo con IRONBRICK_PERMITIR_SIN_FIJAR=1.
+    - Al leer un objeto por primera vez en el proceso se comprueba su hash.
+    - Con IRONBRICK_OFFLINE=1 nunca se accede a la red: el modelo tiene que estar ya en el almacén.
+
+El almacén está en IRONBRICK_MODEL_STORE (por defecto <IRONBRICK_CACHE_DIR>/modelos), así que en un
+contenedor nuevo basta con montarlo o precargarlo para arrancar sin red.
+
+Uso:
+    python 08_APP_U/model_registry.py --precargar                 # descarga y verifica todos los modelos
+    python 08_APP_U/model_registry.py --importar identificador 07_Camera/Streamlit/modelo_lego_final.pth
+    python 08_APP_U/model_registry.py --fijar stacking            # escribe en modelos.json el hash actual
+    python 08_APP_U/model_registry.py --estado
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import requests
+from feature_utils import CACHE_DIR
+
+MANIFIESTO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modelos.json")
+STORE_DIR = os.getenv("IRONBRICK_MODEL_STORE", os.path.join(CACHE_DIR, "modelos"))
+OFFLINE = os.getenv("IRONBRICK_OFFLINE", "0") == "1"
+PERMITIR_SIN_FIJAR = os.getenv("IRONBRICK_PERMITIR_SIN_FIJAR", "0") == "1"
+
+# Objetos ya verificados en este proceso (hash -> ruta)
+_verificados = {}
+
+
+class ModeloNoDisponible(RuntimeError):
+    """El modelo no está en el almacén local y no se puede (o no se debe) descargar."""
+
+
+class ChecksumInvalido(ValueError):
+    """El contenido del modelo no coincide con el hash SHA-256 esperado."""
+
+
+def cargar_manifiesto(path=MANIFIESTO_PATH):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _objeto_path(sha256):
+    return os.path.join(STORE_DIR, "objetos", sha256)
+
+
+def _ref_path(nombre):
+    return os.path.join(STORE_DIR, "refs", nombre)
+
+
+def _escribir_atomico(path, contenido):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(contenido)
+    os.replace(tmp_path, path)
+
+
+def version_fijada(nombre, manifiesto=None):
+    """Hash fijado del modelo: variable IRONBRICK_SHA256_<NOMBRE> o, si no, el de modelos.json."""
+    manifiesto = manifiesto or cargar_manifiesto()
+    return os.getenv(f"IRONBRICK_SHA256_{nombre.upper()}") or manifiesto[nombre].get("sha256")
+
+
+def version_local(nombre):
+    """Hash de la última versión del modelo guardada en el almacén, o None."""
+    try:
+        with open(_ref_path(nombre), "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _verificar(sha256):
+    """Ruta del objeto si existe y su contenido coincide con el hash; si está dañado se elimina."""
+    if sha256 in _verificados:
+        return _verificados[sha256]
+    path = _objeto_path(sha256)
+    if not os.path.exists(path):
+        return None
+    if _sha256(path) != sha256:
+        print(f"⚠️ Objeto dañado en el almacén de modelos, se elimina: {path}")
+        os.remove(path)
+        return None
+    _verificados[sha256] = path
+    return path
+
+
+def _guardar_objeto(nombre, origen, esperado, mover):
+    """Calcula el hash de origen, lo comprueba contra esperado y lo guarda en el almacén."""
+    sha256 = _sha256(origen)
+    if esperado and sha256 != esperado:
+        if mover:
+            os.remove(origen)
+        raise ChecksumInvalido(f"❌ {nombre}: SHA-256 {sha256[:12]} no coincide con la versión fijada {esperado[:12]}")
+
+    destino = _objeto_path(sha256)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if mover:
+        os.replace(origen, destino)
+    elif not os.path.exists(destino):
+        tmp_path = f"{destino}.{os.getpid()}.tmp"
+        shutil.copyfile(origen, tmp_path)
+        os.replace(tmp_path, destino)
+    _escribir_atomico(_ref_path(nombre), sha256)
+    _verificados[sha256] = destino
+    return destino, sha256
+
+
+def _descargar(nombre, url, esperado, timeout=60):
+    os.makedirs(os.path.join(STORE_DIR, "objetos"), exist_ok=True)
+    tmp_path = os.path.join(STORE_DIR, "objetos", f"descarga_{nombre}.{os.getpid()}.tmp")
+    print(f"📥 Descargando {nombre} desde {url}")
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    return _guardar_objeto(nombre, tmp_path, esperado, mover=True)
+
+
+def obtener_modelo(nombre, manifiesto=None, permitir_sin_fijar=None):
+    """
+    Devuelve (ruta, sha256) del modelo en el almacén local, descargándolo solo si hace falta.
+
+    El sha256 sirve como versión del modelo (por ejemplo, para la caché de puntuaciones). Un modelo sin
+    versión fijada solo se descarga con permitir_sin_fijar (la precarga explícita) o con
+    IRONBRICK_PERMITIR_SIN_FIJAR=1, y siempre con aviso.
+    """
+    manifiesto = manifiesto or cargar_manifiesto()
+    if nombre not in manifiesto:
+        raise KeyError(f"Modelo desconocido: {nombre}")
+
+    esperado = version_fijada(nombre, manifiesto)
+    sha256 = esperado or version_local(nombre)
+    if sha256:
+        path = _verificar(sha256)
+        if path:
+            if version_local(nombre) != sha256:
+                _escribir_atomico(_ref_path(nombre), sha256)
+            return path, sha256
+
+    if OFFLINE:
+        raise ModeloNoDisponible(f"❌ {nombre} no está en el almacén local ({STORE_DIR}) y IRONBRICK_OFFLINE=1")
+    if not esperado:
+        if not (PERMITIR_SIN_FIJAR if permitir_sin_fijar is None else permitir_sin_fijar):
+            raise ModeloNoDisponible(
+                f"❌ {nombre} no tiene versión fijada en modelos.json: no se descarga sin verificar. Precárgalo "
+                f"con python 08_APP_U/model_registry.py --precargar {nombre}, revísalo y fíjalo con --fijar "
+                f"{nombre} (o define IRONBRICK_PERMITIR_SIN_FIJAR=1)")
+        print(f"⚠️ {nombre} no tiene versión fijada: se descarga SIN VERIFICAR su contenido. "
+              f"Fíjalo con model_registry.py --fijar {nombre} tras revisarlo")
+    return _descargar(nombre, manifiesto[nombre]["url"], esperado)
+
+
+def importar_modelo(nombre, path, manifiesto=None):
+    """Añade al almacén un fichero local como versión del modelo (respetando la versión fijada)."""
+    manifiesto = manifiesto or cargar_manifiesto()
+    return _guardar_objeto(nombre, path, version_fijada(nombre, manifiesto), mover=False)
+
+
+def fijar_version(nombre, path=MANIFIESTO_PATH):
+    """Escribe en el manifiesto el hash de la versión local actual del modelo."""
+    manifiesto = cargar_manifiesto(path)
+    sha256 = version_local(nombre)
+    if not sha256:
+        raise ModeloNoDisponible(f"❌ {nombre} no está en el almacén local: precárgalo o impórtalo antes de fijarlo")
+    manifiesto[nombre]["sha256"] = sha256
+    _escribir_atomico(path, json.dumps(manifiesto, indent=2, ensure_ascii=False) + "\n")
+    return sha256
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén local de modelos con verificación SHA-256")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--precargar", nargs="*", metavar="NOMBRE", help="Descarga y verifica modelos (por defecto, todos)")
+    grupo.add_argument("--importar", nargs=2, metavar=("NOMBRE", "FICHERO"), help="Añade un fichero local al almacén")
+    grupo.add_argument("--fijar", nargs="+", metavar="NOMBRE", help="Fija en modelos.json la versión local actual")
+    grupo.add_argument("--estado", action="store_true", help="Muestra las versiones fijadas y locales")
+    args = parser.parse_args()
+
+    manifiesto = cargar_manifiesto()
+    if args.importar:
+        nombre, fichero = args.importar
+        path, sha256 = importar_modelo(nombre, fichero, manifiesto)
+        print(f"✅ {nombre}: {sha256[:12]} → {path}")
+    elif args.fijar:
+        for nombre in args.fijar:
+            print(f"📌 {nombre}: fijado a {fijar_version(nombre)[:12]}")
+    elif args.estado:
+        print(f"Almacén: {STORE_DIR}")
+        for nombre in manifiesto:
+            fijada = version_fijada(nombre, manifiesto)
+            local = version_local(nombre)
+            print(f"{nombre:<22} fijada: {(fijada or '-')[:12]:<12} local: {(local or '-')[:12]}")
+    else:
+        errores = 0
+        for nombre in args.precargar or manifiesto:
+            try:
+                path, sha256 = obtener_modelo(nombre, manifiesto, permitir_sin_fijar=True)
+            except (ModeloNoDisponible, ChecksumInvalido, requests.RequestException) as e:
+                print(e)
+                errores += 1
+                continue
+            print(f"✅ {nombre}: {sha256[:12]} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        if errores:
+            raise SystemExit(1)
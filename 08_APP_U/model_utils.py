@@ -1,16 +1,42 @@
+import copy
+import glob
+import hashlib
+import json
+import os
+import time
 import torch
 from torchvision import models
 import torch.nn as nn
 
-def load_model(model_path):
-    """Carga el modelo entrenado, asegurando que la arquitectura coincida con los pesos guardados."""
+# Modo de inferencia optimizada en CPU: "" (modelo eager float32, por defecto), "torchscript"
+# (channels_last + trace + freeze) o "int8" (además, cuantización dinámica int8 de las capas lineales)
+OPTIMIZACION = os.getenv("IRONBRICK_MODELO_OPTIMIZADO", "")
+OPTIMIZACIONES = ("torchscript", "int8")
+
+# Deriva máxima permitida frente al modelo eager sobre fotos reales: diferencia absoluta de probabilidades y
+# fracción de desacuerdo top-1
+MAX_DERIVA_PROB = float(os.getenv("IRONBRICK_MAX_DERIVA_PROB", "0.05"))
+MAX_DESACUERDO_TOP1 = float(os.getenv("IRONBRICK_MAX_DESACUERDO_TOP1", "0.1"))
+
+# Fotos reales con las que se mide la deriva (cada una con sus vistas fijas de TTA)
+IMAGENES_DERIVA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "07_Camera/Test_image/*.jpg")
+VISTAS_DERIVA = 5
+
+
+def load_model(model_path, optimizacion=None):
+    """
+    Carga el modelo entrenado, asegurando que la arquitectura coincida con los pesos guardados.
+
+    Con optimizacion ("torchscript" o "int8"; por defecto IRONBRICK_MODELO_OPTIMIZADO) y en CPU se devuelve
+    la versión optimizada, que se construye una vez y se guarda junto al .pth (ver cargar_optimizado).
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     # Cargar el diccionario de pesos
     state_dict = torch.load(model_path, map_location=device)
 
     # Obtener el número de clases desde los pesos guardados
-    num_classes = state_dict["classifier.3.weight"].shape[0]  
+    num_classes = state_dict["classifier.3.weight"].shape[0]
 
     print(f"📌 Número de clases detectado en los pesos guardados: {num_classes}")
 
@@ -31,4 +57,148 @@ def load_model(model_path):
 
     model.to(device)
     model.eval()
+
+    optimizacion = OPTIMIZACION if optimizacion is None else optimizacion
+    if optimizacion and device.type == "cpu":
+        return cargar_optimizado(model, model_path, optimizacion)
     return model
+
+
+class _ChannelsLast(nn.Module):
+    """Pasa la entrada a channels_last, el formato de memoria más rápido para las convoluciones en CPU."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def optimizar_modelo(model, optimizacion):
+    """Versión TorchScript congelada del modelo eager (con las capas lineales en int8 si optimizacion == "int8")."""
+    if optimizacion not in OPTIMIZACIONES:
+        raise ValueError(f"Optimización desconocida: {optimizacion} (opciones: {', '.join(OPTIMIZACIONES)})")
+    # Se trabaja sobre una copia: channels_last y cpu() modifican el modelo en el sitio
+    model = copy.deepcopy(model).cpu().eval()
+    if optimizacion == "int8":
+        # Cuantización dinámica: pesos de las capas lineales (cabeza del clasificador) en int8
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    model = _ChannelsLast(model.to(memory_format=torch.channels_last)).eval()
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, torch.zeros(1, 3, 224, 224))
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+
+def lote_deriva(patron=IMAGENES_DERIVA, num_tta=VISTAS_DERIVA):
+    """
+    Lote fijo de fotos reales (07_Camera/Test_image) ya normalizadas, cada una seguida de sus vistas
+    deterministas de TTA, o None si no hay fotos.
+    """
+    from PIL import Image
+    from predict import transform
+    from tta import tta_tensor
+
+    rutas = sorted(glob.glob(patron))
+    if not rutas:
+        return None
+    batch = torch.stack([transform(Image.open(ruta).convert("RGB")) for ruta in rutas])
+    return tta_tensor(batch, num_tta=num_tta)
+
+
+def medir_deriva(eager, optimizado, batch=None):
+    """
+    Diferencia máxima de probabilidades y fracción de desacuerdo top-1 entre ambos modelos sobre un lote
+    fijo (por defecto, lote_deriva()).
+    """
+    batch = lote_deriva() if batch is None else batch
+    with torch.inference_mode():
+        p_eager = torch.softmax(eager(batch), dim=1)
+        p_optimizado = torch.softmax(optimizado(batch), dim=1)
+    return {
+        "imagenes": len(batch),
+        "max_diferencia_prob": float((p_eager - p_optimizado).abs().max()),
+        "desacuerdo_top1": float((p_eager.argmax(dim=1) != p_optimizado.argmax(dim=1)).float().mean()),
+    }
+
+
+def ruta_optimizada(model_path, optimizacion):
+    return f"{model_path}.{optimizacion}.pt"
+
+
+def ruta_informe(model_path, optimizacion):
+    return f"{model_path}.{optimizacion}.json"
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _leer_informe(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_informe(path, informe):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(informe, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def cargar_optimizado(model, model_path, optimizacion):
+    """
+    Modelo optimizado en caché junto al .pth (<pth>.<optimizacion>.pt), construyéndolo si no existe.
+
+    Al construirlo se compara con el modelo eager sobre las fotos de lote_deriva(): si la deriva supera los
+    umbrales se descarta y se sigue con el modelo eager. El informe (<pth>.<optimizacion>.json) guarda el
+    sha256 del .pth, los umbrales y si se aceptó: un modelo descartado no se vuelve a construir en cada
+    arranque mientras no cambien los pesos ni los umbrales.
+    """
+    path = ruta_optimizada(model_path, optimizacion)
+    informe_path = ruta_informe(model_path, optimizacion)
+    clave = {"sha256": _sha256(model_path), "max_deriva_prob": MAX_DERIVA_PROB,
+             "max_desacuerdo_top1": MAX_DESACUERDO_TOP1}
+    informe = _leer_informe(informe_path)
+    if informe is not None and all(informe.get(k) == v for k, v in clave.items()):
+        if not informe.get("aceptado"):
+            return model
+        if os.path.exists(path):
+            try:
+                return torch.jit.load(path, map_location="cpu")
+            except (RuntimeError, OSError) as e:
+                print(f"⚠️ No se pudo cargar el modelo optimizado ({e}); se vuelve a construir")
+
+    batch = lote_deriva()
+    if batch is None:
+        print(f"⚠️ Sin fotos en {IMAGENES_DERIVA} no se puede validar el modelo {optimizacion}; se usa el eager")
+        return model
+
+    inicio = time.perf_counter()
+    optimizado = optimizar_modelo(model, optimizacion)
+    deriva = medir_deriva(model, optimizado, batch)
+    deriva["segundos_construccion"] = time.perf_counter() - inicio
+    aceptado = deriva["max_diferencia_prob"] <= MAX_DERIVA_PROB and deriva["desacuerdo_top1"] <= MAX_DESACUERDO_TOP1
+
+    try:
+        if aceptado:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.jit.save(optimizado, tmp_path)
+            os.replace(tmp_path, path)
+        # El informe se escribe el último: si dice aceptado, el .pt ya está completo
+        _guardar_informe(informe_path, {**clave, "aceptado": aceptado, **deriva})
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el modelo optimizado en caché: {e}")
+
+    if not aceptado:
+        print(f"⚠️ Modelo {optimizacion} descartado por deriva excesiva frente al eager: {deriva}")
+        return model
+    print(f"✅ Modelo {optimizacion} construido en {deriva['segundos_construccion']:.1f} s (deriva: {deriva})")
+    return optimizado
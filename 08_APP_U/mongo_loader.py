@@ -0,0 +1,116 @@
+"""
+Carga tipada del catálogo de MongoDB para las páginas del recomendador.
+
+En lugar de traer todos los campos de todos los documentos a una lista de dicts y construir después el
+DataFrame, se envían a MongoDB la proyección con las columnas que se usan y el filtro de precio, y los
+documentos se leen por lotes y se vuelcan directamente en arrays por columna con su tipo final
+(float32, int16 o categoría). Solo un lote de dicts está vivo a la vez.
+
+Ver bench_mongo_loader.py para la comparación de memoria y tiempo con pd.DataFrame(list(find())).
+"""
+import itertools
+import numpy as np
+import pandas as pd
+
+# Columnas que usan el preprocesado del modelo (feature_utils) y las páginas del recomendador, con su tipo:
+# "float32", "int16", "category", "str" o "object" (el valor de MongoDB sin convertir)
+COLUMNAS_RECOMENDADOR = {
+    "Number": "str",
+    "SetName": "str",
+    "Theme": "category",
+    "USRetailPrice": "float32",
+    "Pieces": "int16",
+    "Minifigs": "int16",
+    "YearsSinceExit": "int16",
+    "ResaleDemand": "float32",
+    "AnnualPriceIncrease": "float32",
+    "Exclusivity": "category",
+    "SizeCategory": "category",
+    "LaunchYear": "int16",
+    "ExitYear": "int16",
+}
+
+FILTRO_RECOMENDADOR = {"USRetailPrice": {"$gt": 0}}
+
+
+def proyeccion(columnas):
+    """Proyección de MongoDB con solo las columnas pedidas; sin _id salvo que se pida."""
+    campos = {col: 1 for col in columnas}
+    campos.setdefault("_id", 0)
+    return campos
+
+
+def _numerico(valores):
+    # None y valores no numéricos pasan a NaN, igual que pd.to_numeric(errors="coerce")
+    return pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _convertir_lote(documentos, columnas):
+    """Convierte una lista de documentos en un dict columna -> array con el tipo final de la columna."""
+    lote = {}
+    for col, tipo in columnas.items():
+        valores = [d.get(col) for d in documentos]
+        if tipo in ("float32", "int16"):
+            # Los enteros se guardan como float32 hasta el final por si hay nulos
+            lote[col] = _numerico(valores).astype(np.float32)
+        elif tipo == "category":
+            lote[col] = pd.Categorical(valores)
+        elif tipo == "str":
+            lote[col] = np.array([None if v is None else str(v) for v in valores], dtype=object)
+        else:
+            # "object": el valor tal cual (ObjectId, fechas...)
+            lote[col] = np.empty(len(valores), dtype=object)
+            lote[col][:] = valores
+    return lote
+
+
+def _unir_lotes(lotes, columnas):
+    datos = {}
+    for col, tipo in columnas.items():
+        partes = [lote[col] for lote in lotes]
+        if tipo == "category":
+            datos[col] = pd.api.types.union_categoricals(partes) if partes else pd.Categorical([])
+            continue
+        if partes:
+            valores = np.concatenate(partes)
+        else:
+            valores = np.array([], dtype=np.float32 if tipo in ("float32", "int16") else object)
+        if tipo == "int16":
+            # Sin nulos y dentro de rango se guarda como int16; si no, se queda en float32
+            finitos = valores[np.isfinite(valores)]
+            if len(finitos) == len(valores) and (len(valores) == 0 or
+                                                  (finitos.min() >= -32768 and finitos.max() <= 32767)):
+                valores = valores.astype(np.int16)
+        datos[col] = valores
+    return pd.DataFrame(datos)
+
+
+def tipar_documentos(documentos, columnas=COLUMNAS_RECOMENDADOR):
+    """DataFrame tipado a partir de documentos ya leídos (por ejemplo, los cambios de una sincronización)."""
+    return _unir_lotes([_convertir_lote(documentos, columnas)], columnas)
+
+
+def cargar_catalogo(collection, columnas=COLUMNAS_RECOMENDADOR, filtro=FILTRO_RECOMENDADOR, tamano_lote=5_000):
+    """
+    Lee el catálogo con la proyección y el filtro aplicados en MongoDB y lo devuelve como DataFrame tipado.
+
+    Los documentos se convierten lote a lote (tamano_lote) a arrays por columna, de forma que nunca hay
+    en memoria más de un lote de dicts de Python.
+    """
+    cursor = collection.find(filtro or {}, proyeccion(columnas), batch_size=tamano_lote)
+    lotes = []
+    while True:
+        documentos = list(itertools.islice(cursor, tamano_lote))
+        if not documentos:
+            break
+        lotes.append(_convertir_lote(documentos, columnas))
+    return _unir_lotes(lotes, columnas)
+
+
+def alinear_categorias(df, otro):
+    """Da a las columnas categóricas de df y otro las mismas categorías, para poder combinarlas sin perder el tipo."""
+    for col in df.columns.intersection(otro.columns):
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and isinstance(otro[col].dtype, pd.CategoricalDtype):
+            categorias = df[col].cat.categories.union(otro[col].cat.categories)
+            df[col] = df[col].cat.set_categories(categorias)
+            otro[col] = otro[col].cat.set_categories(categorias)
@@ -0,0 +1,262 @@
+"""
+Sincronización incremental del catálogo de MongoDB con un DataFrame en memoria.
+
+La primera llamada carga la colección completa; a partir de ahí solo se traen los documentos que han
+cambiado y se aplican sobre el DataFrame ya cargado:
+
+- Si el servidor admite change streams (replica set o Atlas), se abre un stream y cada sincronización
+  consume los eventos pendientes sin bloquear (inserciones, actualizaciones, reemplazos y borrados).
+- Si no, se consulta por un campo de marca de actualización (por defecto updated_at) con un índice
+  sobre él: find({updated_at: {$gt: última marca}}). Los borrados se detectan comparando el número
+  de documentos y, solo si no cuadra, la lista de _id.
+
+Para que el modo por marca funcione, quien escribe en la colección debe mantener el campo con
+{"$currentDate": {"updated_at": True}}; los documentos antiguos sin marca se pueden marcar con
+`python 08_APP_U/mongo_sync.py --marcar`.
+
+Con `columnas` (por ejemplo mongo_loader.COLUMNAS_RECOMENDADOR) solo se piden a MongoDB esas columnas y
+el DataFrame se guarda tipado (float32/int16/categorías), tanto en la carga completa como en los cambios.
+
+Cada vez que el catálogo cambia se incrementa `version`, que la app usa como clave de caché para no
+volver a preprocesar ni puntuar mientras no haya cambios.
+"""
+import argparse
+import os
+import threading
+import time
+import pandas as pd
+from pymongo.errors import PyMongoError
+from mongo_loader import alinear_categorias, cargar_catalogo, proyeccion, tipar_documentos
+
+CAMPO_MARCA = os.getenv("MONGO_SYNC_FIELD", "updated_at")
+INTERVALO_SYNC = float(os.getenv("MONGO_SYNC_INTERVAL", "30"))
+# Sin marca en ningún documento cada sincronización relee la colección entera: se espera como antes de la
+# sincronización incremental (la caché de 10 minutos de la app)
+INTERVALO_SIN_MARCA = float(os.getenv("MONGO_SYNC_INTERVAL_SIN_MARCA", "600"))
+
+
+class CatalogoSync:
+    """Mantiene una copia en memoria de la colección y la actualiza solo con los cambios."""
+
+    def __init__(self, collection, campo_marca=CAMPO_MARCA, intervalo=INTERVALO_SYNC, usar_change_streams=True,
+                 columnas=None, intervalo_sin_marca=INTERVALO_SIN_MARCA):
+        self.collection = collection
+        self.campo_marca = campo_marca
+        # El _id y la marca se necesitan siempre para aplicar los cambios
+        self.columnas = columnas and {"_id": "object", **columnas, campo_marca: "object"}
+        self._proyeccion = proyeccion(self.columnas) if self.columnas else None
+        self.intervalo = intervalo
+        self.intervalo_sin_marca = intervalo_sin_marca
+        self.usar_change_streams = usar_change_streams
+        self.version = 0
+        self.modo = None
+        self._df = None
+        self._marca = None
+        self._ids_marca = []
+        self._stream = None
+        self._ultima_sync = 0.0
+        self._lock = threading.Lock()
+        self.estadisticas = {"cargas_completas": 0, "sincronizaciones": 0, "documentos_leidos": 0}
+
+    # --- Carga y aplicación de cambios ---
+
+    def _cargar_todo(self):
+        # El stream se abre antes de leer para no perder cambios que ocurran durante la carga
+        self._abrir_stream()
+        self._marca, self._ids_marca = None, []
+        if self.columnas:
+            # Carga por lotes a columnas tipadas (el filtro de precio se aplica después, en el preprocesado,
+            # para que el recuento de documentos siga sirviendo para detectar borrados)
+            df = cargar_catalogo(self.collection, self.columnas, filtro=None)
+            self._actualizar_marca(df["_id"], df[self.campo_marca])
+            df.index = pd.Index(df.pop("_id").astype(str), name="_id")
+            self._df = df
+        else:
+            documentos = list(self.collection.find({}))
+            self._actualizar_marca([d["_id"] for d in documentos], [d.get(self.campo_marca) for d in documentos])
+            self._df = self._a_frame(documentos)
+        self.estadisticas["cargas_completas"] += 1
+        self.estadisticas["documentos_leidos"] += len(self._df)
+        self.version += 1
+
+    def _abrir_stream(self):
+        self._stream = None
+        self.modo = "marca"
+        if not self.usar_change_streams:
+            return
+        try:
+            self._stream = self.collection.watch(full_document="updateLookup")
+            self.modo = "change_stream"
+        except PyMongoError:
+            # Servidor standalone: se usa la consulta por marca de actualización
+            pass
+
+    def _a_frame(self, documentos):
+        if self.columnas:
+            df = tipar_documentos(documentos, self.columnas)
+            df.index = pd.Index(df.pop("_id").astype(str), name="_id")
+            return df
+        df = pd.DataFrame(documentos)
+        if df.empty:
+            return pd.DataFrame(index=pd.Index([], name="_id"))
+        df["_id"] = df["_id"].astype(str)
+        return df.set_index("_id")
+
+    def _actualizar_marca(self, ids, marcas):
+        """Guarda la marca más reciente y los _id que la tienen, para no volver a leerlos en cada consulta."""
+        pares = [(i, m) for i, m in zip(ids, marcas) if m is not None]
+        if not pares:
+            return
+        marca = max(m for _, m in pares)
+        if marca != self._marca:
+            self._marca, self._ids_marca = marca, []
+        self._ids_marca.extend(i for i, m in pares if m == marca)
+
+    def _aplicar(self, cambiados, borrados):
+        """Aplica sobre el DataFrame los documentos modificados o nuevos y los _id borrados."""
+        cambiado = False
+        if borrados:
+            borrados = self._df.index.intersection(pd.Index([str(b) for b in borrados]))
+            if len(borrados):
+                self._df = self._df.drop(index=borrados)
+                cambiado = True
+
+        if cambiados:
+            nuevos = self._a_frame(cambiados)
+            nuevos = nuevos[~nuevos.index.duplicated(keep="last")]
+            for col in nuevos.columns.difference(self._df.columns):
+                self._df[col] = pd.NA
+            alinear_categorias(self._df, nuevos)
+            existentes = nuevos.index.intersection(self._df.index)
+            if len(existentes):
+                actuales = self._df.loc[existentes, nuevos.columns]
+                valores = nuevos.loc[existentes, nuevos.columns].astype(actuales.dtypes.to_dict(), errors="ignore")
+                if not actuales.equals(valores):
+                    self._df.loc[existentes, nuevos.columns] = valores
+                    cambiado = True
+            altas = nuevos.index.difference(self._df.index)
+            if len(altas):
+                self._df = pd.concat([self._df, nuevos.loc[altas]])
+                cambiado = True
+
+        if cambiado:
+            self.version += 1
+        return cambiado
+
+    # --- Fuentes de cambios ---
+
+    def _cambios_stream(self):
+        cambiados, borrados = [], []
+        while True:
+            evento = self._stream.try_next()
+            if evento is None:
+                return cambiados, borrados
+            tipo = evento["operationType"]
+            if tipo in ("insert", "update", "replace") and evento.get("fullDocument") is not None:
+                cambiados.append(evento["fullDocument"])
+            elif tipo == "delete":
+                borrados.append(evento["documentKey"]["_id"])
+            elif tipo in ("drop", "rename", "invalidate"):
+                raise PyMongoError(f"Change stream invalidado ({tipo})")
+
+    def _cambios_marca(self):
+        if self._marca is None:
+            # Sin marca en ningún documento no se pueden detectar cambios de forma incremental
+            documentos = list(self.collection.find({}, self._proyeccion))
+            self.estadisticas["documentos_leidos"] += len(documentos)
+            actuales = {str(d["_id"]) for d in documentos}
+            return documentos, list(self._df.index.difference(pd.Index(list(actuales))))
+
+        # Los documentos con la misma marca que la última leída pueden ser nuevos (misma resolución de
+        # milisegundos): se piden todos menos los que ya se leyeron con esa marca
+        cambiados = list(self.collection.find({"$or": [
+            {self.campo_marca: {"$gt": self._marca}},
+            {self.campo_marca: self._marca, "_id": {"$nin": self._ids_marca}},
+        ]}, self._proyeccion))
+        self.estadisticas["documentos_leidos"] += len(cambiados)
+        self._actualizar_marca([d["_id"] for d in cambiados], [d.get(self.campo_marca) for d in cambiados])
+
+        borrados = []
+        # estimated_document_count usa los metadatos de la colección: no recorre los documentos
+        if self.collection.estimated_document_count() != len(self._df) + sum(
+                str(d["_id"]) not in self._df.index for d in cambiados):
+            ids = {str(d["_id"]) for d in self.collection.find({}, {"_id": 1})}
+            borrados = list(self._df.index.difference(pd.Index(list(ids))))
+        return cambiados, borrados
+
+    # --- API pública ---
+
+    def sincronizar(self, forzar=False):
+        """
+        Actualiza el catálogo en memoria y devuelve la versión actual.
+
+        En modo marca, la consulta a MongoDB se hace como mucho una vez cada `intervalo` segundos (cada
+        `intervalo_sin_marca` mientras ningún documento tenga marca, porque entonces se relee todo);
+        con change streams se consumen los eventos pendientes en cada llamada (sin esperar).
+        """
+        with self._lock:
+            if self._df is None:
+                self._cargar_todo()
+                self._ultima_sync = time.monotonic()
+                if self.modo == "marca" and self._marca is None:
+                    print(f"⚠️ Ningún documento tiene {self.campo_marca}: el catálogo se relee entero cada "
+                          f"{self.intervalo_sin_marca:.0f} s (ver mongo_sync.py --marcar)")
+                return self.version
+
+            intervalo = self.intervalo if self._marca is not None else max(self.intervalo, self.intervalo_sin_marca)
+            if self.modo == "marca" and not forzar and time.monotonic() - self._ultima_sync < intervalo:
+                return self.version
+
+            try:
+                if self.modo == "change_stream":
+                    cambiados, borrados = self._cambios_stream()
+                else:
+                    cambiados, borrados = self._cambios_marca()
+            except PyMongoError as e:
+                print(f"⚠️ Sincronización incremental fallida ({e}); recargando el catálogo completo")
+                self._cargar_todo()
+            else:
+                self._aplicar(cambiados, borrados)
+
+            self._ultima_sync = time.monotonic()
+            self.estadisticas["sincronizaciones"] += 1
+            return self.version
+
+    def dataframe(self):
+        """Copia del catálogo sin el _id ni el campo de marca, con un índice 0..n-1 como find() + DataFrame."""
+        with self._lock:
+            df = self._df.drop(columns=[self.campo_marca], errors="ignore")
+            return df.reset_index(drop=True)
+
+    def cerrar(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+def marcar_documentos(collection, campo_marca=CAMPO_MARCA):
+    """Pone la marca de actualización a los documentos que no la tienen y crea el índice sobre ella."""
+    resultado = collection.update_many({campo_marca: {"$exists": False}}, {"$currentDate": {campo_marca: True}})
+    collection.create_index(campo_marca)
+    return resultado.modified_count
+
+
+if __name__ == "__main__":
+    import pymongo
+
+    parser = argparse.ArgumentParser(description="Sincronización incremental del catálogo de MongoDB")
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--marcar", action="store_true",
+                        help=f"Añade {CAMPO_MARCA} a los documentos que no lo tienen y crea su índice")
+    args = parser.parse_args()
+
+    collection = pymongo.MongoClient(args.uri)[args.db][args.collection]
+    if args.marcar:
+        print(f"✅ {marcar_documentos(collection)} documentos marcados con {CAMPO_MARCA}")
+    else:
+        sync = CatalogoSync(collection)
+        sync.sincronizar()
+        print(f"✅ {len(sync.dataframe())} documentos cargados (modo: {sync.modo})")
+        sync.cerrar()
@@ -2,26 +2,55 @@ import torch
 import numpy as np
 import torchvision.transforms as transforms
 from PIL import Image
-from tta import apply_tta
-
-def predict(image, model):
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
-    # Aplica TTA a la imagen
-    images = apply_tta(image)  
-    images = [transform(img).unsqueeze(0).to(device) for img in images]
-
-    with torch.no_grad():
-        outputs = [model(img) for img in images]
-        probabilities = [torch.nn.functional.softmax(out, dim=1).cpu().numpy() for out in outputs]
-    
-    # Promedia predicciones
-    avg_probabilities = np.mean(probabilities, axis=0)  
+from tta import TTA_MODO, apply_tta, tta_tensor
+
+# Redimensionado y normalización de cada vista (los mismos que en el entrenamiento)
+transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+
+def preparar_lote(image, num_tta=5, device=None, modo=None):
+    """
+    Tensor (1 + num_tta, 3, 224, 224) con la imagen original y sus vistas de TTA.
+
+    En modo "determinista" la imagen se redimensiona una sola vez y las vistas fijas se generan como
+    operaciones de tensor (en el dispositivo del modelo); en modo "aleatorio" se aplican las
+    transformaciones aleatorias de PIL a cada vista.
+    """
+    if (modo or TTA_MODO) == "determinista":
+        batch = transform(image).unsqueeze(0)
+        batch = batch.to(device) if device is not None else batch
+        return tta_tensor(batch, num_tta=num_tta)
+
+    images = apply_tta(image, num_tta=num_tta)
+    batch = torch.stack([transform(img) for img in images])
+    return batch.to(device) if device is not None else batch
+
+
+def dispositivo(model):
+    """Dispositivo del modelo (los modelos TorchScript congelados no tienen parámetros: van en CPU)."""
+    parametro = next(model.parameters(), None)
+    return parametro.device if parametro is not None else torch.device("cpu")
+
+
+def predecir_lote(batch, model):
+    """Probabilidades medias (1, num_clases) de todas las vistas del lote, en una sola pasada del modelo."""
+    with torch.inference_mode():
+        probabilities = torch.nn.functional.softmax(model(batch), dim=1).mean(dim=0, keepdim=True)
+    return probabilities.cpu().numpy()
+
+
+def predict(image, model, num_tta=5, modo=None):
+    device = dispositivo(model)
+
+    # Aplica TTA a la imagen (modo de IRONBRICK_TTA_MODO si no se indica) y apila todas las vistas en un único lote
+    batch = preparar_lote(image, num_tta=num_tta, device=device, modo=modo)
+
+    # Una sola pasada por el modelo y promedio de las predicciones en el dispositivo
+    avg_probabilities = predecir_lote(batch, model)
     predicted_class = np.argmax(avg_probabilities)
 
     return predicted_class, avg_probabilities
@@ -0,0 +1,165 @@
+"""
+Artefacto precalculado del recomendador de sets retirados.
+
+El histórico de precios de BrickEconomy (scraped_lego_data.csv) se pivota a una matriz compacta de 12 precios
+por set y se predice el valor a 2 y 5 años con los dos modelos XGB una sola vez por versión de los datos y de
+los modelos (hash SHA-256 de los tres ficheros). El resultado se guarda en disco (.npz en IRONBRICK_CACHE_DIR)
+y en memoria, así que en cada rerun de Streamlit solo se filtran arrays ya calculados: ni se relee el CSV ni se
+cargan los modelos.
+
+Uso (precalcular el artefacto, por ejemplo al desplegar):
+    python 08_APP_U/retirados.py
+"""
+import argparse
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from datasets import DATASETS, cargar_dataset
+from feature_utils import CACHE_DIR
+from scoring import file_sha256
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CSV_PATH = DATASETS["historial"]["csv"]
+MODELO_2Y_PATH = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_2y.pkl")
+MODELO_5Y_PATH = os.path.join(BASE_DIR, "04_Extra/APP/models/xgb_5y.pkl")
+
+NUM_PRECIOS = 12
+PRICE_COLUMNS = [f"Price_{i}" for i in range(1, NUM_PRECIOS + 1)]
+INDEX_COLUMNS = ['Number', 'SetName', 'Theme', 'Year', 'Pieces', 'RetailPriceUSD', 'CurrentValueNew',
+                 'ForecastValueNew2Y', 'ForecastValueNew5Y']
+
+# Caché del proceso: (ruta, mtime, tamaño) de los tres ficheros -> DataFrame de sets con sus predicciones.
+# Solo guarda la versión actual: al cambiar el CSV o un modelo se descarta la anterior
+_cache = {}
+
+
+def pivotar_historial(df):
+    """
+    Una fila por set con sus metadatos y sus 12 primeros precios (Price_1..Price_12) en orden de fecha.
+
+    Equivale al sort + groupby().cumcount() + pivot anterior, pero colocando los precios directamente en una
+    matriz de numpy a partir de los códigos de grupo.
+    """
+    df = df.assign(PriceDate=pd.to_datetime(df["PriceDate"], errors='coerce')).dropna(subset=["PriceDate"])
+    df = df.sort_values(by=['Number', 'PriceDate'], kind="stable")
+
+    # Posición de cada precio dentro de su set y fila de la tabla pivotada (una por combinación de metadatos)
+    posicion = df.groupby('Number', sort=False).cumcount().to_numpy()
+    fila = df.groupby(INDEX_COLUMNS, sort=True, dropna=False, observed=True).ngroup().to_numpy()
+    n_filas = fila.max() + 1 if len(fila) else 0
+
+    precios = np.zeros((n_filas, NUM_PRECIOS))
+    dentro = posicion < NUM_PRECIOS
+    precios[fila[dentro], posicion[dentro]] = df["PriceValue"].to_numpy(dtype=np.float64)[dentro]
+
+    primera = np.unique(fila, return_index=True)[1]
+    sets = df.iloc[primera][INDEX_COLUMNS].reset_index(drop=True)
+    df_transformed = pd.concat([sets, pd.DataFrame(precios, columns=PRICE_COLUMNS)], axis=1)
+
+    df_transformed['Pieces'] = df_transformed['Pieces'].fillna(0)
+    df_transformed['RetailPriceUSD'] = df_transformed['RetailPriceUSD'].fillna(0)
+    sin_valor = df_transformed['CurrentValueNew'] == 0
+    df_transformed.loc[sin_valor, 'CurrentValueNew'] = df_transformed.loc[sin_valor, 'RetailPriceUSD']
+    return df_transformed.dropna().reset_index(drop=True)
+
+
+def _cargar_modelo(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def predecir(df_transformed, model_2y, model_5y):
+    """Sets con CurrentValueNew, PredictedValue2Y/5Y y rentabilidades porcentuales, a partir de la tabla pivotada."""
+    df_identification = df_transformed[['Number', 'SetName', 'Theme', 'CurrentValueNew']].copy()
+    df_model = df_transformed.drop(columns=['Number', 'SetName', 'Theme'], errors='ignore')
+    df_model = pd.get_dummies(df_model, drop_first=True)
+    df_model = df_model.reindex(columns=model_2y.feature_names_in_, fill_value=0)
+    df_identification['PredictedValue2Y'] = model_2y.predict(df_model)
+    df_identification['PredictedValue5Y'] = model_5y.predict(df_model)
+    return df_identification
+
+
+def _artefacto_path(claves):
+    return os.path.join(CACHE_DIR, "retirados_" + "_".join(clave[:12] for clave in claves) + ".npz")
+
+
+def _guardar(path, df, precios):
+    # Textos y categorías se guardan como arrays unicode de numpy; las categorías se anotan para restaurarlas
+    categoricas = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, precios=precios, _categoricas=np.array(categoricas, dtype=str),
+                     **{col: df[col].to_numpy(dtype=str) if df[col].dtype == object or col in categoricas
+                        else df[col].to_numpy() for col in df.columns})
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el artefacto de sets retirados: {e}")
+
+
+def _leer(path):
+    with np.load(path) as datos:
+        precios = datos["precios"]
+        categoricas = datos["_categoricas"].tolist()
+        # pandas convierte los arrays unicode en columnas object
+        df = pd.DataFrame({col: datos[col] for col in datos.files if col not in ("precios", "_categoricas")})
+    for col in categoricas:
+        df[col] = df[col].astype("category")
+    return df, precios
+
+
+def cargar_retirados(csv_path=CSV_PATH, modelo_2y_path=MODELO_2Y_PATH, modelo_5y_path=MODELO_5Y_PATH):
+    """
+    Devuelve (df, precios): los sets retirados con sus predicciones y rentabilidades, y la matriz float32 de
+    sus 12 precios históricos alineada por fila.
+
+    Solo la primera vez para una versión de los ficheros se lee el CSV, se pivota y se predice.
+    """
+    rutas = (csv_path, modelo_2y_path, modelo_5y_path)
+    firma = tuple((ruta, os.stat(ruta).st_mtime_ns, os.stat(ruta).st_size) for ruta in rutas)
+    if firma in _cache:
+        return _cache[firma]
+
+    path = _artefacto_path([file_sha256(ruta) for ruta in rutas])
+    resultado = None
+    if os.path.exists(path):
+        try:
+            resultado = _leer(path)
+        except (OSError, ValueError, KeyError):
+            resultado = None
+
+    if resultado is None:
+        historial = cargar_dataset("historial") if csv_path == CSV_PATH else pd.read_csv(csv_path)
+        df_transformed = pivotar_historial(historial)
+        df = predecir(df_transformed, _cargar_modelo(modelo_2y_path), _cargar_modelo(modelo_5y_path))
+        df["Rentabilidad2Y"] = (df["PredictedValue2Y"] - df["CurrentValueNew"]) / df["CurrentValueNew"] * 100
+        df["Rentabilidad5Y"] = (df["PredictedValue5Y"] - df["CurrentValueNew"]) / df["CurrentValueNew"] * 100
+        precios = np.ascontiguousarray(df_transformed[PRICE_COLUMNS].to_numpy(dtype=np.float32))
+        _guardar(path, df, precios)
+        resultado = (df, precios)
+
+    _cache.clear()
+    _cache[firma] = resultado
+    return resultado
+
+
+def rentabilidad_por_tema(df):
+    """Número de sets y rentabilidad media a 2 y 5 años por tema, de mayor a menor rentabilidad a 5 años."""
+    return df.groupby("Theme").agg(
+        TotalSets=('Theme', 'count'),
+        Rentabilidad2Y=('Rentabilidad2Y', 'mean'),
+        Rentabilidad5Y=('Rentabilidad5Y', 'mean')
+    ).reset_index().sort_values(by="Rentabilidad5Y", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precalcula el artefacto del recomendador de sets retirados")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--modelo-2y", default=MODELO_2Y_PATH)
+    parser.add_argument("--modelo-5y", default=MODELO_5Y_PATH)
+    args = parser.parse_args()
+
+    df, precios = cargar_retirados(args.csv, args.modelo_2y, args.modelo_5y)
+    print(f"✅ {len(df)} sets retirados con predicciones ({precios.nbytes / 1024:.0f} KB de precios) en {CACHE_DIR}")
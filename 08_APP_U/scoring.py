@@ -0,0 +1,80 @@
+"""
+Puntuación offline del catálogo con el modelo de inversión.
+
+El catálogo completo se puntúa una sola vez por (versión del dataset, versión del modelo) y las
+puntuaciones se guardan en disco. La app y el bot solo filtran y ordenan la tabla ya puntuada.
+
+Uso (precalcular las puntuaciones, por ejemplo al desplegar):
+    python 08_APP_U/scoring.py --data 08_APP_U/data/df_lego_final_venta.csv --model /tmp/stacking_model.pkl
+"""
+import argparse
+import hashlib
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from datasets import _origen
+from feature_utils import CACHE_DIR, dataset_hash, feature_frame, load_features
+
+SCORE_COLUMN = "PredictedInvestmentScore"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hash SHA-256 del fichero del modelo, usado como versión del modelo."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _scores_path(data_version, model_version):
+    return os.path.join(CACHE_DIR, f"scores_{data_version[:16]}_{model_version[:16]}.npy")
+
+
+def score_catalogue(df, X, modelo, model_version):
+    """
+    Devuelve el catálogo con la columna PredictedInvestmentScore, ordenado de mayor a menor puntuación.
+
+    df y X son la salida de feature_utils.load_features. Si ya existen puntuaciones guardadas para esta
+    versión del dataset y del modelo se reutilizan; si no, se predice el catálogo entero una vez.
+    """
+    path = _scores_path(dataset_hash(df), model_version)
+
+    scores = None
+    if os.path.exists(path):
+        try:
+            scores = np.load(path)
+            if scores.shape != (len(df),):
+                scores = None
+        except (OSError, ValueError):
+            scores = None
+
+    if scores is None:
+        scores = np.asarray(modelo.predict(feature_frame(X, index=df.index)), dtype=np.float64)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, scores)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar las puntuaciones en caché: {e}")
+
+    df = df.copy()
+    df[SCORE_COLUMN] = scores
+    # Orden estable para que los filtros posteriores conserven el ranking sin volver a ordenar
+    return df.sort_values(by=SCORE_COLUMN, ascending=False, kind="stable")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Puntúa el catálogo completo y guarda las puntuaciones")
+    parser.add_argument("--data", required=True, help="CSV del catálogo (df_lego_final_venta.csv)")
+    parser.add_argument("--model", default="/tmp/stacking_model.pkl", help="Ruta del stacking_model.pkl")
+    args = parser.parse_args()
+
+    df, X = load_features(pd.read_csv(args.data), origen=_origen(args.data))
+    modelo = joblib.load(args.model)
+    df_scored = score_catalogue(df, X, modelo, file_sha256(args.model))
+    print(f"✅ {len(df_scored)} sets puntuados en {CACHE_DIR}")
+    print(df_scored[["Number", "SetName", SCORE_COLUMN]].head(10).to_string(index=False))
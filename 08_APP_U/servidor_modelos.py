@@ -0,0 +1,400 @@
+"""
+Servidor local de modelos compartido por las sesiones de Streamlit y el bot de Telegram.
+
+Un solo proceso carga una vez el modelo de inversión (stacking), los dos XGB de sets retirados (xgb_2y,
+xgb_5y) y el identificador (EfficientNet), y los sirve por HTTP. Las peticiones concurrentes a un mismo
+modelo se agrupan en microlotes: se espera como mucho ESPERA_MS a que lleguen más peticiones (hasta
+MAX_FILAS filas) y se hace una sola llamada al modelo.
+
+    GET  /health                 estado y versión (sha256) de cada modelo
+    GET  /metrics                peticiones, filas por lote y latencia (p50/p95/p99) de cada modelo
+    POST /predecir/<modelo>      JSON {"columnas": [...], "filas": [[...]]} -> {"predicciones": [...]}
+    POST /inferir/identificador  lote de imágenes (3, 224, 224) en formato .npy -> logits en .npy
+
+Con IRONBRICK_SERVIDOR_MODELOS=http://host:puerto, cargar_modelo() devuelve un cliente con la misma interfaz
+que el modelo local: ModeloRemoto.predict() para los modelos tabulares y RedRemota (se llama como la red de
+torch) para el identificador, así que predict.predict, identificar_lote y score_catalogue no cambian. Sin
+la variable, o si el servidor no responde, el modelo se carga en el propio proceso como hasta ahora.
+
+Ver bench_servidor_modelos.py para el efecto de los microlotes con clientes concurrentes.
+
+Uso:
+    python 08_APP_U/servidor_modelos.py --puerto 8765
+    python 08_APP_U/servidor_modelos.py --modelos stacking xgb_2y xgb_5y --espera-ms 2
+"""
+import argparse
+import http.server
+import io
+import json
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import joblib
+import numpy as np
+import pandas as pd
+import requests
+from model_registry import ModeloNoDisponible, obtener_modelo
+from retirados import MODELO_2Y_PATH, MODELO_5Y_PATH
+from scoring import file_sha256
+
+SERVIDOR_URL = os.getenv("IRONBRICK_SERVIDOR_MODELOS", "")
+MAX_FILAS = int(os.getenv("IRONBRICK_SERVIDOR_MAX_FILAS", "64"))
+ESPERA_MS = float(os.getenv("IRONBRICK_SERVIDOR_ESPERA_MS", "2"))
+
+MODELOS = ("stacking", "xgb_2y", "xgb_5y", "identificador")
+RUTAS_XGB = {"xgb_2y": MODELO_2Y_PATH, "xgb_5y": MODELO_5Y_PATH}
+
+
+def _cargar_local(nombre):
+    """(modelo, versión sha256) cargado en este proceso."""
+    if nombre == "stacking":
+        path, version = obtener_modelo("stacking")
+        return joblib.load(path), version
+    if nombre in RUTAS_XGB:
+        with open(RUTAS_XGB[nombre], "rb") as f:
+            return pickle.load(f), file_sha256(RUTAS_XGB[nombre])
+    if nombre == "identificador":
+        from model_utils import load_model
+        path, version = obtener_modelo("identificador")
+        return load_model(path), version
+    raise KeyError(f"Modelo desconocido: {nombre}")
+
+
+class Metricas:
+    """Contadores y últimas latencias (ms) de las peticiones a un modelo."""
+
+    def __init__(self, max_latencias=2048):
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.filas = 0
+        self.lotes = 0
+        self.errores = 0
+        self._latencias = deque(maxlen=max_latencias)
+
+    def registrar(self, filas, latencias):
+        with self._lock:
+            self.peticiones += len(latencias)
+            self.filas += filas
+            self.lotes += 1
+            self._latencias.extend(latencias)
+
+    def error(self, peticiones):
+        with self._lock:
+            self.errores += peticiones
+
+    def resumen(self):
+        with self._lock:
+            latencias = np.array(self._latencias)
+            resumen = {"peticiones": self.peticiones, "filas": self.filas, "lotes": self.lotes,
+                       "errores": self.errores,
+                       "peticiones_por_lote": self.peticiones / self.lotes if self.lotes else 0.0}
+        if len(latencias):
+            p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+            resumen["latencia_ms"] = {"p50": p50, "p95": p95, "p99": p99}
+        return resumen
+
+
+class Microlotes:
+    """
+    Cola de peticiones a un modelo atendida por un hilo que las agrupa en una sola llamada.
+
+    funcion recibe la lista de entradas del lote y devuelve una salida por entrada.
+    """
+
+    def __init__(self, funcion, max_filas=MAX_FILAS, espera_ms=ESPERA_MS):
+        self.funcion = funcion
+        self.max_filas = max_filas
+        self.espera = espera_ms / 1000
+        self.metricas = Metricas()
+        self._cola = queue.Queue()
+        threading.Thread(target=self._atender, daemon=True).start()
+
+    def enviar(self, entrada, filas):
+        futuro = Future()
+        self._cola.put((entrada, filas, futuro, time.perf_counter()))
+        return futuro.result()
+
+    def _atender(self):
+        while True:
+            lote = [self._cola.get()]
+            filas = lote[0][1]
+            limite = time.perf_counter() + self.espera
+            while filas < self.max_filas:
+                try:
+                    siguiente = self._cola.get(timeout=max(limite - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                lote.append(siguiente)
+                filas += siguiente[1]
+
+            try:
+                salidas = self.funcion([entrada for entrada, _, _, _ in lote])
+            except Exception as e:
+                self.metricas.error(len(lote))
+                for _, _, futuro, _ in lote:
+                    futuro.set_exception(e)
+                continue
+            fin = time.perf_counter()
+            for (_, _, futuro, inicio), salida in zip(lote, salidas):
+                futuro.set_result(salida)
+            self.metricas.registrar(filas, [(fin - inicio) * 1000 for _, _, _, inicio in lote])
+
+
+def _funcion_tabular(modelo, columnas):
+    def predecir(entradas):
+        # Cada petición trae sus columnas en su orden: se alinean a las del modelo antes de juntarlas, porque
+        # pd.concat une por nombre y con columnas distintas rellenaría con NaN en lugar de fallar
+        if columnas is not None:
+            entradas = [e.reindex(columns=columnas) for e in entradas]
+        X = entradas[0] if len(entradas) == 1 else pd.concat(entradas, ignore_index=True)
+        predicciones = np.asarray(modelo.predict(X), dtype=np.float64)
+        return np.split(predicciones, np.cumsum([len(e) for e in entradas])[:-1])
+    return predecir
+
+
+def _funcion_red(model):
+    import torch
+
+    def inferir(entradas):
+        with torch.inference_mode():
+            salida = model(torch.cat(entradas)).cpu()
+        return torch.split(salida, [len(e) for e in entradas])
+    return inferir
+
+
+def _columnas(modelo):
+    columnas = getattr(modelo, "feature_names_in_", None)
+    return None if columnas is None else [str(c) for c in columnas]
+
+
+class ServidorModelos:
+    """Modelos cargados una vez con su cola de microlotes. modelos: nombre -> (modelo, versión)."""
+
+    def __init__(self, modelos, max_filas=MAX_FILAS, espera_ms=ESPERA_MS):
+        self.modelos = {}
+        for nombre, (modelo, version) in modelos.items():
+            # Los modelos con predict() son tabulares (sklearn/XGBoost); el resto, redes de torch
+            tabular = hasattr(modelo, "predict")
+            columnas = _columnas(modelo) if tabular else None
+            funcion = _funcion_tabular(modelo, columnas) if tabular else _funcion_red(modelo)
+            self.modelos[nombre] = {"modelo": modelo, "version": version, "tabular": tabular,
+                                    "columnas": columnas, "n_columnas": getattr(modelo, "n_features_in_", None),
+                                    "lotes": Microlotes(funcion, max_filas, espera_ms)}
+
+    @classmethod
+    def cargar(cls, nombres=MODELOS, **kwargs):
+        modelos = {}
+        for nombre in nombres:
+            try:
+                modelos[nombre] = _cargar_local(nombre)
+                print(f"✅ {nombre} cargado ({modelos[nombre][1][:12]})")
+            except (ImportError, OSError, ModeloNoDisponible) as e:
+                # Por ejemplo, el identificador sin torch instalado o un .pkl que no está en disco
+                print(f"⚠️ No se sirve {nombre}: {e}")
+        return cls(modelos, **kwargs)
+
+    def salud(self):
+        # resource solo existe en Unix: en Windows (donde también se usa la app) no se informa de la memoria
+        try:
+            import resource
+            rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except ImportError:
+            rss_mb = None
+        return {"estado": "ok", "pid": os.getpid(), "rss_mb": rss_mb,
+                "modelos": {nombre: {"version": m["version"], "tabular": m["tabular"], "columnas": m["columnas"]}
+                            for nombre, m in self.modelos.items()}}
+
+    def metricas(self):
+        return {nombre: m["lotes"].metricas.resumen() for nombre, m in self.modelos.items()}
+
+    def predecir(self, nombre, columnas, filas):
+        m = self.modelos[nombre]
+        # Se valida aquí, por petición: una petición con otras columnas que llegara al microlote haría fallar
+        # (o, peor, predecir con NaN) a todas las que comparten lote con ella
+        if m["columnas"] is not None:
+            X = pd.DataFrame(filas, columns=columnas or m["columnas"])
+            faltan = [c for c in m["columnas"] if c not in X.columns]
+            sobran = [c for c in X.columns if c not in m["columnas"]]
+            if faltan or sobran:
+                raise ValueError(f"Columnas distintas de las de {nombre}: faltan {faltan}, sobran {sobran}")
+            X = X[m["columnas"]]
+        else:
+            # Sin nombres en el modelo las columnas son posicionales: se descartan los nombres del cliente para
+            # que todas las peticiones del lote compartan columnas al concatenarse
+            X = pd.DataFrame(filas)
+            if m["n_columnas"] is not None and len(X) and X.shape[1] != m["n_columnas"]:
+                raise ValueError(f"{nombre} espera {m['n_columnas']} columnas y la petición trae {X.shape[1]}")
+        return m["lotes"].enviar(X, len(X))
+
+    def inferir(self, nombre, batch):
+        import torch
+        batch = torch.from_numpy(batch)
+        return self.modelos[nombre]["lotes"].enviar(batch, len(batch)).numpy()
+
+    def servir(self, host="127.0.0.1", puerto=8765):
+        """Arranca el servidor HTTP en un hilo y lo devuelve (servidor.shutdown() para pararlo)."""
+        servidor = http.server.ThreadingHTTPServer((host, puerto), _handler(self))
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        return servidor
+
+
+def _handler(servicio):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Sin Nagle: con keep-alive, cabeceras y cuerpo en escrituras separadas esperarían al ACK retardado
+        disable_nagle_algorithm = True
+
+        def _responder(self, codigo, cuerpo, tipo="application/json"):
+            if tipo == "application/json":
+                cuerpo = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._responder(200, servicio.salud())
+            elif self.path == "/metrics":
+                self._responder(200, servicio.metricas())
+            else:
+                self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+
+        def do_POST(self):
+            _, accion, nombre = (self.path.split("/") + ["", ""])[:3]
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if nombre not in servicio.modelos or accion not in ("predecir", "inferir"):
+                self._responder(404, {"error": f"Modelo o ruta desconocidos: {self.path}"})
+                return
+            try:
+                if accion == "predecir":
+                    peticion = json.loads(cuerpo)
+                    predicciones = servicio.predecir(nombre, peticion.get("columnas"), peticion["filas"])
+                    self._responder(200, {"predicciones": predicciones.tolist()})
+                else:
+                    salida = io.BytesIO()
+                    np.save(salida, servicio.inferir(nombre, np.load(io.BytesIO(cuerpo))))
+                    self._responder(200, salida.getvalue(), "application/octet-stream")
+            except (ValueError, KeyError) as e:
+                self._responder(400, {"error": str(e)})
+            except Exception as e:
+                self._responder(500, {"error": str(e)})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class ClienteModelos:
+    """Cliente HTTP del servidor de modelos."""
+
+    def __init__(self, url=SERVIDOR_URL, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._sesion = requests.Session()
+
+    def _get(self, ruta):
+        response = self._sesion.get(f"{self.url}{ruta}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def salud(self):
+        return self._get("/health")
+
+    def metricas(self):
+        return self._get("/metrics")
+
+    def predecir(self, nombre, X):
+        columnas = [str(c) for c in X.columns] if isinstance(X, pd.DataFrame) else None
+        cuerpo = json.dumps({"columnas": columnas, "filas": np.asarray(X, dtype=np.float64).tolist()})
+        response = self._sesion.post(f"{self.url}/predecir/{nombre}", data=cuerpo, timeout=self.timeout,
+                                     headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        return np.asarray(response.json()["predicciones"], dtype=np.float64)
+
+    def inferir(self, nombre, batch):
+        cuerpo = io.BytesIO()
+        np.save(cuerpo, np.ascontiguousarray(batch, dtype=np.float32))
+        response = self._sesion.post(f"{self.url}/inferir/{nombre}", data=cuerpo.getvalue(), timeout=self.timeout,
+                                     headers={"Content-Type": "application/octet-stream"})
+        response.raise_for_status()
+        return np.load(io.BytesIO(response.content))
+
+
+class ModeloRemoto:
+    """Modelo tabular del servidor con la interfaz de sklearn que usan la app y el bot (predict)."""
+
+    def __init__(self, cliente, nombre, columnas=None):
+        self.cliente = cliente
+        self.nombre = nombre
+        if columnas is not None:
+            self.feature_names_in_ = np.array(columnas, dtype=object)
+
+    def predict(self, X):
+        return self.cliente.predecir(self.nombre, X)
+
+
+class RedRemota:
+    """Identificador del servidor: se llama con un lote de imágenes y devuelve los logits, como la red de torch."""
+
+    def __init__(self, cliente, nombre="identificador"):
+        self.cliente = cliente
+        self.nombre = nombre
+
+    def __call__(self, batch):
+        import torch
+        salida = self.cliente.inferir(self.nombre, batch.detach().cpu().numpy())
+        return torch.from_numpy(salida).to(batch.device)
+
+    def parameters(self):
+        # Sin parámetros locales: predict.dispositivo() prepara los lotes en CPU
+        return iter(())
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+
+def cargar_modelo(nombre, url=None):
+    """
+    (modelo, versión sha256): el cliente del servidor de modelos si IRONBRICK_SERVIDOR_MODELOS (o url) está
+    definido y responde, y si no, el modelo cargado en el propio proceso.
+    """
+    url = SERVIDOR_URL if url is None else url
+    if url:
+        cliente = ClienteModelos(url)
+        try:
+            info = cliente.salud()["modelos"][nombre]
+            if info["tabular"]:
+                return ModeloRemoto(cliente, nombre, info["columnas"]), info["version"]
+            return RedRemota(cliente, nombre), info["version"]
+        except (requests.RequestException, KeyError) as e:
+            print(f"⚠️ Servidor de modelos no disponible para {nombre} ({e}); se carga en este proceso")
+    return _cargar_local(nombre)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de modelos de Ironbrick")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--modelos", nargs="+", choices=MODELOS, default=list(MODELOS))
+    parser.add_argument("--max-filas", type=int, default=MAX_FILAS, help="Filas máximas por microlote")
+    parser.add_argument("--espera-ms", type=float, default=ESPERA_MS, help="Espera máxima para completar un microlote")
+    args = parser.parse_args()
+
+    servicio = ServidorModelos.cargar(args.modelos, max_filas=args.max_filas, espera_ms=args.espera_ms)
+    servidor = servicio.servir(args.host, args.puerto)
+    print(f"🚀 Servidor de modelos en http://{args.host}:{args.puerto} ({', '.join(servicio.modelos)})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()